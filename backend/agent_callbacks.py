@@ -0,0 +1,160 @@
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from batch import RateLimiter
+from metrics import (AGENT_ITERATIONS, LLM_ERRORS, LLM_LATENCY, LLM_TOKENS, RETRIEVAL_LATENCY, TOOL_LATENCY,
+                     record_llm_outcome)
+
+# LangChain callback handlers of the agent runs. Only imported by code running
+# the agent, so the API starts listening without loading LangChain.
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+class RequestTracer(BaseCallbackHandler):
+    """Callback handler timing one agent run: LLM calls, tool calls, retrievals.
+
+    Every finished step is observed in the Prometheus histograms right away;
+    :meth:`summary` gives the whole trace of the request.
+    """
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.iterations = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.steps: List[Dict[str, Any]] = []
+        self._starts: Dict[UUID, float] = {}
+        self._tool_names: Dict[UUID, str] = {}
+        self._prompt_chars: Dict[UUID, int] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID):
+        with self._lock:
+            self._starts[run_id] = time.perf_counter()
+
+    def _elapsed(self, run_id: UUID) -> Optional[float]:
+        with self._lock:
+            started = self._starts.pop(run_id, None)
+        return None if started is None else time.perf_counter() - started
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any):
+        self._start(run_id)
+        self._prompt_chars[run_id] = sum(len(p) for p in prompts)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id)
+        self._prompt_chars[run_id] = sum(len(str(m.content)) for batch in messages for m in batch)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        elapsed = self._elapsed(run_id)
+        prompt_chars = self._prompt_chars.pop(run_id, 0)
+        if elapsed is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        text = "".join(g.text for generations in response.generations for g in generations)
+        prompt_tokens = usage.get("prompt_tokens") or max(1, prompt_chars // 4)
+        completion_tokens = usage.get("completion_tokens") or _estimate_tokens(text)
+        record_llm_outcome(True)
+        LLM_LATENCY.observe(elapsed)
+        LLM_TOKENS.labels("prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels("completion").inc(completion_tokens)
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += elapsed
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.steps.append({"type": "llm", "seconds": round(elapsed, 4),
+                               "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        record_llm_outcome(False)
+        LLM_ERRORS.inc()
+        self._elapsed(run_id)
+        self._prompt_chars.pop(run_id, None)
+
+    def on_agent_action(self, action, **kwargs: Any):
+        with self._lock:
+            self.iterations += 1
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        # Tools wrapping other tools (Weather Info -> get_weather) are timed once
+        if parent_run_id in self._tool_names:
+            return
+        self._tool_names[run_id] = (serialized or {}).get("name", "tool")
+        self._start(run_id)
+
+    def _tool_done(self, run_id: UUID, status: str):
+        name = self._tool_names.pop(run_id, None)
+        elapsed = self._elapsed(run_id)
+        if name is None or elapsed is None:
+            return
+        TOOL_LATENCY.labels(name, status).observe(elapsed)
+        with self._lock:
+            self.steps.append({"type": "tool", "name": name, "status": status, "seconds": round(elapsed, 4)})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._tool_done(run_id, "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._tool_done(run_id, "error")
+
+    def on_retriever_start(self, serialized: Dict[str, Any], query: str, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id)
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs: Any):
+        elapsed = self._elapsed(run_id)
+        if elapsed is None:
+            return
+        RETRIEVAL_LATENCY.observe(elapsed)
+        with self._lock:
+            self.steps.append({"type": "retrieval", "documents": len(documents), "seconds": round(elapsed, 4)})
+
+    def finish(self):
+        """Record the iteration count of the finished run"""
+        AGENT_ITERATIONS.observe(self.iterations)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "request_id": self.request_id,
+                "seconds": round(time.perf_counter() - self.started, 4),
+                "iterations": self.iterations,
+                "llm_calls": self.llm_calls,
+                "llm_seconds": round(self.llm_seconds, 4),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "steps": list(self.steps),
+            }
+
+class RateLimitCallback(BaseCallbackHandler):
+    """Count the LLM calls of one agent run against the rate limiter.
+
+    The first call was paid for by :meth:`RateLimiter.acquire` before the run
+    was submitted; the next ones are charged without blocking the worker.
+    """
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+        self._prepaid = 1
+
+    def _call(self):
+        if self._prepaid:
+            self._prepaid -= 1
+        else:
+            self.limiter.charge()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts, **kwargs: Any):
+        self._call()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, **kwargs: Any):
+        self._call()
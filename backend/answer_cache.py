@@ -0,0 +1,177 @@
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Answers kept in memory; the least recently used ones are dropped first
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2000"))
+# Cosine similarity above which a new question reuses the answer of a cached one
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.93"))
+
+# Seconds an answer stays valid, by kind of question
+CATEGORY_TTLS = {
+    "weather": 15 * 60,
+    "live": 60 * 60,               # news, scores, "today"...
+    "tournament": 7 * 24 * 3600,   # fixtures, venues, tournament facts
+    "general": 24 * 3600,
+}
+
+# Categories whose answers depend on the exact wording: never served from a near-duplicate
+EXACT_ONLY_CATEGORIES = {"weather", "live"}
+
+_CATEGORY_KEYWORDS = [
+    ("weather", re.compile(r"\b(weather|forecast|temperatures?|rain|rainy|sunny|meteo|quel temps|temps fait|climat|pluie"
+                           r"|طقس|الطقس)\b")),
+    ("live", re.compile(r"\b(today|tonight|now|latest|news|scores?|results?|live|aujourd hui|ce soir|actualites?"
+                        r"|resultats?)\b")),
+    ("tournament", re.compile(r"\b(afcon|can 2025|tournaments?|tournoi|stadiums?|stades?|match(?:es)?|fixtures?"
+                              r"|schedule|calendrier|groups?|groupes?|finals?|finale|semi ?finals?|quarter ?finals?"
+                              r"|kick ?off|tickets?|billets?|teams?|equipes?)\b")),
+]
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+def normalize_query(query: str) -> str:
+    """Case, accent and punctuation-insensitive form of a question (any script)"""
+    text = unicodedata.normalize("NFKD", query or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+def categorize(query: str) -> str:
+    """Pick the TTL category of a question from its keywords"""
+    normalized = normalize_query(query)
+    for category, pattern in _CATEGORY_KEYWORDS:
+        if pattern.search(normalized):
+            return category
+    return "general"
+
+class AnswerCache:
+    """LRU cache of agent answers keyed by (language, normalized question).
+
+    A question missing from the exact tier is embedded and compared with the
+    cached questions of the same language and category; above
+    ``similarity_threshold`` the cached answer is reused. Near-duplicates must
+    also mention the same places and numbers, so "hotels in Rabat" never
+    answers "hotels in Agadir".
+    """
+
+    def __init__(self, embedding=None, place_names: Iterable[str] = (),
+                 max_size: int = ANSWER_CACHE_SIZE,
+                 similarity_threshold: float = ANSWER_CACHE_SIMILARITY,
+                 ttls: Optional[Dict[str, float]] = None):
+        self.embedding = embedding
+        self.place_names = sorted({name for name in place_names if name}, key=len, reverse=True)
+        self.max_size = max_size
+        self.similarity_threshold = similarity_threshold
+        self.ttls = ttls or CATEGORY_TTLS
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _key_terms(self, normalized: str) -> frozenset:
+        """Places and numbers in the question: near-duplicates must share all of them"""
+        padded = f" {normalized} "
+        terms = {token for token in normalized.split() if any(c.isdigit() for c in token)}
+        for name in self.place_names:
+            if f" {name} " in padded:
+                terms.add(name)
+                padded = padded.replace(f" {name} ", " ")
+        return frozenset(terms)
+
+    def _embed(self, normalized: str) -> Optional["np.ndarray"]:
+        if self.embedding is None:
+            return None
+        # Imported on first use: the API imports this module before it listens
+        import numpy as np
+        try:
+            vector = np.asarray(self.embedding.embed_query(normalized), dtype=np.float32)
+        except Exception as e:
+            print(f"Error embedding question for the answer cache: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _expire(self, now: float):
+        expired = [key for key, entry in self._entries.items() if entry["expires_at"] <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, query: str, language: str = "en") -> Tuple[Optional[str], str]:
+        """Return ``(answer, "hit" | "semantic" | "miss")``"""
+        normalized = normalize_query(query)
+        key = (language or "en", normalized)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["response"], "hit"
+
+        category = categorize(query)
+        if category in EXACT_ONLY_CATEGORIES or self.embedding is None:
+            with self._lock:
+                self.misses += 1
+            return None, "miss"
+
+        # Embedding may call a remote API: done outside the lock
+        vector = self._embed(normalized)
+        terms = self._key_terms(normalized)
+        with self._lock:
+            self._expire(now)
+            best_key, best_score = None, self.similarity_threshold
+            if vector is not None:
+                for candidate_key, candidate in self._entries.items():
+                    if (candidate_key[0] != key[0] or candidate["category"] != category
+                            or candidate["vector"] is None or candidate["terms"] != terms):
+                        continue
+                    score = float(candidate["vector"] @ vector)
+                    if score >= best_score:
+                        best_key, best_score = candidate_key, score
+            if best_key is None:
+                self.misses += 1
+                return None, "miss"
+            self._entries.move_to_end(best_key)
+            self.semantic_hits += 1
+            return self._entries[best_key]["response"], "semantic"
+
+    def put(self, query: str, language: str, response: str):
+        normalized = normalize_query(query)
+        category = categorize(query)
+        vector = None if category in EXACT_ONLY_CATEGORIES else self._embed(normalized)
+        with self._lock:
+            key = (language or "en", normalized)
+            self._entries[key] = {
+                "response": response,
+                "category": category,
+                "expires_at": time.time() + self.ttls.get(category, self.ttls["general"]),
+                "vector": vector,
+                "terms": self._key_terms(normalized),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            }
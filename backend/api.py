@@ -1,15 +1,22 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any, List, Tuple
 from datetime import datetime
 
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.prompts import PromptTemplate
-
-from llm import init_llm
-from rag import init_rag
-from tools import get_tools
+from worker_pool import AgentPool, PoolSaturated
+from answer_cache import AnswerCache
+from cache_backend import get_cache
+from metrics import CACHE_LOOKUPS, REQUEST_LATENCY, llm_status, register_stats, render_metrics
+from startup import LazyComponents
+from singleflight import AsyncSingleFlight
+from batch import (BATCH_CONCURRENCY, BATCH_LLM_CALLS_PER_MINUTE, BATCH_MAX_MESSAGES, RateLimiter, batch_key,
+                   run_batch)
 
 app = FastAPI()
 
@@ -22,40 +29,137 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-llm = init_llm()
-qa_chain = init_rag(llm)
-tools = get_tools(qa_chain)
+# Seconds a request waits for the components of a worker that is still starting
+STARTUP_TIMEOUT = 120
 
-# Load and create prompt template
-with open("system_prompt.txt", "r", encoding="utf-8") as f:
-    template_content = f.read()
+def _load_structured():
+    from datastore import load_datastore
+    from fuzzy import build_fuzzy_index
+    from geo import build_geo_index
+    datastore = load_datastore()
+    return datastore, build_geo_index(datastore), build_fuzzy_index(datastore)
 
-# Get tool names and descriptions
-tool_names = [tool.name for tool in tools]
-tools_str = "\n".join(f"- {tool.name}: {tool.description}" for tool in tools)
+class Components:
+    """The LLM, knowledge base, datastore, tools and agent: everything an answer needs.
 
-prompt = PromptTemplate(
-    template=template_content + "\n\nTools available:\n{tools}\n\nTool Names: {tool_names}\n\nRemember to:\n1. Use Web Search first\n2. Visit found webpages for more details\n3. Process the response\n4. Format the final answer with appropriate emojis\n\nQuestion: {input}\n{agent_scratchpad}",
-    input_variables=["input", "agent_scratchpad", "tools", "tool_names"]
-)
+    Built once per process by :data:`components`, in the background after the
+    server started, so importing this module stays cheap.
+    """
 
-# Initialize the agent with ReAct framework
-agent = create_react_agent(
-    llm=llm,
-    tools=tools,
-    prompt=prompt
-)
+    def __init__(self, stage):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # The structured data does not depend on the LLM or the index
+            structured = executor.submit(_load_structured)
+            with stage("imports"):
+                # LangChain, Chroma and Gemini take seconds to import
+                from langchain.agents import AgentExecutor
+                from langchain.prompts import PromptTemplate
+                from llm import init_llm
+                from rag import init_rag
+                from tools import final_answer, get_tools, get_weather
+                from token_budget import create_budgeted_react_agent
+                from plan_execute import AGENT_MODE, PlanExecuteAgent
+                from router import ROUTER_ENABLED, IntentRouter
+                from http_client import http_client
+                from page_fetcher import page_fetcher
+            with stage("llm"):
+                self.llm = init_llm()
+            with stage("knowledge_base"):
+                self.knowledge_base = init_rag(self.llm)
+                self.knowledge_base.watch()
+            with stage("datastore"):
+                self.datastore, self.geo_index, self.fuzzy_index = structured.result()
+
+        with stage("agent"):
+            self.tools = get_tools(self.knowledge_base, self.datastore, self.geo_index, self.fuzzy_index)
+
+            # Load and create prompt template
+            with open("system_prompt.txt", "r", encoding="utf-8") as f:
+                template_content = f.read()
+
+            # Get tool names and descriptions
+            self.tool_names = [tool.name for tool in self.tools]
+            self.tools_str = "\n".join(f"- {tool.name}: {tool.description}" for tool in self.tools)
+
+            prompt = PromptTemplate(
+                template=template_content + "\n\nTools available:\n{tools}\n\nTool Names: {tool_names}\n\nRemember to:\n1. Use Web Search first\n2. Visit found webpages for more details\n3. Process the response\n4. Format the final answer with appropriate emojis\n\nQuestion: {input}\n{agent_scratchpad}",
+                input_variables=["input", "agent_scratchpad", "tools", "tool_names"]
+            )
+
+            # Initialize the agent with ReAct framework; tool observations are
+            # deduplicated and compressed to a token budget in later prompts
+            agent = create_budgeted_react_agent(
+                llm=self.llm,
+                tools=self.tools,
+                prompt=prompt
+            )
+
+            # Create agent executor with better tool handling
+            self.agent_executor = AgentExecutor(
+                agent=agent,
+                tools=self.tools,
+                verbose=True,
+                handle_parsing_errors=True,
+                max_iterations=8,  # Increased to allow for proper tool sequence
+                return_intermediate_steps=True,
+            ).with_config({"run_name": "Agent"})
+            if AGENT_MODE == "plan":
+                # Independent tools run concurrently between one planning and one answering LLM call
+                self.agent_executor = PlanExecuteAgent(self.llm, self.tools, template_content,
+                                                       fallback=self.agent_executor)
+            elif AGENT_MODE != "react":
+                raise ValueError(f"Unknown AGENT_MODE: {AGENT_MODE!r} (expected 'react' or 'plan')")
+
+        with stage("caches"):
+            # Answers to repeated questions, served without running the agent
+            self.answer_cache = AnswerCache(self.knowledge_base.embedding, place_names=self.datastore.cities())
+
+            # Simple questions (weather, listings, "near X", tournament facts) skip the ReAct loop
+            self.router = IntentRouter(
+                self.datastore,
+                self.geo_index,
+                self.knowledge_base,
+                weather=lambda city, forecast: get_weather.func(city, forecast),
+                format_answer=lambda text: final_answer.func(text)["content"]
+            ) if ROUTER_ENABLED else None
+
+        # Counters of every component, published as gauges on /metrics
+        register_stats("http", http_client.stats)
+        register_stats("pages", page_fetcher.stats)
+        register_stats("datastore", self.datastore.stats)
+        register_stats("fuzzy_index", self.fuzzy_index.stats)
+        register_stats("embedding_cache", self.knowledge_base.embedding.cache.stats)
+        register_stats("answer_cache", self.answer_cache.stats)
+        if self.router:
+            register_stats("router", self.router.stats)
+
+components = LazyComponents(Components)
+
+# Agent runs are blocking, they are executed on a bounded worker pool
+agent_pool = AgentPool()
+
+register_stats("agent_pool", agent_pool.stats)
+register_stats("shared_cache", lambda: get_cache().stats())
+
+# Identical questions asked while one is being answered share its answer
+chat_calls = AsyncSingleFlight()
 
-# Create agent executor with better tool handling
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=tools,
-    verbose=True,
-    handle_parsing_errors=True,
-    max_iterations=8,  # Increased to allow for proper tool sequence
-    return_intermediate_steps=True,
-).with_config({"run_name": "Agent"})
+def singleflight_stats() -> Dict[str, Any]:
+    if not components.ready:
+        return {"chat": chat_calls.stats()}
+    from tools import tool_call_stats
+    return {"chat": chat_calls.stats(), **tool_call_stats()}
+
+register_stats("singleflight", singleflight_stats)
+
+async def get_components() -> Components:
+    """Wait for the components without blocking the event loop; 503 when they are not coming"""
+    if components.ready:
+        return components.get()
+    try:
+        return await asyncio.to_thread(components.get, STARTUP_TIMEOUT)
+    except (TimeoutError, RuntimeError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
 
 class ChatMessage(BaseModel):
     content: str
@@ -76,39 +180,370 @@ def extract_final_answer_generic(steps):
             return step.get("tool_input")
     return None
 
-@app.post("/chat")
-async def chat_endpoint(message: ChatMessage) -> ChatResponse:
+FALLBACK_RESPONSE = "Sorry, I couldn't find an answer to your question. Could you please rephrase or clarify it? 😊"
+
+def run_agent(query: str, callbacks: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """Run the agent synchronously (called from a worker thread)"""
+    # Times every LLM call, tool call and retrieval of the run
+    c = components.get(STARTUP_TIMEOUT)
+    from agent_callbacks import RequestTracer
+    tracer = RequestTracer()
+    try:
+        return c.agent_executor.invoke({
+            "input": query,
+            "tools": c.tools_str,
+            "tool_names": ", ".join(c.tool_names)
+        }, config={"callbacks": [tracer, *(callbacks or [])]})
+    finally:
+        # Its steps are already in the /metrics histograms
+        tracer.finish()
+
+def observe_request(endpoint: str, path: str, started: float):
+    """Record the latency of a chat request answered by ``path`` (cache, fast_path or agent)"""
+    REQUEST_LATENCY.labels(endpoint, path).observe(time.perf_counter() - started)
+
+def wants_bypass(bypass: Optional[str]) -> bool:
+    """Whether the X-Cache-Bypass header asks for a fresh answer"""
+    return bool(bypass) and bypass.lower() not in ("0", "false", "no")
+
+async def cached_answer(c: Components, message: ChatMessage, bypass: Optional[str]):
+    """Look the question up in the answer cache; returns ``(answer, status)``"""
+    if wants_bypass(bypass):
+        CACHE_LOOKUPS.labels("bypass").inc()
+        return None, "bypass"
+    # The similarity tier may embed the question: keep it off the event loop
+    cached, status = await asyncio.to_thread(c.answer_cache.get, message.content, message.language)
+    CACHE_LOOKUPS.labels(status).inc()
+    return cached, status
+
+async def fast_path_answer(c: Components, message: ChatMessage) -> Optional[str]:
+    """Answer through the intent router when the question is simple enough"""
+    if c.router is None:
+        return None
+    try:
+        return await agent_pool.run(c.router.route, message.content, message.language)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+async def answer_message(
+    c: Components,
+    message: ChatMessage,
+    bypass: Optional[str] = None,
+    limiter: Optional[RateLimiter] = None
+) -> Tuple[str, str, str]:
+    """Answer from the answer cache, the fast path, or else the agent.
+
+    Returns ``(response, path, cache status)`` where ``path`` is ``cache``,
+    ``fast_path`` or ``agent``. A question identical (same language and
+    normalized text) to one being answered waits for that answer instead,
+    unless only one of them is rate limited: interactive chat never waits
+    behind a batch run.
+    """
+    key = (*batch_key(message), wants_bypass(bypass), limiter is not None)
+    return await chat_calls.do(key, lambda: _answer_message(c, message, bypass, limiter))
+
+async def _answer_message(
+    c: Components,
+    message: ChatMessage,
+    bypass: Optional[str],
+    limiter: Optional[RateLimiter]
+) -> Tuple[str, str, str]:
+    cached, status = await cached_answer(c, message, bypass)
+    if cached:
+        return cached, "cache", status
+
+    routed = await fast_path_answer(c, message)
+    if routed:
+        await asyncio.to_thread(c.answer_cache.put, message.content, message.language, routed)
+        return routed, "fast_path", status
+
     # Format query with language preference
     query = f"Respond in {message.language}. User query: {message.content}"
-    # Get response from agent with all required variables
-    result = agent_executor.invoke({
-        "input": query,
-        "tools": tools_str,
-        "tool_names": ", ".join(tool_names)
-    })
+    callbacks = None
+    if limiter is not None:
+        # Wait for the rate limiter here rather than on an agent worker
+        await limiter.acquire()
+        from agent_callbacks import RateLimitCallback
+        callbacks = [RateLimitCallback(limiter)]
+    # Get response from agent without blocking the event loop
+    try:
+        result = await agent_pool.run(run_agent, query, callbacks)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     # Extract the final answer from intermediate steps
     steps = result.get("intermediate_steps", [])
     final_answer = extract_final_answer_generic(steps)
 
     # Return the extracted response or a fallback message
     if final_answer:
-        return ChatResponse(response=final_answer)
-    else:
-        return ChatResponse(response="Sorry, I couldn't find an answer to your question. Could you please rephrase or clarify it? 😊")
+        await asyncio.to_thread(c.answer_cache.put, message.content, message.language, final_answer)
+        return final_answer, "agent", status
+    return FALLBACK_RESPONSE, "agent", status
+
+@app.post("/chat")
+async def chat_endpoint(
+    message: ChatMessage,
+    response: Response,
+    x_cache_bypass: Optional[str] = Header(None)
+) -> ChatResponse:
+    started = time.perf_counter()
+    c = await get_components()
+    answer, path, status = await answer_message(c, message, x_cache_bypass)
+    response.headers["X-Cache"] = status.upper()
+    observe_request("chat", path, started)
+    return ChatResponse(response=answer)
+
+# LLM calls of all batch runs of the process share this budget
+batch_llm_limiter = RateLimiter(BATCH_LLM_CALLS_PER_MINUTE / 60)
+# Attempts of a batch question while the agent pool is saturated by interactive traffic
+BATCH_SATURATION_RETRIES = 5
+
+async def chat_batch(
+    messages: List[ChatMessage],
+    concurrency: Optional[int] = None,
+    bypass: Optional[str] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Answer many messages concurrently; yields one result per message as they complete.
+
+    Identical questions are answered once. Agent LLM calls are rate limited
+    and the concurrency never exceeds the agent pool size.
+    """
+    c = await get_components()
+
+    async def answer(message: ChatMessage):
+        started = time.perf_counter()
+        for attempt in range(BATCH_SATURATION_RETRIES):
+            try:
+                response, path, _ = await answer_message(c, message, bypass, batch_llm_limiter)
+                observe_request("chat_batch", path, started)
+                return response, path
+            except HTTPException as e:
+                # Interactive requests have priority: wait for the pool to drain
+                if e.status_code != 503 or attempt == BATCH_SATURATION_RETRIES - 1:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    concurrency = min(concurrency or BATCH_CONCURRENCY, agent_pool.max_in_flight)
+    async for result in run_batch(messages, answer, concurrency):
+        yield result
+
+class BatchRequest(BaseModel):
+    messages: List[ChatMessage]
+    concurrency: Optional[int] = None
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(
+    request: BatchRequest,
+    x_cache_bypass: Optional[str] = Header(None)
+) -> StreamingResponse:
+    """Answer many questions, streamed back as NDJSON lines in completion order.
+
+    Each line holds ``index`` (position in ``messages``), ``response``, ``path``,
+    ``error``, ``seconds`` and ``duplicate_of``.
+    """
+    if len(request.messages) > BATCH_MAX_MESSAGES:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_MESSAGES} messages per batch")
+    if request.concurrency is not None and request.concurrency < 1:
+        raise HTTPException(status_code=422, detail="concurrency must be at least 1")
+    # Fail before streaming when the worker cannot answer at all
+    await get_components()
+
+    async def lines():
+        async for result in chat_batch(request.messages, request.concurrency, x_cache_bypass):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(
+    message: ChatMessage,
+    x_cache_bypass: Optional[str] = Header(None)
+) -> StreamingResponse:
+    """Stream agent progress and the final answer as server-sent events.
+
+    Events: ``tool_start``, ``tool_end``, ``token`` (pieces of the final answer),
+    then ``final`` with the complete response and ``done``.
+    """
+    started = time.perf_counter()
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    c = await get_components()
+    # Uses LangChain callbacks: already imported by the components
+    from streaming import AgentEventStreamer, format_sse
+    cached, status = await cached_answer(c, message, x_cache_bypass)
+    headers["X-Cache"] = status.upper()
+    if cached:
+        async def cached_stream():
+            yield format_sse("start", {})
+            yield format_sse("final", {"response": cached, "cached": True})
+            yield format_sse("done", {})
+            observe_request("chat_stream", "cache", started)
+        return StreamingResponse(cached_stream(), media_type="text/event-stream", headers=headers)
+
+    routed = await fast_path_answer(c, message)
+    if routed:
+        await asyncio.to_thread(c.answer_cache.put, message.content, message.language, routed)
+
+        async def routed_stream():
+            yield format_sse("start", {})
+            yield format_sse("final", {"response": routed})
+            yield format_sse("done", {})
+            observe_request("chat_stream", "fast_path", started)
+        return StreamingResponse(routed_stream(), media_type="text/event-stream", headers=headers)
+
+    query = f"Respond in {message.language}. User query: {message.content}"
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    streamer = AgentEventStreamer(loop, queue)
+    try:
+        future = agent_pool.submit(run_agent, query, [streamer])
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    # Wake the event generator up once the agent run is over
+    future.add_done_callback(lambda _: queue.put_nowait(None))
+
+    async def event_stream():
+        yield format_sse("start", {})
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            event, data = item
+            yield format_sse(event, data)
+
+        try:
+            result = future.result()
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+        else:
+            final_answer = extract_final_answer_generic(result.get("intermediate_steps", []))
+            if final_answer:
+                await asyncio.to_thread(c.answer_cache.put, message.content, message.language, final_answer)
+            yield format_sse("final", {"response": final_answer or FALLBACK_RESPONSE})
+        yield format_sse("done", {})
+        observe_request("chat_stream", "agent", started)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=headers
+    )
+
+def _geo_results(results):
+    return {"results": [{**record, "distance_km": round(distance, 3)} for record, distance in results]}
+
+@app.get("/geo/nearest")
+async def geo_nearest(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=100),
+    kind: Optional[str] = None
+):
+    """k closest geolocated records (hotels, stadiums) to a point"""
+    c = await get_components()
+    return _geo_results(c.geo_index.nearest(lat, lon, k=k, kind=kind))
+
+@app.get("/geo/within")
+async def geo_within(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(..., gt=0, le=1000),
+    kind: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Geolocated records within a radius of a point, closest first"""
+    c = await get_components()
+    return _geo_results(c.geo_index.within(lat, lon, radius_km, kind=kind, limit=limit))
+
+@app.post("/admin/reload-index")
+async def reload_index(full: bool = False):
+    """Re-embed changed records (or rebuild everything) and swap the live index"""
+    c = await get_components()
+    if c.knowledge_base.read_only:
+        raise HTTPException(status_code=409, detail="The index is read-only in this worker: rebuild it with serve.py")
+    stats = await asyncio.to_thread(c.knowledge_base.refresh, full)
+    # Cached answers may quote records that just changed
+    c.answer_cache.clear()
+    return {"status": "ok", "changes": stats, "collection": c.knowledge_base.manifest.get("collection")}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request, LLM, tool and retrieval histograms plus component counters"""
+    body, content_type = await asyncio.to_thread(render_metrics)
+    return Response(content=body, media_type=content_type)
+
+# Components the chat cannot answer without: the service is unhealthy when one is down
+CRITICAL_COMPONENTS = ("llm", "rag")
+
+def check_components(c: Components) -> Dict[str, str]:
+    """``operational``, ``degraded`` or ``down`` for each component"""
+    checks = {}
+    last_llm = llm_status()
+    checks["llm"] = "degraded" if last_llm["ok"] is False else "operational"
+    try:
+        indexed = c.knowledge_base.size()
+    except Exception as e:
+        print(f"Health check of the vector store failed: {e}")
+        indexed = 0
+    checks["rag"] = "operational" if indexed else "down"
+    pool = agent_pool.stats()
+    checks["agent"] = "degraded" if pool["queued"] >= pool["max_queue"] else "operational"
+    checks["datastore"] = "operational" if all(c.datastore.stats().values()) else "degraded"
+    from http_client import http_client
+    open_circuits = [host for host, counters in http_client.stats().items() if counters["circuit"] == "open"]
+    checks["upstreams"] = "degraded" if open_circuits else "operational"
+    return checks
+
+@app.get("/ready")
+async def readiness(response: Response):
+    """Readiness probe: 200 once the index and the agent are loaded, 503 until then"""
+    startup = components.status()
+    if startup["state"] != "ready":
+        response.status_code = 503
+    return {"ready": startup["state"] == "ready", "startup": startup}
 
 @app.get("/health")
-async def health_check():
-    """Health check endpoint"""
+async def health_check(response: Response):
+    """Real checks of the components: 503 when the chat cannot answer at all"""
+    if not components.ready:
+        response.status_code = 503
+        return {"status": "starting", "timestamp": datetime.now().isoformat(), "startup": components.status()}
+    c = components.get()
+    from http_client import http_client
+    from page_fetcher import page_fetcher
+    checks = await asyncio.to_thread(check_components, c)
+    if any(checks[name] == "down" for name in CRITICAL_COMPONENTS):
+        status = "unhealthy"
+        response.status_code = 503
+    elif all(state == "operational" for state in checks.values()):
+        status = "healthy"
+    else:
+        status = "degraded"
     return {
-        "status": "healthy",
-        "components": {
-            "llm": "operational",
-            "agent": "operational",
-            "rag": "operational",
-            "timestamp": datetime.now().isoformat()
-        }
+        "status": status,
+        "timestamp": datetime.now().isoformat(),
+        "components": checks,
+        "startup": components.status(),
+        "agent_pool": agent_pool.stats(),
+        "embedding_cache": c.knowledge_base.embedding.cache.stats(),
+        "answer_cache": c.answer_cache.stats(),
+        "router": c.router.stats() if c.router else None,
+        "http": http_client.stats(),
+        "pages": page_fetcher.stats(),
+        "shared_cache": get_cache().stats(),
+        "singleflight": singleflight_stats()
     }
 
+@app.on_event("startup")
+def start_components():
+    # Load the index and the agent while the server already answers /ready and /health
+    components.start()
+
+@app.on_event("shutdown")
+def shutdown_agent_pool():
+    agent_pool.shutdown()
+    from http_client import http_client
+    http_client.close()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("api:app", host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from answer_cache import normalize_query
+
+load_dotenv()
+
+# Questions of one batch answered at the same time (capped by the agent pool size)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# LLM calls per minute of all batch runs together, interactive chat is not limited
+BATCH_LLM_CALLS_PER_MINUTE = float(os.getenv("BATCH_LLM_CALLS_PER_MINUTE", "60"))
+# Messages accepted in one batch request
+BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", "500"))
+
+class RateLimiter:
+    """Token bucket shared by the batch runs of the process.
+
+    Runs :meth:`acquire` a token in the event loop before they take an agent
+    worker, so waiting never holds a pool slot. Calls made once the run is on
+    a worker are :meth:`charge`-d instead: they go ahead and the debt delays
+    the next :meth:`acquire`, which keeps the rate over time.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _reserve(self) -> float:
+        """Take a token; returns the seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        delay = self._reserve()
+        if delay:
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+    def charge(self):
+        """Take a token without waiting for it"""
+        if self.rate > 0:
+            self._reserve()
+
+def batch_key(message) -> Tuple[str, str]:
+    """Messages with the same key get the same answer"""
+    return (message.language or "en", normalize_query(message.content))
+
+async def run_batch(
+    messages: List[Any],
+    answer: Callable[[Any], Awaitable[Tuple[str, str]]],
+    concurrency: int = BATCH_CONCURRENCY
+) -> AsyncIterator[Dict[str, Any]]:
+    """Answer ``messages`` at most ``concurrency`` at a time, yielding results as they complete.
+
+    ``answer(message)`` returns ``(response, path)``. Duplicates are answered
+    once and reported for each of their indexes, with ``duplicate_of`` set to
+    the first one. A failed question yields an ``error`` instead of a response.
+    """
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for index, message in enumerate(messages):
+        groups.setdefault(batch_key(message), []).append(index)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(indexes: List[int]):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response, path = await answer(messages[indexes[0]])
+                outcome = {"response": response, "path": path, "error": None}
+            except Exception as e:
+                outcome = {"response": None, "path": None, "error": getattr(e, "detail", None) or str(e)}
+            outcome["seconds"] = round(time.perf_counter() - started, 3)
+            return indexes, outcome
+
+    tasks = [asyncio.create_task(run(indexes)) for indexes in groups.values()]
+    try:
+        for task in asyncio.as_completed(tasks):
+            indexes, outcome = await task
+            for index in indexes:
+                yield {"index": index, **outcome, "duplicate_of": indexes[0] if index != indexes[0] else None}
+    finally:
+        # The client went away: questions still waiting are not started
+        for task in tasks:
+            task.cancel()
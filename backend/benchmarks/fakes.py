@@ -0,0 +1,96 @@
+"""Deterministic local stand-ins for Gemini, the embedding model and the upstream APIs."""
+import hashlib
+import json
+import time
+from typing import List
+
+import httpx
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+FAKE_PAGE = ("<html><head><script>track()</script></head><body><nav>Menu</nav><main>"
+             "<h1>AFCON 2025</h1><p>The tournament runs from 21 December 2025 to 18 January 2026.</p>"
+             + "<p>Six host cities welcome 24 teams.</p>" * 50 + "</main><footer>Footer</footer></body></html>")
+
+class FakeChatModel(BaseChatModel):
+    """Scripted model: the tool calls of ``actions`` one at a time (ReAct) or all
+    at once (plan-and-execute), then the final answer.
+
+    Knowledge base (RetrievalQA) prompts get a fixed short answer. ``latency``
+    seconds are slept per call to mimic a remote model when needed.
+    """
+    latency: float = 0.0
+    calls: int = 0
+    actions: list = [("CAN Knowledge Base", "AFCON 2025 start date")]
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-react"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1].content
+        answer = "🏆 AFCON 2025 starts on 21 December 2025 in Morocco."
+        done = prompt.split("Question:")[-1].count("Observation:")
+        if "Helpful Answer" in prompt:
+            text = "The tournament starts on 21 December 2025."
+        elif "Reply with a JSON list" in prompt:
+            text = json.dumps([{"tool": tool, "input": tool_input} for tool, tool_input in self.actions])
+        elif "Tool results:" in prompt:
+            text = answer
+        elif done < len(self.actions):
+            tool, tool_input = self.actions[done]
+            text = f"Thought: I should use {tool}\nAction: {tool}\nAction Input: {tool_input}"
+        else:
+            text = f"Thought: I now know the final answer\nAction: Final Answer\nAction Input: {answer}"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+class FakeEmbeddings(Embeddings):
+    """Unit vectors derived from a hash of the text: same text, same vector"""
+    model = "fake-embedding"
+
+    def __init__(self, dimensions: int = 64):
+        self.dimensions = dimensions
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+def _fake_upstream(request: httpx.Request) -> httpx.Response:
+    """Canned answers of Nominatim, Open-Meteo, SerpAPI and any web page"""
+    host, path = request.url.host, request.url.path
+    if "nominatim" in host:
+        return httpx.Response(200, json=[{"lat": "33.0", "lon": "-7.6", "display_name": "Somewhere, Maroc"}])
+    if "open-meteo" in host:
+        count = len(request.url.params.get("latitude", "0").split(","))
+        if "daily" in request.url.params:
+            item = {"daily": {"time": ["2025-12-21"] * 7, "temperature_2m_max": [20] * 7,
+                              "temperature_2m_min": [11] * 7, "precipitation_probability_mean": [5] * 7,
+                              "weathercode": [1] * 7}}
+        else:
+            item = {"current_weather": {"temperature": 18.5, "windspeed": 9.0, "weathercode": 0}}
+        return httpx.Response(200, json=item if count == 1 else [item] * count)
+    if "serpapi" in host or path.endswith("search.json"):
+        results = [{"title": f"Result {i}", "snippet": "AFCON 2025 in Morocco", "link": f"https://example.com/{i}"}
+                   for i in range(3)]
+        return httpx.Response(200, content=json.dumps({"organic_results": results}),
+                              headers={"Content-Type": "application/json"})
+    return httpx.Response(200, content=FAKE_PAGE.encode("utf-8"), headers={"Content-Type": "text/html"})
+
+def stub_network():
+    """Answer every outbound tool request locally, through the real shared client"""
+    from http_client import http_client
+    http_client.close()
+    http_client.transport = httpx.MockTransport(_fake_upstream)
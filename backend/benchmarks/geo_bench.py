@@ -0,0 +1,76 @@
+"""Latency of the geospatial index as the number of points grows.
+
+Run from the ``backend`` directory::
+
+    python -m benchmarks.geo_bench
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from geo import GeoIndex, haversine_km
+
+# Bounding box of Morocco, where the synthetic points are drawn
+LAT_RANGE = (27.6, 35.9)
+LON_RANGE = (-13.2, -1.0)
+
+def synthetic_records(count: int, rng: np.random.Generator):
+    lats = rng.uniform(*LAT_RANGE, count)
+    lons = rng.uniform(*LON_RANGE, count)
+    return [
+        {"kind": "hotel" if i % 2 else "stadium", "name": f"place-{i}", "city": "",
+         "latitude": float(lat), "longitude": float(lon), "id": i}
+        for i, (lat, lon) in enumerate(zip(lats, lons))
+    ]
+
+def time_queries(func, points, repeat: int = 1):
+    timings = []
+    for lat, lon in points:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(lat, lon)
+        timings.append((time.perf_counter() - start) / repeat * 1e6)
+    return statistics.median(timings), float(np.percentile(timings, 95))
+
+def run(sizes, queries: int = 200, k: int = 10, radius_km: float = 5.0, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    points = list(zip(rng.uniform(*LAT_RANGE, queries), rng.uniform(*LON_RANGE, queries)))
+    results = []
+    for size in sizes:
+        records = synthetic_records(size, rng)
+        start = time.perf_counter()
+        index = GeoIndex(records)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        def brute_force(lat, lon):
+            distances = haversine_km(lat, lon, index.lats, index.lons)
+            return np.argpartition(distances, k - 1)[:k]
+
+        results.append({
+            "points": size,
+            "build_ms": round(build_ms, 2),
+            "knn_p50_us": round(time_queries(lambda la, lo: index.nearest(la, lo, k), points)[0], 1),
+            "knn_p95_us": round(time_queries(lambda la, lo: index.nearest(la, lo, k), points)[1], 1),
+            "radius_p50_us": round(time_queries(lambda la, lo: index.within(la, lo, radius_km), points)[0], 1),
+            "brute_knn_p50_us": round(time_queries(brute_force, points)[0], 1),
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--radius", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rows = run(args.sizes, queries=args.queries, k=args.k, radius_km=args.radius)
+    headers = list(rows[0])
+    print(" | ".join(f"{h:>16}" for h in headers))
+    for row in rows:
+        print(" | ".join(f"{row[h]:>16}" for h in headers))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""Offline benchmark of the chat pipeline with a fake LLM, fake embeddings and stubbed upstream APIs.
+
+Measures our own overhead stage by stage: record chunking, index build,
+hybrid retrieval, agent steps, answer post-processing and end-to-end
+``/chat``. Run from the ``backend`` directory::
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare results.json
+
+Everything written (vector store, caches) goes to a temporary directory.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RETRIEVAL_QUERIES = [
+    "PHARMACIE ASSEHA",
+    "type=pharmacies city=Sale night pharmacy",
+    "Four Seasons Casablanca",
+    "When does AFCON 2025 start?",
+    "type=restaurants city=Marrakech luxury restaurant",
+    "hospitals in Rabat",
+]
+
+# Misspelled, unaccented or differently cased names, cities and addresses
+FUZZY_QUERIES = ["Fes", "Sale", "Au Bon Delice", "Marakech", "Four Seson Casablanca", "pharmacie asseha sale"]
+
+# Fewer results than this per stage makes percentiles meaningless
+MIN_SAMPLES = 5
+
+# Agent steps of the long transcript (about 200 KB of output) and characters per streamed chunk
+LONG_TRANSCRIPT_STEPS = 200
+STREAM_CHUNK_CHARS = 16
+
+# Seconds per LLM call when comparing the agent modes: their difference is the number of calls
+MODE_LLM_LATENCY = 0.05
+
+# Time for a new worker process, from its spawn, to import the API and build its components from an existing index
+STARTUP_TARGET_MS = 1000
+
+def timed(func, repeat: int):
+    """Per-call durations in milliseconds"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1e3)
+    return durations
+
+def summary(durations, unit: str = "ms"):
+    scale = 1e3 if unit == "us" else 1.0
+    values = sorted(d * scale for d in durations)
+    p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+    return {f"p50_{unit}": round(statistics.median(values), 3), f"p95_{unit}": round(p95, 3), "samples": len(values)}
+
+def prepare_workdir() -> str:
+    """Temporary working directory seeing the real data files and prompt"""
+    workdir = tempfile.mkdtemp(prefix="afcon-bench-")
+    os.makedirs(os.path.join(workdir, "database"))
+    os.symlink(os.path.join(BACKEND_DIRECTORY, "database", "data_processed"),
+               os.path.join(workdir, "database", "data_processed"))
+    os.symlink(os.path.join(BACKEND_DIRECTORY, "system_prompt.txt"), os.path.join(workdir, "system_prompt.txt"))
+    return workdir
+
+def synthetic_transcript(steps: int = 6) -> str:
+    """Verbose agent output shaped like a real run, for the post-processing stage"""
+    lines = ["> Entering new AgentExecutor chain...", "Hello! I'm ready to help you with AFCON 2025."]
+    for i in range(steps):
+        lines += [
+            f"Thought: step {i}, I need more information",
+            "Action: Web Search",
+            f"Action Input: AFCON 2025 question {i}",
+            "Information from Web:",
+            *(f"Result {j}: the tournament in Morocco, stadium {j} in Rabat" for j in range(8)),
+            "Information from Database:",
+            *(f"Record {j}: hotel {j} near Prince Moulay Abdellah Stadium" for j in range(8)),
+        ]
+    lines += ["Based on my research, here is the answer.", "Action: Final Answer",
+              "AFCON 2025 starts on 21 December 2025.", "> Finished chain."]
+    return "\n".join(lines)
+
+# Run in a new interpreter: timings of a worker joining with the index already built, from the
+# moment the parent spawned it (interpreter startup included)
+WORKER_START = """
+import json, os, time
+spawned = float(os.environ["BENCHMARK_SPAWNED_AT"])
+import api
+listening = time.time() - spawned
+# Offline stand-ins for Gemini and the upstream APIs. Importing llm and rag here is
+# part of the build anyway: its imports stage only finds them already loaded
+start = time.time()
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, stub_network
+stub_network()
+import llm, rag
+llm.init_llm = lambda: FakeChatModel()
+rag.get_embedding = lambda *args, **kwargs: FakeEmbeddings()
+setup = time.time() - start
+api.components.get()
+ready = time.time() - spawned
+stages = {f"{name}_ms": round(seconds * 1e3, 1) for name, seconds in api.components.status()["stages"].items()}
+print(json.dumps({"worker_listening_ms": round(listening * 1e3, 1), "worker_ready_ms": round(ready * 1e3, 1),
+                  "offline_setup_ms": round(setup * 1e3, 1), **stages}))
+"""
+
+def worker_start():
+    """Import and initialization timings of a new worker process"""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [BACKEND_DIRECTORY, os.environ.get("PYTHONPATH")])),
+           "BENCHMARK_SPAWNED_AT": repr(time.time())}
+    output = subprocess.run([sys.executable, "-c", WORKER_START], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def run(repeat: int, llm_latency: float):
+    from benchmarks.fakes import FakeChatModel, FakeEmbeddings, stub_network
+
+    stub_network()
+    import llm
+    import rag
+    llm.init_llm = lambda: FakeChatModel(latency=llm_latency)
+    rag.get_embedding = lambda *args, **kwargs: FakeEmbeddings()
+    results = {}
+
+    # Chunking: JSON records to documents
+    sources = {}
+    for name in sorted(os.listdir(rag.DATA_DIRECTORY)):
+        if name.endswith(".json"):
+            with open(os.path.join(rag.DATA_DIRECTORY, name), "r", encoding="utf-8") as f:
+                sources[name] = json.load(f)
+
+    def chunk_all():
+        return [doc for name, data in sources.items() for doc in rag.process_json_data(data, name)]
+
+    durations = timed(chunk_all, max(repeat // 4, MIN_SAMPLES))
+    documents = chunk_all()
+    results["chunking"] = {**summary(durations), "documents": len(documents)}
+
+    # Index build, cold then with every embedding already cached
+    from embedding_cache import CachedEmbeddings, EmbeddingCache
+    embedding = CachedEmbeddings(FakeEmbeddings(), EmbeddingCache())
+    os.makedirs(rag.PERSIST_DIRECTORY, exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        vectorstore, _ = rag.create_vector_store(embedding)
+        cold_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        rag.create_vector_store(embedding)
+        warm_ms = (time.perf_counter() - start) * 1e3
+    results["index_build"] = {"cold_ms": round(cold_ms, 1), "cached_embeddings_ms": round(warm_ms, 1)}
+
+    # Hybrid retrieval (vector + BM25 + fusion)
+    from bm25 import BM25Index
+    start = time.perf_counter()
+    bm25 = BM25Index(documents)
+    bm25_ms = (time.perf_counter() - start) * 1e3
+    retriever = rag.HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=5)
+    durations = []
+    for _ in range(max(repeat // len(RETRIEVAL_QUERIES), 1)):
+        for query in RETRIEVAL_QUERIES:
+            durations += timed(lambda: retriever.get_relevant_documents(query), 1)
+    results["retrieval"] = {**summary(durations), "bm25_build_ms": round(bm25_ms, 1)}
+
+    # Fuzzy name lookup over the structured tables
+    from datastore import load_datastore
+    from fuzzy import build_fuzzy_index
+    with contextlib.redirect_stdout(io.StringIO()):
+        datastore = load_datastore()
+    start = time.perf_counter()
+    fuzzy_index = build_fuzzy_index(datastore)
+    fuzzy_build_ms = (time.perf_counter() - start) * 1e3
+    durations = []
+    for _ in range(repeat):
+        for query in FUZZY_QUERIES:
+            durations += timed(lambda: fuzzy_index.search(query), 1)
+    results["fuzzy_lookup"] = {**summary(durations, unit="us"), "build_ms": round(fuzzy_build_ms, 1),
+                               **fuzzy_index.stats()}
+
+    # Answer post-processing: a usual run, a long one, and the long one streamed token by token
+    from postprocess import TerminalBlockParser, format_blocks
+    from tools import extract_terminal_blocks, format_response_from_blocks
+    transcript = synthetic_transcript()
+    durations = timed(lambda: format_response_from_blocks(extract_terminal_blocks(transcript)), repeat * 10)
+    results["post_processing"] = summary(durations, unit="us")
+    long_transcript = synthetic_transcript(LONG_TRANSCRIPT_STEPS)
+    durations = timed(lambda: format_response_from_blocks(extract_terminal_blocks(long_transcript)), repeat)
+    results["post_processing_long"] = {**summary(durations), "chars": len(long_transcript)}
+
+    def streamed():
+        parser = TerminalBlockParser()
+        for i in range(0, len(long_transcript), STREAM_CHUNK_CHARS):
+            parser.feed(long_transcript[i:i + STREAM_CHUNK_CHARS])
+        return format_blocks(parser.close())
+    durations = timed(streamed, repeat)
+    results["post_processing_stream"] = {**summary(durations), "chunk_chars": STREAM_CHUNK_CHARS}
+
+    # Startup: the first component build creates the index; a new worker then
+    # starts in a fresh process and finds it on disk
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        import api
+        import_ms = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        api.components.get()
+        first_ms = (time.perf_counter() - start) * 1e3
+    worker = worker_start()
+    results["startup"] = {"api_import_ms": round(import_ms, 1), "first_init_ms": round(first_ms, 1), **worker,
+                          "within_target": worker["worker_ready_ms"] <= STARTUP_TARGET_MS}
+
+    # Agent loop overhead: a scripted run (knowledge base lookup, then the final answer)
+    fake_llm = api.components.get().llm
+    with contextlib.redirect_stdout(io.StringIO()):
+        calls_before = fake_llm.calls
+        durations = timed(lambda: api.run_agent("Respond in en. User query: When does AFCON start?"), repeat)
+        llm_calls = (fake_llm.calls - calls_before) / len(durations)
+    results["agent"] = {**summary(durations), "llm_calls_per_run": round(llm_calls, 2),
+                        "overhead_per_llm_call_ms": round(statistics.median(durations) / max(llm_calls, 1)
+                                                          - llm_latency * 1e3, 3)}
+
+    # ReAct against plan-and-execute on a question needing three independent tools,
+    # with every LLM call taking MODE_LLM_LATENCY at least
+    from plan_execute import PlanExecuteAgent
+    components = api.components.get()
+    with open("system_prompt.txt", "r", encoding="utf-8") as f:
+        system_prompt = f.read()
+    agents = {
+        "react": components.agent_executor,
+        "plan": PlanExecuteAgent(fake_llm, components.tools, system_prompt, fallback=components.agent_executor),
+    }
+    inputs = {"input": "Respond in en. User query: Stadiums, weather and fan zones in Rabat?",
+              "tools": components.tools_str, "tool_names": ", ".join(components.tool_names)}
+    default_actions, default_latency = fake_llm.actions, fake_llm.latency
+    fake_llm.actions = [("CAN Knowledge Base", "stadiums in Rabat"), ("Weather Info", "Rabat"),
+                        ("Web Search", "AFCON 2025 Rabat fan zone")]
+    fake_llm.latency = max(llm_latency, MODE_LLM_LATENCY)
+    modes = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for mode, agent in agents.items():
+            calls_before = fake_llm.calls
+            durations = timed(lambda: agent.invoke(inputs), max(repeat // 4, MIN_SAMPLES))
+            modes[mode] = {**summary(durations), "llm_calls_per_run": round((fake_llm.calls - calls_before) / len(durations), 2)}
+    fake_llm.actions, fake_llm.latency = default_actions, default_latency
+    results["agent_react"], results["agent_plan"] = modes["react"], modes["plan"]
+
+    # End-to-end /chat: agent path, fast path and answer cache hit
+    from fastapi.testclient import TestClient
+    client = TestClient(api.app)
+    bypass = {"X-Cache-Bypass": "1"}
+
+    def chat(content, headers=None):
+        response = client.post("/chat", json={"content": content, "role": "user"}, headers=headers or {})
+        response.raise_for_status()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["chat_agent"] = summary(timed(lambda: chat("Tell me about Moroccan culture", bypass), repeat))
+        results["chat_fast_path"] = summary(timed(lambda: chat("pharmacies in Sale", bypass), repeat))
+        chat("When does AFCON 2025 start?")
+        results["chat_cache_hit"] = summary(timed(lambda: chat("When does AFCON 2025 start?"), repeat))
+    return results
+
+def compare(baseline, current, threshold: float):
+    """Print metric changes; return the timing metrics slower than ``threshold``"""
+    regressions = []
+    print(f"{'metric':<44} {'baseline':>12} {'current':>12} {'change':>8}")
+    for stage, metrics in current.items():
+        for name, value in metrics.items():
+            before = baseline.get(stage, {}).get(name)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+                continue
+            change = (value - before) / before if before else 0.0
+            timing = name.endswith(("_ms", "_us"))
+            flag = ""
+            if timing and change > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{stage}.{name}")
+            print(f"{stage + '.' + name:<44} {before:>12} {value:>12} {change:>+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="samples per timed stage")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds slept per fake LLM call")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown flagged as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Resolve user paths before moving to the scratch directory
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    sys.path.insert(0, BACKEND_DIRECTORY)
+    os.environ["RAG_WATCH_INTERVAL"] = "0"
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.chdir(prepare_workdir())
+
+    results = run(args.repeat, args.llm_latency)
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "llm_latency": args.llm_latency,
+        },
+        "results": results,
+    }
+    print(json.dumps(results, indent=2))
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from datastore import normalize_text
+
+# Phone numbers and identifiers written with separators ("05 22-31 45 67")
+_DIGIT_RUN = re.compile(r"\+?\d[\d\s.\-/]{4,}\d")
+
+def tokenize(text: str) -> List[str]:
+    """Accent- and case-insensitive words, plus separator-free forms of digit runs"""
+    tokens = normalize_text(text).split()
+    for run in _DIGIT_RUN.findall(text or ""):
+        digits = re.sub(r"\D", "", run)
+        if digits not in tokens:
+            tokens.append(digits)
+    return tokens
+
+class BM25Index:
+    """Okapi BM25 over the knowledge base documents.
+
+    Catches what dense retrieval misses: exact names, INPE and phone numbers.
+    Postings are kept per token, so a query only scores the documents sharing
+    at least one of its tokens.
+    """
+
+    def __init__(self, documents: List[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths = []
+        for doc_id, doc in enumerate(documents):
+            counts = Counter(tokenize(doc.page_content))
+            self.lengths.append(sum(counts.values()))
+            for token, count in counts.items():
+                self.postings[token].append((doc_id, count))
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        total = len(documents)
+        self.idf = {
+            token: math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+            for token, posting in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query: str, k: int = 5, filters: Optional[Dict[str, str]] = None) -> List[Tuple[Document, float]]:
+        """The ``k`` best-scoring documents whose metadata match ``filters``"""
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if not posting:
+                continue
+            idf = self.idf[token]
+            for doc_id, count in posting:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / self.average_length)
+                scores[doc_id] += idf * count * (self.k1 + 1) / (count + norm)
+
+        if filters:
+            scores = {
+                doc_id: score for doc_id, score in scores.items()
+                if all(self.documents[doc_id].metadata.get(key) == value for key, value in filters.items())
+            }
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.documents[doc_id], score) for doc_id, score in best]
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 5, rrf_k: int = 60) -> List[Document]:
+    """Merge ranked lists: each document scores the sum of 1 / (rrf_k + rank) over the lists"""
+    scores = defaultdict(float)
+    documents = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc.metadata.get("record_id") or doc.page_content
+            scores[key] += 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in best]
@@ -0,0 +1,153 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "sqlite" (one file shared by every worker process of the host) or "redis" (shared by every host)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite").lower()
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", os.path.join("database", "cache", "shared.sqlite"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Entries kept per namespace; the oldest ones are evicted beyond this
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+class CacheBackend(ABC):
+    """Key/value store with TTLs, shared between worker processes.
+
+    Values are JSON-serializable. Keys live in namespaces (one per tool) so
+    each can have its own size limit.
+    """
+
+    def __init__(self):
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def _record(self, hit: bool):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        value = self._get(namespace, key)
+        self._record(value is not None)
+        return value
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        self._set(namespace, key, value, ttl)
+        with self._counter_lock:
+            self.writes += 1
+
+    @abstractmethod
+    def _get(self, namespace: str, key: str) -> Optional[Any]:
+        """The unexpired value of ``key``, or None"""
+
+    @abstractmethod
+    def _set(self, namespace: str, key: str, value: Any, ttl: float):
+        """Store ``value`` for ``ttl`` seconds"""
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counter_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+class SQLiteCache(CacheBackend):
+    """Cache in a local SQLite file (WAL mode: concurrent readers across processes)"""
+
+    def __init__(self, path: str = SHARED_CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Waits for the write lock held by another worker instead of failing
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_age ON cache (namespace, created_at)")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def _get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, namespace: str, key: str, value: Any, ttl: float):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, ensure_ascii=False), now, now + ttl)
+            )
+            self._db.execute("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (namespace, now))
+            # Evict the oldest entries beyond the size limit
+            self._db.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache WHERE namespace = ? ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (namespace, namespace, self.max_entries)
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats["entries"] = self._db.execute(
+                "SELECT COUNT(*) FROM cache WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+        return stats
+
+class RedisCache(CacheBackend):
+    """Cache in Redis, shared by every host. Size is bounded by the server's maxmemory policy."""
+
+    def __init__(self, url: str = REDIS_URL):
+        super().__init__()
+        # Optional dependency, only needed with CACHE_BACKEND=redis
+        import redis
+        self._redis = redis.Redis.from_url(url)
+
+    def _get(self, namespace: str, key: str) -> Optional[Any]:
+        value = self._redis.get(f"{namespace}:{key}")
+        return json.loads(value) if value is not None else None
+
+    def _set(self, namespace: str, key: str, value: Any, ttl: float):
+        self._redis.set(f"{namespace}:{key}", json.dumps(value, ensure_ascii=False), ex=max(1, int(ttl)))
+
+_shared_cache: Optional[CacheBackend] = None
+_shared_lock = threading.Lock()
+
+def get_cache(backend: str = CACHE_BACKEND) -> CacheBackend:
+    """Return the process-wide cache selected by ``CACHE_BACKEND``"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            if backend == "sqlite":
+                _shared_cache = SQLiteCache()
+            elif backend == "redis":
+                _shared_cache = RedisCache()
+            else:
+                raise ValueError(f"Unknown CACHE_BACKEND: {backend!r} (expected 'sqlite' or 'redis')")
+        return _shared_cache
@@ -0,0 +1,478 @@
+import bisect
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DATA_DIRECTORY = os.path.join("database", "data_processed")
+
+# Spellings used across the data files for the same place
+CITY_ALIASES = {
+    "tangier": "tanger",
+    "tangiers": "tanger",
+    "fez": "fes",
+    "marrakesh": "marrakech",
+    "casa": "casablanca",
+    "casa anfa": "casablanca",
+    "laayoune": "laayoune",
+    "tetuan": "tetouan",
+}
+
+# Administrative prefixes found in restaurant communes ("CT OUARZAZATE", "CU,SAFI"...)
+_COMMUNE_PREFIX = re.compile(r"^(?:ct|cu|cr)\s+")
+_COMMUNE_SUFFIX = re.compile(r"\s*\((?:mun|ct|cr)\.?\)\s*$", re.IGNORECASE)
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+class _CombiningMarks(dict):
+    """``str.translate`` table deleting combining marks, filled as characters are met"""
+
+    def __missing__(self, code: int):
+        self[code] = "" if unicodedata.combining(chr(code)) else code
+        return self[code]
+
+_COMBINING_MARKS = _CombiningMarks()
+
+def normalize_text(value: Any) -> str:
+    """Lower-case, strip accents and punctuation so that "Fès", "FES" and "fes" match"""
+    if value is None:
+        return ""
+    text = unicodedata.normalize("NFKD", str(value))
+    if not text.isascii():
+        text = text.translate(_COMBINING_MARKS)
+    return _NON_ALNUM.sub(" ", text.casefold()).strip()
+
+def normalize_city(value: Any) -> str:
+    """Normalize a city/commune name and map known aliases to one spelling"""
+    text = normalize_text(_COMMUNE_SUFFIX.sub("", str(value or "")))
+    text = _COMMUNE_PREFIX.sub("", text)
+    return CITY_ALIASES.get(text, text)
+
+def _clean(value: Any) -> Optional[Any]:
+    """Turn pandas' NaN leftovers into None"""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+@dataclass
+class Hotel:
+    hotel_id: str
+    name: str
+    city: str
+    nearest_stadium: str
+    distance_km: float
+    stars: int
+    price_usd: float
+    price_range: str
+    address: str
+    phone: str
+    website: str
+    amenities: List[str] = field(default_factory=list)
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    def describe(self) -> str:
+        return (f"🏨 {self.name} ({self.stars}★, {self.city}) - ${self.price_usd:g}/night - "
+                f"{self.distance_km:g} km from {self.nearest_stadium} - {self.address} - "
+                f"📞 {self.phone} - {self.website}")
+
+@dataclass
+class Pharmacy:
+    inpe: str
+    name: str
+    address: str
+    city: str
+
+    def describe(self) -> str:
+        return f"💊 {self.name} - {self.address}, {self.city} (INPE {self.inpe})"
+
+@dataclass
+class Restaurant:
+    name: str
+    ranking: str
+    region: str
+    commune: str
+    city: str
+    address: str
+    phone: str
+
+    def describe(self) -> str:
+        return f"🍽️ {self.name} ({self.ranking}) - {self.address}, {self.city} - 📞 {self.phone}"
+
+@dataclass
+class Hospital:
+    name: str
+    region: str
+    delegation: str
+    commune: str
+    category: str
+    category_label: str
+
+    def describe(self) -> str:
+        label = f"{self.category} - {self.category_label}" if self.category_label else self.category
+        return f"🏥 {self.name} ({label}) - {self.commune}, {self.delegation}, {self.region}"
+
+class Table:
+    """Read-only table of records with hash and sorted indexes.
+
+    ``hash_keys`` maps an index name to a function returning the normalized key(s)
+    of a row; ``sorted_keys`` maps an index name to a numeric attribute.
+    """
+
+    def __init__(self, name: str, rows: List[Any],
+                 hash_keys: Dict[str, Callable[[Any], Iterable[str]]],
+                 sorted_keys: Iterable[str] = ()):
+        self.name = name
+        self.rows = rows
+        self.hash_indexes: Dict[str, Dict[str, List[int]]] = {}
+        self.sorted_indexes: Dict[str, Tuple[List[float], List[int]]] = {}
+
+        for key, extract in hash_keys.items():
+            index = defaultdict(list)
+            for row_id, row in enumerate(rows):
+                for value in set(extract(row)):
+                    if value:
+                        index[value].append(row_id)
+            self.hash_indexes[key] = dict(index)
+
+        for key in sorted_keys:
+            pairs = sorted(
+                (getattr(row, key), row_id) for row_id, row in enumerate(rows)
+                if getattr(row, key) is not None
+            )
+            self.sorted_indexes[key] = ([value for value, _ in pairs], [row_id for _, row_id in pairs])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def keys(self, index: str) -> List[str]:
+        """Return the distinct values of a hash index"""
+        return list(self.hash_indexes[index])
+
+    def select(self, equals: Optional[Dict[str, str]] = None,
+               ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+               order_by: Optional[str] = None, descending: bool = False,
+               limit: Optional[int] = None) -> List[Any]:
+        """Return rows matching every equality and (inclusive) range condition"""
+        candidates: Optional[set] = None
+
+        for key, value in (equals or {}).items():
+            ids = self.hash_indexes[key].get(value, [])
+            candidates = set(ids) if candidates is None else candidates.intersection(ids)
+            if not candidates:
+                return []
+
+        for key, (low, high) in (ranges or {}).items():
+            values, ids = self.sorted_indexes[key]
+            start = 0 if low is None else bisect.bisect_left(values, low)
+            end = len(values) if high is None else bisect.bisect_right(values, high)
+            in_range = ids[start:end]
+            candidates = set(in_range) if candidates is None else candidates.intersection(in_range)
+            if not candidates:
+                return []
+
+        if order_by:
+            ordered = self.sorted_indexes[order_by][1]
+            if descending:
+                ordered = reversed(ordered)
+            result = []
+            for row_id in ordered:
+                if candidates is None or row_id in candidates:
+                    result.append(self.rows[row_id])
+                    if limit and len(result) >= limit:
+                        break
+            return result
+
+        row_ids = range(len(self.rows)) if candidates is None else sorted(candidates)
+        if limit:
+            row_ids = list(row_ids)[:limit]
+        return [self.rows[row_id] for row_id in row_ids]
+
+def _read_json(file_name: str) -> Dict[str, Any]:
+    with open(os.path.join(DATA_DIRECTORY, file_name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _load_hotels() -> List[Hotel]:
+    hotels = []
+    for item in _read_json("hotels.json").get("hotels", []):
+        coordinates = item.get("Coordinates") or {}
+        hotels.append(Hotel(
+            hotel_id=item.get("Hotel_ID", ""),
+            name=item.get("Hotel_Name", ""),
+            city=item.get("City", ""),
+            nearest_stadium=item.get("Nearest_Stadium", ""),
+            distance_km=float(item.get("Distance_to_Stadium_KM") or 0),
+            stars=int(item.get("Stars") or 0),
+            price_usd=float(item.get("Price_USD") or 0),
+            price_range=item.get("Price_Range", ""),
+            address=item.get("Address", ""),
+            phone=item.get("Phone", ""),
+            website=item.get("Website", ""),
+            amenities=item.get("Amenities", []),
+            latitude=coordinates.get("latitude"),
+            longitude=coordinates.get("longitude")
+        ))
+    return hotels
+
+def _load_pharmacies() -> List[Pharmacy]:
+    pharmacies = []
+    for city, items in _read_json("pharmacies.json").get("pharmacies", {}).items():
+        for item in items:
+            pharmacies.append(Pharmacy(
+                inpe=str(item.get("INPE", "")),
+                name=item.get("Pharmacie_Name", ""),
+                address=item.get("address", ""),
+                city=item.get("city") or city
+            ))
+    return pharmacies
+
+def _load_restaurants() -> List[Restaurant]:
+    restaurants = []
+    for region, communes in _read_json("restaurants.json").get("restaurants", {}).items():
+        for commune, items in communes.items():
+            for item in items:
+                restaurants.append(Restaurant(
+                    name=item.get("Restaurant_name", ""),
+                    ranking=item.get("Ranking", ""),
+                    region=item.get("Région") or region,
+                    commune=item.get("Commune") or commune,
+                    city=item.get("City") or commune,
+                    address=item.get("Adresse", ""),
+                    phone=item.get("Téléphone", "")
+                ))
+    return restaurants
+
+def _load_hospitals() -> List[Hospital]:
+    regions = _read_json("hospitals.json").get("hospitals", {})
+    # The abbreviation legend is spread over a few rows of the source spreadsheet
+    labels = {}
+    for items in regions.values():
+        for item in items:
+            abbreviation = _clean(item.get("Liste des abréviations"))
+            label = _clean(item.get("Unnamed: 7"))
+            if abbreviation and label:
+                labels[abbreviation] = label
+
+    hospitals = []
+    for region, items in regions.items():
+        for item in items:
+            category = _clean(item.get("Catégorie")) or ""
+            hospitals.append(Hospital(
+                name=_clean(item.get("Etablissement hospitalier")) or "",
+                region=_clean(item.get("Région")) or region,
+                delegation=_clean(item.get("Delegation")) or "",
+                commune=_clean(item.get("Commune")) or "",
+                category=category,
+                category_label=labels.get(category, "")
+            ))
+    return hospitals
+
+class DataStore:
+    """Typed, indexed in-memory tables built from ``database/data_processed``"""
+
+    def __init__(self):
+        self.hotels = Table(
+            "hotels", _load_hotels(),
+            hash_keys={
+                "city": lambda h: [normalize_city(h.city)],
+                "stadium": lambda h: [normalize_text(h.nearest_stadium)],
+                "amenity": lambda h: [normalize_text(a) for a in h.amenities],
+            },
+            sorted_keys=["price_usd", "stars", "distance_km"]
+        )
+        self.pharmacies = Table(
+            "pharmacies", _load_pharmacies(),
+            hash_keys={
+                "city": lambda p: [normalize_city(p.city)],
+                "inpe": lambda p: [p.inpe],
+            }
+        )
+        self.restaurants = Table(
+            "restaurants", _load_restaurants(),
+            hash_keys={
+                "city": lambda r: [normalize_city(r.city), normalize_city(r.commune)],
+                "region": lambda r: [normalize_text(r.region)],
+                "ranking": lambda r: [normalize_text(r.ranking)],
+            }
+        )
+        self.hospitals = Table(
+            "hospitals", _load_hospitals(),
+            hash_keys={
+                "city": lambda h: [normalize_city(h.delegation), normalize_city(h.commune)],
+                "region": lambda h: [normalize_text(h.region)],
+                "category": lambda h: [normalize_text(h.category)],
+            }
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {table.name: len(table) for table in
+                (self.hotels, self.pharmacies, self.restaurants, self.hospitals)}
+
+    def cities(self) -> List[str]:
+        """Every normalized city name found in the tables"""
+        return sorted({city for table in (self.hotels, self.pharmacies, self.restaurants, self.hospitals)
+                       for city in table.keys("city") if city})
+
+    # Agent tool entry points: each one takes the raw Action Input string
+
+    def search_hotels(self, query: str) -> str:
+        """Hotels filtered by city, stadium, price, stars and distance"""
+        params = parse_query(query)
+        equals = {}
+        city = params.get("city") or find_known_value(query, self.hotels.keys("city"))
+        if city:
+            equals["city"] = normalize_city(city)
+        stadium = params.get("stadium") or find_known_value(query, self.hotels.keys("stadium"))
+        if stadium:
+            equals["stadium"] = normalize_text(stadium)
+        if params.get("amenity"):
+            equals["amenity"] = normalize_text(params["amenity"])
+
+        ranges = {}
+        if "min_price" in params or "max_price" in params:
+            ranges["price_usd"] = (params.get("min_price"), params.get("max_price"))
+        if "min_stars" in params or "max_stars" in params:
+            ranges["stars"] = (params.get("min_stars"), params.get("max_stars"))
+        if "max_distance" in params:
+            ranges["distance_km"] = (None, params["max_distance"])
+
+        order_by = params.get("sort", "price_usd")
+        if order_by not in self.hotels.sorted_indexes:
+            order_by = "price_usd"
+        rows = self.hotels.select(equals, ranges, order_by=order_by,
+                                  descending=order_by == "stars")
+        return format_rows("hotels", rows, params.get("limit", 10))
+
+    def search_pharmacies(self, query: str) -> str:
+        """Pharmacies of a city, or one pharmacy by INPE number"""
+        params = parse_query(query)
+        equals = {}
+        inpe = params.get("inpe") or _find_inpe(query)
+        if inpe:
+            equals["inpe"] = str(inpe)
+        else:
+            city = params.get("city") or find_known_value(query, self.pharmacies.keys("city"))
+            if not city:
+                return "Please specify a city, e.g. 'city=Rabat'."
+            equals["city"] = normalize_city(city)
+        rows = self.pharmacies.select(equals)
+        return format_rows("pharmacies", rows, params.get("limit", 10))
+
+    def search_restaurants(self, query: str) -> str:
+        """Restaurants filtered by city/commune, region and ranking"""
+        params = parse_query(query)
+        equals = {}
+        city = params.get("city") or find_known_value(query, self.restaurants.keys("city"))
+        if city:
+            equals["city"] = normalize_city(city)
+        region = params.get("region") or find_known_value(query, self.restaurants.keys("region"))
+        if region and not city:
+            equals["region"] = normalize_text(region)
+        ranking = params.get("ranking") or find_known_value(query, self.restaurants.keys("ranking"))
+        if ranking:
+            equals["ranking"] = normalize_text(ranking)
+        if not equals:
+            return "Please specify a city, region or ranking, e.g. 'city=Marrakech'."
+        rows = self.restaurants.select(equals)
+        return format_rows("restaurants", rows, params.get("limit", 10))
+
+    def search_hospitals(self, query: str) -> str:
+        """Hospitals filtered by city, region and category"""
+        params = parse_query(query)
+        equals = {}
+        city = params.get("city") or find_known_value(query, self.hospitals.keys("city"))
+        if city:
+            equals["city"] = normalize_city(city)
+        region = params.get("region") or find_known_value(query, self.hospitals.keys("region"))
+        if region and not city:
+            equals["region"] = normalize_text(region)
+        if params.get("category"):
+            equals["category"] = normalize_text(params["category"])
+        if not equals:
+            return "Please specify a city or region, e.g. 'city=Rabat'."
+        rows = self.hospitals.select(equals)
+        return format_rows("hospitals", rows, params.get("limit", 10))
+
+_KEY_VALUE = re.compile(r"(\w+)\s*[=:]\s*([^,;=]+?)\s*(?=[,;]|\s+\w+\s*[=:]|$)")
+_MAX_PRICE = re.compile(r"(?:under|below|less than|max(?:imum)?|moins de|<=?)\s*\$?\s*(\d+(?:\.\d+)?)(?![\d.]|\s*km)\s*(?:\$|usd|dollars?)?", re.IGNORECASE)
+_MIN_PRICE = re.compile(r"(?:over|above|more than|min(?:imum)?|plus de|>=?)\s*\$?\s*(\d+(?:\.\d+)?)\s*(?:\$|usd|dollars?)", re.IGNORECASE)
+_MIN_STARS = re.compile(r"(?:(\d)\s*\+\s*(?:stars?|étoiles?|\*|★)|(?:at least|au moins|minimum)\s*(\d)\s*(?:stars?|étoiles?|\*|★)|(\d)\s*(?:stars?|étoiles?|\*|★)\s*(?:or more|and above|et plus))", re.IGNORECASE)
+_EXACT_STARS = re.compile(r"(\d)\s*(?:-\s*)?(?:stars?|étoiles?|\*|★)", re.IGNORECASE)
+_MAX_DISTANCE = re.compile(r"(?:within|less than|under|moins de|à moins de)\s*(\d+(?:\.\d+)?)\s*km", re.IGNORECASE)
+_INPE = re.compile(r"\b(\d{8,9})\b")
+
+_NUMERIC_PARAMS = {"min_price", "max_price", "min_stars", "max_stars", "max_distance", "radius", "limit", "k"}
+_INTEGER_PARAMS = {"min_stars", "max_stars", "limit", "k"}
+
+def parse_query(query: str) -> Dict[str, Any]:
+    """Extract filters from ``key=value`` pairs and common natural-language phrasings.
+
+    >>> parse_query("hotels in Rabat under $200 with 4+ stars")
+    {'max_price': 200.0, 'min_stars': 4}
+    """
+    query = query or ""
+    params: Dict[str, Any] = {}
+    for key, value in _KEY_VALUE.findall(query):
+        key = key.lower()
+        if key in _NUMERIC_PARAMS:
+            try:
+                params[key] = int(value) if key in _INTEGER_PARAMS else float(value)
+            except ValueError:
+                continue
+        else:
+            params[key] = value.strip().strip("'\"")
+
+    if "max_price" not in params and (match := _MAX_PRICE.search(query)):
+        params["max_price"] = float(match.group(1))
+    if "min_price" not in params and (match := _MIN_PRICE.search(query)):
+        params["min_price"] = float(match.group(1))
+    if "min_stars" not in params and "max_stars" not in params:
+        if match := _MIN_STARS.search(query):
+            params["min_stars"] = int(next(g for g in match.groups() if g))
+        elif match := _EXACT_STARS.search(query):
+            params["min_stars"] = params["max_stars"] = int(match.group(1))
+    if "max_distance" not in params and (match := _MAX_DISTANCE.search(query)):
+        params["max_distance"] = float(match.group(1))
+    return params
+
+def _find_inpe(query: str) -> Optional[str]:
+    match = _INPE.search(query or "")
+    return match.group(1) if match else None
+
+def find_known_value(query: str, known_values: Iterable[str]) -> Optional[str]:
+    """Return the longest indexed value appearing as whole words in the query"""
+    text = f" {normalize_text(query)} "
+    words = set(text.split())
+    for alias, canonical in CITY_ALIASES.items():
+        if f" {alias} " in text:
+            text += f" {canonical} "
+            words.add(canonical)
+    best = None
+    for value in known_values:
+        if not value:
+            continue
+        # Cheap first-word check before the substring search
+        if value.split(" ", 1)[0] not in words:
+            continue
+        if f" {value} " in text and (best is None or len(value) > len(best)):
+            best = value
+    return best
+
+def format_rows(kind: str, rows: List[Any], limit: int = 10) -> str:
+    """Render query results as a compact list for the agent"""
+    if not rows:
+        return f"No {kind} found matching these criteria."
+    lines = [f"Found {len(rows)} {kind}:"]
+    lines.extend(f"- {row.describe()}" for row in rows[:limit])
+    if len(rows) > limit:
+        lines.append(f"... and {len(rows) - limit} more (use limit=N to see more)")
+    return "\n".join(lines)
+
+def load_datastore() -> DataStore:
+    """Load the structured tables once at startup"""
+    store = DataStore()
+    print(f"Structured data loaded: {store.stats()}")
+    return store
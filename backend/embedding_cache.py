@@ -0,0 +1,145 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+CACHE_DIRECTORY = os.path.join("database", "cache")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(CACHE_DIRECTORY, "embeddings.sqlite"))
+# Vectors kept in process memory in front of the SQLite store
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "10000"))
+
+def normalize_for_embedding(text: str) -> str:
+    """Texts differing only by Unicode form or whitespace get the same embedding"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(normalize_for_embedding(text).encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """Embeddings keyed by (model, kind, text hash) in SQLite, with an LRU in front.
+
+    ``kind`` separates document and query vectors, which some models compute
+    differently for the same text.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, memory_size: int = EMBEDDING_CACHE_MEMORY_SIZE):
+        self.path = path
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[tuple, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, kind TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, kind, key))"
+        )
+        self._db.commit()
+
+    def _remember(self, memory_key: tuple, vector: List[float]):
+        self._memory[memory_key] = vector
+        self._memory.move_to_end(memory_key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model: str, kind: str, keys: List[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors among ``keys``"""
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                vector = self._memory.get((model, kind, key))
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._memory.move_to_end((model, kind, key))
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND kind = ? "
+                    f"AND key IN ({','.join('?' * len(chunk))})",
+                    [model, kind, *chunk]
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f", blob).tolist()
+                    found[key] = vector
+                    self._remember((model, kind, key), vector)
+                self.disk_hits += len(rows)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, model: str, kind: str, vectors: Dict[str, List[float]]):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, kind, key, vector) VALUES (?, ?, ?, ?)",
+                [(model, kind, key, array("f", vector).tobytes()) for key, vector in vectors.items()]
+            )
+            self._db.commit()
+            for key, vector in vectors.items():
+                self._remember((model, kind, key), list(vector))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an embedding model so each distinct text is only embedded once per model"""
+
+    def __init__(self, embedding: Embeddings, cache: EmbeddingCache, model_name: Optional[str] = None):
+        self.embedding = embedding
+        self.cache = cache
+        self.model_name = (model_name or getattr(embedding, "model", None)
+                           or getattr(embedding, "model_name", None) or type(embedding).__name__)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_key(text) for text in texts]
+        found = self.cache.get_many(self.model_name, "document", keys)
+
+        # Embed every distinct missing text once, in a single batch
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in pending:
+                pending[key] = text
+        if pending:
+            vectors = self.embedding.embed_documents(list(pending.values()))
+            computed = dict(zip(pending.keys(), vectors))
+            self.cache.put_many(self.model_name, "document", computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_key(text)
+        found = self.cache.get_many(self.model_name, "query", [key])
+        if key in found:
+            return found[key]
+        vector = self.embedding.embed_query(text)
+        self.cache.put_many(self.model_name, "query", {key: vector})
+        return vector
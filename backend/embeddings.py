@@ -0,0 +1,76 @@
+import os
+from typing import List
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+
+load_dotenv()
+
+# "google" (Gemini embedding API) or "local" (sentence-transformers on CPU, no network)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "google").lower()
+GOOGLE_EMBEDDING_MODEL = os.getenv("GOOGLE_EMBEDDING_MODEL", "models/embedding-001")
+# Multilingual model: questions arrive in French, English and Arabic. A local path also works.
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "256"))
+# Worker processes used for large batches (index builds); 0 means one per CPU core
+LOCAL_EMBEDDING_PROCESSES = int(os.getenv("LOCAL_EMBEDDING_PROCESSES", "0"))
+# Below this many texts, starting worker processes costs more than it saves
+MULTIPROCESS_MIN_TEXTS = 2000
+
+class LocalEmbeddings(Embeddings):
+    """sentence-transformers embeddings computed on the local CPU.
+
+    Documents are encoded in large batches, spread over several processes for
+    index builds. Once the model is in the local
+    Hugging Face cache (or ``LOCAL_EMBEDDING_MODEL`` points to a directory) no
+    network access is needed.
+    """
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL,
+                 batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+                 processes: int = LOCAL_EMBEDDING_PROCESSES):
+        # Imported here so deployments using the Google backend never load torch
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.processes = processes or os.cpu_count() or 1
+        self._model = SentenceTransformer(model_name, device="cpu")
+
+    def _normalize(self, vectors):
+        import numpy as np
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        if self.processes > 1 and len(texts) >= MULTIPROCESS_MIN_TEXTS:
+            pool = self._model.start_multi_process_pool(target_devices=["cpu"] * self.processes)
+            try:
+                vectors = self._model.encode_multi_process(texts, pool, batch_size=self.batch_size)
+            finally:
+                self._model.stop_multi_process_pool(pool)
+        else:
+            vectors = self._model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                         show_progress_bar=False)
+        return self._normalize(vectors).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._model.encode([text], convert_to_numpy=True, show_progress_bar=False)
+        return self._normalize(vector)[0].tolist()
+
+def get_embedding(backend: str = EMBEDDING_BACKEND) -> Embeddings:
+    """Return the embedding model selected by ``EMBEDDING_BACKEND``"""
+    if backend == "local":
+        return LocalEmbeddings()
+    if backend == "google":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        google_api_key = os.getenv("GEMINI_API_KEY")
+        if not google_api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+        return GoogleGenerativeAIEmbeddings(
+            model=GOOGLE_EMBEDDING_MODEL,
+            google_api_key=google_api_key
+        )
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend!r} (expected 'google' or 'local')")
@@ -0,0 +1,161 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from datastore import CITY_ALIASES, normalize_city, normalize_text, parse_query
+
+# Trigram similarity below which a value is not a match (same default as PostgreSQL's pg_trgm)
+MIN_SIMILARITY = 0.3
+# Matches shown by the tool
+DEFAULT_LIMIT = 5
+# A matched value shared by more records is summarized as counts per table instead of listed
+MAX_LISTED_RECORDS = 2
+
+# Indexed fields of each table; city-like ones go through normalize_city ("CT OUARZAZATE", "Fez")
+INDEXED_FIELDS = {
+    "hotels": ("name", "city", "address", "nearest_stadium"),
+    "pharmacies": ("name", "city", "address"),
+    "restaurants": ("name", "city", "commune", "region", "address"),
+    "hospitals": ("name", "commune", "delegation", "region"),
+}
+CITY_FIELDS = {"city", "commune", "delegation"}
+
+# Options of the tool input, removed from the text to match; other keys ("city=") only lose the key
+_OPTIONS = re.compile(r"\b(?:kind|type|limit)\s*[=:]\s*\S+", re.IGNORECASE)
+_KEYS = re.compile(r"\b\w+\s*[=:]\s*")
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each word of normalized text, padded like pg_trgm ("  fe", " fes", "es ")"""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def normalize_query(text: str) -> str:
+    """Normalize like the indexed values, with the known alternative city spellings"""
+    return " ".join(CITY_ALIASES.get(word, word) for word in normalize_text(text).split())
+
+@dataclass
+class FuzzyMatch:
+    value: str
+    score: float
+    fields: List[str]
+    # (table, row) pairs holding the value
+    records: List[Tuple[str, Any]]
+
+class FuzzyIndex:
+    """Trigram index over names, cities and addresses, tolerant to typos, accents and case.
+
+    Each distinct normalized value is indexed once with the records holding it.
+    A query scores every value sharing a trigram with it in a few vectorised
+    operations: similarity is shared / (query + value - shared) trigrams.
+    """
+
+    def __init__(self, tables: Dict[str, List[Any]]):
+        keys: Dict[str, int] = {}
+        spellings: List[Counter] = []
+        self._fields: List[Set[Tuple[str, str]]] = []
+        self._records: List[Dict[Tuple[str, int], Any]] = []
+        for table, rows in tables.items():
+            for row_id, row in enumerate(rows):
+                for field in INDEXED_FIELDS[table]:
+                    raw = getattr(row, field) or ""
+                    key = normalize_city(raw) if field in CITY_FIELDS else normalize_text(raw)
+                    if not key:
+                        continue
+                    if key not in keys:
+                        keys[key] = len(spellings)
+                        spellings.append(Counter())
+                        self._fields.append(set())
+                        self._records.append({})
+                    value_id = keys[key]
+                    spellings[value_id][str(raw).strip()] += 1
+                    self._fields[value_id].add((table, field))
+                    self._records[value_id].setdefault((table, row_id), row)
+
+        # Shown as the accented, then mixed-case, then most common spelling ("Fès" rather than "FES")
+        self._values = [max(counts, key=lambda spelling: (not spelling.isascii(), not spelling.isupper(),
+                                                          counts[spelling]))
+                        for counts in spellings]
+
+        postings: Dict[str, List[int]] = {}
+        sizes = []
+        for key, value_id in keys.items():
+            grams = trigrams(key)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(value_id)
+        self._sizes = np.array(sizes, dtype=np.int32)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._tables = {value_id: {table for table, _ in records} for value_id, records in enumerate(self._records)}
+
+    def __len__(self):
+        return len(self._values)
+
+    def stats(self) -> Dict[str, int]:
+        return {"values": len(self._values), "trigrams": len(self._postings)}
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT, tables: Optional[Iterable[str]] = None,
+               min_similarity: float = MIN_SIMILARITY) -> List[FuzzyMatch]:
+        """Values most similar to ``query``, best first, optionally only those of some tables"""
+        grams = trigrams(normalize_query(query))
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists or limit <= 0:
+            return []
+        shared = np.bincount(np.concatenate(lists), minlength=len(self._values))
+        candidates = np.flatnonzero(shared)
+        scores = shared[candidates] / (len(grams) + self._sizes[candidates] - shared[candidates])
+        keep = scores >= min_similarity
+        candidates, scores = candidates[keep], scores[keep]
+        wanted = set(tables) if tables else None
+
+        matches = []
+        for i in np.argsort(-scores, kind="stable"):
+            value_id = int(candidates[i])
+            if wanted and not wanted & self._tables[value_id]:
+                continue
+            records = [(table, row) for (table, _), row in self._records[value_id].items()
+                       if not wanted or table in wanted]
+            fields = sorted({field for table, field in self._fields[value_id] if not wanted or table in wanted})
+            matches.append(FuzzyMatch(self._values[value_id], round(float(scores[i]), 3), fields, records))
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def lookup(self, query: str) -> str:
+        """Agent tool: records whose name, city or address resembles the query"""
+        params = parse_query(query)
+        kind = (params.get("kind") or params.get("type") or "").lower()
+        tables = [table for table in INDEXED_FIELDS if kind and table.startswith(kind[:5])]
+        text = " ".join(_KEYS.sub(" ", _OPTIONS.sub(" ", query)).split())
+        if not text:
+            return "Please give a name, city or address to look up, e.g. 'Au Bon Delice' or 'Fes kind=pharmacies'."
+        matches = self.search(text, limit=int(params.get("limit") or DEFAULT_LIMIT), tables=tables or None)
+        if not matches:
+            return f"No name, city or address resembles '{text}'."
+
+        lines = [f"Closest names, cities and addresses for '{text}':"]
+        for match in matches:
+            fields = "/".join(match.fields)
+            if len(match.records) <= MAX_LISTED_RECORDS:
+                lines.extend(f"- {row.describe()} [{fields} '{match.value}', similarity {match.score:.2f}]"
+                             for _, row in match.records)
+            else:
+                counts = Counter(table for table, _ in match.records)
+                summary = ", ".join(f"{count} {table}" for table, count in counts.most_common())
+                lines.append(f"- {match.value} ({fields} of {summary}, similarity {match.score:.2f})")
+        lines.append("Use these exact spellings with the Hotel, Pharmacy, Restaurant and Hospital Finder tools.")
+        return "\n".join(lines)
+
+def build_fuzzy_index(datastore) -> FuzzyIndex:
+    """Index the named fields of every table of the datastore"""
+    return FuzzyIndex({
+        "hotels": datastore.hotels.rows,
+        "pharmacies": datastore.pharmacies.rows,
+        "restaurants": datastore.restaurants.rows,
+        "hospitals": datastore.hospitals.rows,
+    })
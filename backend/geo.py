@@ -0,0 +1,241 @@
+import math
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from datastore import find_known_value, normalize_text, parse_query
+
+EARTH_RADIUS_KM = 6371.0088
+
+# The data files only carry coordinates for hotels: venues and host cities are fixed
+STADIUM_COORDINATES = {
+    "Mohammed V Stadium": (33.5828, -7.6476),
+    "Prince Moulay Abdellah Stadium": (33.9594, -6.8893),
+    "Ibn Batouta Stadium": (35.7416, -5.8582),
+    "Adrar Stadium": (30.4275, -9.5337),
+    "Fez Stadium": (34.0014, -4.9664),
+    "Grand Stadium": (31.7066, -8.0445),
+}
+
+HOST_CITY_COORDINATES = {
+    "Casablanca": (33.5731, -7.5898),
+    "Rabat": (34.0209, -6.8416),
+    "Marrakech": (31.6295, -7.9811),
+    "Fes": (34.0181, -5.0078),
+    "Tanger": (35.7595, -5.8340),
+    "Agadir": (30.4278, -9.5981),
+}
+
+# Other names used for the same places in the data and by users
+PLACE_ALIASES = {
+    "moulay abdellah stadium": "prince moulay abdellah stadium",
+    "grand stade de marrakech": "grand stadium",
+    "marrakech stadium": "grand stadium",
+    "fes stadium": "fez stadium",
+}
+
+# Below this size scoring every point is faster than walking the grid
+BRUTE_FORCE_MAX_POINTS = 2048
+
+_COORDINATES = re.compile(r"(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)")
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance from one point to arrays of points (all in degrees)"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class GeoIndex:
+    """Uniform lat/lon grid over geolocated records with k-nearest and radius queries.
+
+    Points are bucketed into ``cell_deg`` x ``cell_deg`` cells; a query only scores
+    the points of the cells overlapping its search circle, with a vectorised
+    haversine over the candidates.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], cell_deg: float = 0.05):
+        self.records = records
+        self.cell_deg = cell_deg
+        self.lats = np.array([r["latitude"] for r in records], dtype=np.float64)
+        self.lons = np.array([r["longitude"] for r in records], dtype=np.float64)
+        kinds = sorted({r["kind"] for r in records})
+        self.kind_codes = {kind: code for code, kind in enumerate(kinds)}
+        self.kinds = np.array([self.kind_codes[r["kind"]] for r in records], dtype=np.int16)
+
+        self._places: Optional[Dict[str, Tuple[str, float, float]]] = None
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {}
+        self._area_km2 = 1.0
+        if records:
+            lat_extent = (self.lats.max() - self.lats.min()) * 111.0
+            lon_extent = (self.lons.max() - self.lons.min()) * 111.0 * math.cos(math.radians(self.lats.mean()))
+            self._area_km2 = max(lat_extent * lon_extent, 1.0)
+            rows = np.floor(self.lats / cell_deg).astype(np.int64)
+            cols = np.floor(self.lons / cell_deg).astype(np.int64)
+            order = np.lexsort((cols, rows))
+            keys = np.stack([rows[order], cols[order]], axis=1)
+            boundaries = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+            for group in np.split(order, boundaries):
+                self.cells[(int(rows[group[0]]), int(cols[group[0]]))] = group
+
+    def __len__(self):
+        return len(self.records)
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Ids of the points in the grid cells overlapping the search circle"""
+        lat_span = radius_km / 111.0
+        lon_span = radius_km / (111.0 * max(math.cos(math.radians(min(abs(lat) + lat_span, 89.9))), 1e-6))
+        row_min, row_max = math.floor((lat - lat_span) / self.cell_deg), math.floor((lat + lat_span) / self.cell_deg)
+        col_min, col_max = math.floor((lon - lon_span) / self.cell_deg), math.floor((lon + lon_span) / self.cell_deg)
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self.cells):
+            # Scanning the bounding box would visit more cells than exist
+            groups = [ids for (row, col), ids in self.cells.items()
+                      if row_min <= row <= row_max and col_min <= col <= col_max]
+        else:
+            groups = [self.cells[(row, col)]
+                      for row in range(row_min, row_max + 1)
+                      for col in range(col_min, col_max + 1)
+                      if (row, col) in self.cells]
+        if not groups:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(groups)
+
+    def _score(self, ids: np.ndarray, lat: float, lon: float, kind: Optional[str]):
+        if kind is not None:
+            code = self.kind_codes.get(kind)
+            if code is None:
+                return ids[:0], np.empty(0)
+            ids = ids[self.kinds[ids] == code]
+        return ids, haversine_km(lat, lon, self.lats[ids], self.lons[ids])
+
+    def within(self, lat: float, lon: float, radius_km: float, kind: Optional[str] = None,
+               limit: Optional[int] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """Records within ``radius_km`` of the point, closest first"""
+        ids, distances = self._score(self._candidates(lat, lon, radius_km), lat, lon, kind)
+        mask = distances <= radius_km
+        ids, distances = ids[mask], distances[mask]
+        order = np.argsort(distances, kind="stable")
+        if limit:
+            order = order[:limit]
+        return [(self.records[ids[i]], float(distances[i])) for i in order]
+
+    def nearest(self, lat: float, lon: float, k: int = 5,
+                kind: Optional[str] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """The ``k`` records closest to the point"""
+        if k <= 0 or not self.records:
+            return []
+        if len(self.records) <= BRUTE_FORCE_MAX_POINTS:
+            ids = np.arange(len(self.records))
+            ids, distances = self._score(ids, lat, lon, kind)
+            return self._top_k(ids, distances, k)
+
+        # Start from the radius expected to hold k points given the average density
+        radius = max(self.cell_deg * 111.0, math.sqrt(k * self._area_km2 / (math.pi * len(self.records))))
+        while True:
+            ids, distances = self._score(self._candidates(lat, lon, radius), lat, lon, kind)
+            if len(ids) >= k:
+                kth = float(np.partition(distances, k - 1)[k - 1])
+                if kth <= radius:
+                    break
+                # Every point closer than the current k-th one lies within that distance
+                radius = kth
+            elif radius >= math.pi * EARTH_RADIUS_KM:
+                break
+            else:
+                radius *= 2
+        return self._top_k(ids, distances, k)
+
+    def _top_k(self, ids: np.ndarray, distances: np.ndarray, k: int):
+        if len(ids) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            ids, distances = ids[top], distances[top]
+        order = np.argsort(distances, kind="stable")
+        return [(self.records[ids[i]], float(distances[i])) for i in order]
+
+    def resolve_place(self, text: str) -> Optional[Tuple[str, float, float]]:
+        """Find the anchor point of a query: explicit coordinates or a known place name"""
+        match = _COORDINATES.search(text or "")
+        if match:
+            lat, lon = float(match.group(1)), float(match.group(2))
+            if -90 <= lat <= 90 and -180 <= lon <= 180:
+                return f"{lat:.4f},{lon:.4f}", lat, lon
+
+        if self._places is None:
+            places = {normalize_text(name): (name, lat, lon)
+                      for name, (lat, lon) in {**STADIUM_COORDINATES, **HOST_CITY_COORDINATES}.items()}
+            for record in self.records:
+                places.setdefault(normalize_text(record["name"]),
+                                  (record["name"], record["latitude"], record["longitude"]))
+            self._places = places
+        normalized = normalize_text(text)
+        for alias, canonical in PLACE_ALIASES.items():
+            if alias in normalized:
+                normalized += f" {canonical}"
+        found = find_known_value(normalized, self._places)
+        return self._places[found] if found else None
+
+    def search(self, query: str) -> str:
+        """Agent tool: nearest places or places within a radius of a point"""
+        params = parse_query(query)
+        anchor = self.resolve_place(query)
+        if not anchor:
+            return ("Please give a place (stadium, host city or hotel name) or coordinates, "
+                    "e.g. 'hotels near Mohammed V Stadium' or '33.59,-7.63 radius=5'.")
+        name, lat, lon = anchor
+
+        kind = params.get("kind")
+        if not kind:
+            words = normalize_text(query).split()
+            if any(word.startswith("hotel") for word in words):
+                kind = "hotel"
+            elif any(word.startswith(("stadium", "stade")) for word in words):
+                kind = "stadium"
+
+        radius = params.get("radius") or params.get("max_distance")
+        limit = params.get("k") or params.get("limit") or (10 if radius else 5)
+        if radius:
+            results = self.within(lat, lon, radius, kind=kind, limit=limit + 1)
+            header = f"Places within {radius:g} km of {name}:"
+        else:
+            results = self.nearest(lat, lon, k=limit + 1, kind=kind)
+            header = f"Closest places to {name}:"
+        # Do not return the anchor itself when it is one of the indexed places
+        results = [(r, d) for r, d in results if normalize_text(r["name"]) != normalize_text(name)][:limit]
+
+        if not results:
+            return f"No places found near {name}."
+        lines = [header]
+        for record, distance in results:
+            lines.append(f"- {record['name']} ({record['kind']}, {record['city']}) - {distance:.1f} km")
+        return "\n".join(lines)
+
+def build_geo_index(datastore) -> GeoIndex:
+    """Index every geolocated record: hotels from the data files plus the AFCON venues"""
+    records = []
+    for hotel in datastore.hotels.rows:
+        if hotel.latitude is None or hotel.longitude is None:
+            continue
+        records.append({
+            "kind": "hotel",
+            "name": hotel.name,
+            "city": hotel.city,
+            "latitude": hotel.latitude,
+            "longitude": hotel.longitude,
+            "id": hotel.hotel_id,
+        })
+    stadium_cities = defaultdict(str)
+    for hotel in datastore.hotels.rows:
+        stadium_cities[hotel.nearest_stadium] = stadium_cities[hotel.nearest_stadium] or hotel.city
+    for name, (lat, lon) in STADIUM_COORDINATES.items():
+        records.append({
+            "kind": "stadium",
+            "name": name,
+            "city": stadium_cities[name],
+            "latitude": lat,
+            "longitude": lon,
+            "id": name,
+        })
+    return GeoIndex(records)
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Upstream base URLs: point them at a local stub server to test the tools offline
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+SERPAPI_URL = os.getenv("SERPAPI_URL", "https://serpapi.com/search.json")
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+# Requests in flight to the same host; the others wait for a slot
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+HTTP_CONNECT_TIMEOUT = 3.05
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+# Extra attempts for idempotent requests failing with a network error or a retryable status
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 4.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Consecutive failures opening a host's circuit, and seconds before a trial request
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("HTTP_CIRCUIT_FAILURES", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("HTTP_CIRCUIT_RESET", "30"))
+
+USER_AGENT = "Mozilla/5.0 (compatible; Weather Bot/1.0)"
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised without calling a host that keeps failing"""
+    pass
+
+class CircuitBreaker:
+    """Per-host breaker: opens after repeated failures, lets one trial through after a cooldown"""
+
+    def __init__(self, threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self._trial = False
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    """Full-jitter exponential backoff, or the server's Retry-After when it gives seconds"""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+class HTTPClient:
+    """One pooled ``httpx.AsyncClient`` shared by every outbound tool.
+
+    The client lives on a background event loop so the synchronous agent tools
+    (running on worker threads) reuse the same keep-alive connections: they call
+    :meth:`get`, which blocks the calling thread only. Each host gets a
+    concurrency limit, a circuit breaker, and retries with jittered backoff.
+    """
+
+    def __init__(self, max_connections: int = HTTP_MAX_CONNECTIONS, max_per_host: int = HTTP_MAX_PER_HOST,
+                 timeout: float = HTTP_TIMEOUT, retries: int = HTTP_RETRIES,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.retries = retries
+        # e.g. httpx.MockTransport to answer every request locally (benchmarks)
+        self.transport = transport
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._start_lock = threading.Lock()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = defaultdict(CircuitBreaker)
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="http-client", daemon=True).start()
+                self._client = httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_connections),
+                    timeout=httpx.Timeout(self.timeout, connect=HTTP_CONNECT_TIMEOUT),
+                    headers={"User-Agent": USER_AGENT},
+                    follow_redirects=True,
+                    transport=self.transport
+                )
+                self._loop = loop
+            return self._loop
+
+    def _host(self, url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    async def send(self, method: str, url: str, *, stream: bool = False, **kwargs) -> httpx.Response:
+        """Send with limits, breaker and retries; must run on the client's loop"""
+        host = self._host(url)
+        breaker = self._breakers[host]
+        counters = self._counters[host]
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        retries = self.retries if method.upper() in ("GET", "HEAD") else 0
+
+        # The breaker judges logical requests: retries of an admitted one are not asked again
+        if not breaker.allow():
+            counters["short_circuited"] += 1
+            raise CircuitOpenError(f"Circuit open for {host}: too many recent failures")
+        try:
+            for attempt in range(retries + 1):
+                response = None
+                error = None
+                async with semaphore:
+                    counters["requests"] += 1
+                    try:
+                        request = self._client.build_request(method, url, **kwargs)
+                        response = await self._client.send(request, stream=stream)
+                    except httpx.TransportError as e:
+                        error = e
+
+                if error is None and response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+                counters["failures"] += 1
+                if attempt == retries:
+                    break
+                if response is not None:
+                    await response.aclose()
+                counters["retries"] += 1
+                await asyncio.sleep(_retry_delay(attempt, response))
+        except BaseException:
+            # Too many redirects, invalid request, cancellation...: not retried, but a
+            # half-open trial must still end or the host would stay open for good
+            counters["failures"] += 1
+            breaker.record_failure()
+            raise
+
+        # Every attempt failed: one failure for the breaker, however many retries it took
+        breaker.record_failure()
+        if error is not None:
+            raise error
+        return response
+
+    async def arequest(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request from any event loop; the body is read before returning"""
+        loop = self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._read(method, url, **kwargs), loop)
+        return await asyncio.wrap_future(future)
+
+    async def _read(self, method: str, url: str, **kwargs) -> httpx.Response:
+        response = await self.send(method, url, **kwargs)
+        await response.aread()
+        return response
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Blocking variant for the synchronous tools (never call it from the client's own loop)"""
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._read(method, url, **kwargs), loop).result()
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def run(self, coroutine_function, *args, **kwargs):
+        """Run ``coroutine_function(client, *args, **kwargs)`` on the client's loop and wait for it.
+
+        For callers needing more than a buffered response, e.g. reading a body
+        incrementally with ``client.send(..., stream=True)``.
+        """
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coroutine_function(self, *args, **kwargs), loop).result()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            host: {**counters, "circuit": self._breakers[host].state}
+            for host, counters in list(self._counters.items())
+        }
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+# Shared by every tool of the process
+http_client = HTTPClient()
@@ -1,5 +1,9 @@
 import os
+from typing import Any, List, Optional
 from dotenv import load_dotenv
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatResult
 from langchain_google_genai import ChatGoogleGenerativeAI
 import google.generativeai as genai
 # Load environment variables from .env file
@@ -9,11 +13,40 @@ if not GEMINI_API_KEY:
     raise ValueError("GEMINI_API_KEY not found in environment variables")
 genai.configure(api_key=GEMINI_API_KEY)
 
+class StreamingChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """Gemini chat model that streams tokens to callbacks even when invoked.
+
+    AgentExecutor only calls the model through ``invoke``, which never reaches
+    ``_stream``. Generating through the stream lets callback handlers receive
+    tokens as they arrive while the agent still gets the complete message back.
+    """
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if run_manager is None:
+            return super()._generate(messages, stop=stop, **kwargs)
+
+        generation = None
+        for chunk in self._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            generation = chunk if generation is None else generation + chunk
+        if generation is None:
+            return super()._generate(messages, stop=stop, **kwargs)
+
+        return ChatResult(generations=[ChatGeneration(
+            message=message_chunk_to_message(generation.message),
+            generation_info=generation.generation_info
+        )])
+
 def init_llm():
     """Initialize and return the Gemini LLM"""
-    return ChatGoogleGenerativeAI(
+    return StreamingChatGoogleGenerativeAI(
         model="gemini-2.0-flash",
         google_api_key=GEMINI_API_KEY,
         temperature=0.7,
         convert_system_message_to_human=True
-    )
\ No newline at end of file
+    )
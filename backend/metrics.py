@@ -0,0 +1,85 @@
+import time
+from typing import Any, Callable, Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+
+# Buckets from a cache hit (ms) to a long agent run (tens of seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+REQUEST_LATENCY = Histogram(
+    "afcon_request_seconds", "Chat request latency by endpoint and answering path",
+    ["endpoint", "path"], buckets=LATENCY_BUCKETS
+)
+AGENT_ITERATIONS = Histogram(
+    "afcon_agent_iterations", "ReAct iterations (tool calls) per agent run",
+    buckets=(1, 2, 3, 4, 5, 6, 7, 8, 10)
+)
+LLM_LATENCY = Histogram("afcon_llm_seconds", "Duration of each LLM call", buckets=LATENCY_BUCKETS)
+LLM_TOKENS = Counter(
+    "afcon_llm_tokens_total",
+    "LLM tokens; estimated as characters / 4 when the model reports no usage",
+    ["kind"]
+)
+TOOL_LATENCY = Histogram(
+    "afcon_tool_seconds", "Duration of each tool call", ["tool", "status"], buckets=LATENCY_BUCKETS
+)
+RETRIEVAL_LATENCY = Histogram(
+    "afcon_retrieval_seconds", "Knowledge base retrieval (vector + BM25) duration", buckets=LATENCY_BUCKETS
+)
+SCRATCHPAD_TOKENS = Counter(
+    "afcon_scratchpad_observation_tokens_total",
+    "Estimated tokens of tool observations in agent prompts: raw, and sent after the budget",
+    ["kind"]
+)
+LLM_ERRORS = Counter("afcon_llm_errors_total", "LLM calls that raised an error")
+CACHE_LOOKUPS = Counter("afcon_cache_lookups_total", "Answer cache lookups by result", ["result"])
+
+# Outcome of the most recent LLM call, for /health
+_llm_outcome = {"ok": None, "at": None}
+
+def record_llm_outcome(ok: bool):
+    _llm_outcome.update(ok=ok, at=time.time())
+
+def llm_status() -> Dict[str, Any]:
+    """Whether the last LLM call succeeded (``None`` before the first call)"""
+    return dict(_llm_outcome)
+
+class StatsCollector:
+    """Expose the ``stats()`` dicts of the caches, pools and router as gauges at scrape time"""
+
+    def __init__(self):
+        self.sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def collect(self):
+        for source, stats in list(self.sources.items()):
+            try:
+                values = stats() or {}
+            except Exception as e:
+                print(f"Error collecting {source} stats: {e}")
+                continue
+            for name, value in _flatten(values):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                family = GaugeMetricFamily(f"afcon_{source}_{name}", f"{source} {name.replace('_', ' ')}")
+                family.add_metric([], value)
+                yield family
+
+def _flatten(values: Dict[str, Any], prefix: str = ""):
+    for key, value in values.items():
+        name = f"{prefix}{key}".replace("-", "_").replace(".", "_").replace(":", "_")
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        else:
+            yield name, value
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+def register_stats(source: str, stats: Callable[[], Dict[str, Any]]):
+    """Publish ``stats()`` on /metrics as ``afcon_<source>_<key>`` gauges"""
+    stats_collector.sources[source] = stats
+
+def render_metrics():
+    """Body and content type of the /metrics response"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,208 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+from bs4 import BeautifulSoup, Comment, Doctype, NavigableString
+from dotenv import load_dotenv
+from markdownify import MarkdownConverter
+
+from http_client import http_client
+
+load_dotenv()
+
+PAGE_CACHE_PATH = os.path.join("database", "cache", "pages.sqlite")
+# Seconds a fetched page is served without asking the server again
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "3600"))
+# Seconds a failure (timeout, 404, non-HTML...) is remembered
+PAGE_NEGATIVE_TTL = int(os.getenv("PAGE_NEGATIVE_TTL", "300"))
+# Bytes read from a page body; the rest is never downloaded
+PAGE_MAX_BYTES = int(os.getenv("PAGE_MAX_BYTES", str(2 * 1024 * 1024)))
+# Characters of markdown returned to the agent
+MARKDOWN_BUDGET = 10000
+PAGE_TIMEOUT = 20
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+# Page chrome that never answers a question
+BOILERPLATE_TAGS = ["script", "style", "noscript", "template", "svg", "canvas", "iframe",
+                    "nav", "header", "footer", "aside", "form", "button"]
+# Elements without a markdown conversion of their own: walking into them gives
+# the same text as converting them whole, one block at a time
+_CONTAINER_TAGS = {"html", "body", "div", "section", "main", "article", "center"}
+
+class PageCache:
+    """Fetched pages and failures in SQLite, with the validators for conditional GETs"""
+
+    def __init__(self, path: str = PAGE_CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, content TEXT NOT NULL, ok INTEGER NOT NULL,"
+            " etag TEXT, last_modified TEXT, expires_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content, ok, etag, last_modified, expires_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("content", "ok", "etag", "last_modified", "expires_at"), row))
+
+    def put(self, url: str, content: str, ok: bool, ttl: float,
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, content, ok, etag, last_modified, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, content, int(ok), etag, last_modified, time.time() + ttl)
+            )
+            self._db.commit()
+
+    def touch(self, url: str, ttl: float):
+        with self._lock:
+            self._db.execute("UPDATE pages SET expires_at = ? WHERE url = ?", (time.time() + ttl, url))
+            self._db.commit()
+
+class UnsupportedContent(Exception):
+    """The URL does not point to an HTML page"""
+    pass
+
+async def _download(client, url: str, headers: Dict[str, str]) -> Tuple[int, Optional[str], Dict[str, str]]:
+    """GET ``url`` reading at most PAGE_MAX_BYTES; returns ``(status, html, response headers)``"""
+    response = await client.send("GET", url, stream=True, headers=headers, timeout=PAGE_TIMEOUT)
+    try:
+        if response.status_code == 304:
+            return 304, None, dict(response.headers)
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            raise UnsupportedContent(f"Unsupported content type '{content_type}': only HTML pages can be visited.")
+
+        chunks, size = [], 0
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= PAGE_MAX_BYTES:
+                break
+        body = b"".join(chunks)[:PAGE_MAX_BYTES]
+        return response.status_code, body.decode(response.charset_encoding or "utf-8", errors="replace"), dict(response.headers)
+    finally:
+        await response.aclose()
+
+def _iter_markdown(converter: MarkdownConverter, node) -> Iterator[str]:
+    for element in node.children:
+        if isinstance(element, (Comment, Doctype)):
+            continue
+        if isinstance(element, NavigableString):
+            yield converter.process_text(element)
+        elif element.name in _CONTAINER_TAGS:
+            yield from _iter_markdown(converter, element)
+        else:
+            yield converter.process_tag(element, convert_as_inline=False)
+
+def html_to_markdown(html: str, budget: int = MARKDOWN_BUDGET) -> str:
+    """Markdown of the page content without boilerplate, converted only up to ``budget`` chars"""
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(BOILERPLATE_TAGS):
+        element.decompose()
+
+    converter = MarkdownConverter()
+    parts, size = [], 0
+    truncated = False
+    for text in _iter_markdown(converter, soup):
+        parts.append(text)
+        size += len(text)
+        # Keep some slack: blank lines are collapsed below
+        if size > budget * 2:
+            truncated = True
+            break
+    markdown_content = re.sub(r"\n{3,}", "\n\n", "".join(parts).strip())
+    if truncated or len(markdown_content) > budget:
+        markdown_content = markdown_content[:budget] + "\n\n...[truncated]"
+    return markdown_content
+
+class PageFetcher:
+    """Visit Webpage backend: streamed, size-capped downloads behind a persistent cache.
+
+    Fresh entries are served from disk; stale ones are revalidated with
+    ``If-None-Match`` / ``If-Modified-Since`` so unchanged pages cost a 304.
+    Failures are cached for ``PAGE_NEGATIVE_TTL`` seconds only.
+    """
+
+    def __init__(self, cache: Optional[PageCache] = None):
+        self._cache = cache
+        self._cache_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self.counters = {"hits": 0, "negative_hits": 0, "revalidated": 0, "fetched": 0, "errors": 0}
+
+    @property
+    def cache(self) -> PageCache:
+        # Opened on first use so importing the tools never touches the disk
+        with self._cache_lock:
+            if self._cache is None:
+                self._cache = PageCache()
+            return self._cache
+
+    def _count(self, name: str):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def fetch(self, url: str) -> str:
+        entry = self.cache.get(url)
+        if entry and entry["expires_at"] > time.time():
+            self._count("hits" if entry["ok"] else "negative_hits")
+            return entry["content"]
+
+        headers = {}
+        if entry and entry["ok"]:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            status, html, response_headers = http_client.run(_download, url, headers)
+            if status == 304 and not headers:
+                # Nothing of ours to revalidate (e.g. a proxy's 304): ask for the page itself once
+                status, html, response_headers = http_client.run(_download, url, {"Cache-Control": "no-cache"})
+        except httpx.TimeoutException:
+            return self._fail(url, "The request timed out. Please try again later or check the URL.")
+        except UnsupportedContent as e:
+            return self._fail(url, str(e))
+        except httpx.HTTPError as e:
+            return self._fail(url, f"Error fetching the webpage: {str(e)}")
+
+        if status == 304:
+            if not headers:
+                return self._fail(url, "Error fetching the webpage: the server answered 304 Not Modified without the page.")
+            self.cache.touch(url, PAGE_CACHE_TTL)
+            self._count("revalidated")
+            return entry["content"]
+
+        content = html_to_markdown(html or "")
+        self.cache.put(url, content, True, PAGE_CACHE_TTL,
+                       etag=response_headers.get("etag"), last_modified=response_headers.get("last-modified"))
+        self._count("fetched")
+        return content
+
+    def _fail(self, url: str, message: str) -> str:
+        self.cache.put(url, message, False, PAGE_NEGATIVE_TTL)
+        self._count("errors")
+        return message
+
+    def stats(self) -> Dict[str, int]:
+        with self._counter_lock:
+            return dict(self.counters)
+
+page_fetcher = PageFetcher()
@@ -0,0 +1,124 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.agents import AgentAction
+
+from token_budget import OBSERVATION_TOKEN_BUDGET, compress_observation
+
+load_dotenv()
+
+# "react" (one tool per LLM call) or "plan" (plan all tool calls, run them concurrently, answer once)
+AGENT_MODE = os.getenv("AGENT_MODE", "react").lower()
+# Tool calls a plan may contain
+MAX_PLANNED_CALLS = 4
+# Threads running planned tool calls, shared by all requests of the process
+PLAN_TOOL_WORKERS = int(os.getenv("PLAN_TOOL_WORKERS", "16"))
+
+# Tools that only make sense inside the ReAct loop (need earlier results or end it)
+UNPLANNABLE_TOOLS = ("Visit Webpage", "Process Response", "Final Answer")
+
+PLAN_PROMPT = """{preamble}
+
+Plan which tools to call to answer the question below. The calls run at the same time, so each
+input must stand on its own. Always include CAN Knowledge Base; add Weather Info only for weather
+questions and Web Search for recent or real-time information. At most {max_calls} calls.
+
+Tools:
+{tools}
+
+Reply with a JSON list only, e.g. [{{"tool": "CAN Knowledge Base", "input": "stadiums in Rabat"}}]
+
+Question: {input}"""
+
+ANSWER_PROMPT = """{preamble}
+
+Answer the question using the tool results below. Format the answer clearly with sections or
+bullet points and helpful emojis. Reply with the answer for the user only.
+
+Tool results:
+{observations}
+
+Question: {input}"""
+
+_JSON_LIST = re.compile(r"\[.*\]", re.DOTALL)
+
+def parse_plan(text: str, tool_names: List[str]) -> List[Tuple[str, str]]:
+    """``(tool, input)`` pairs of a plan; unknown tools and duplicates are dropped"""
+    match = _JSON_LIST.search(text)
+    if not match:
+        raise ValueError(f"No JSON list in plan: {text[:200]!r}")
+    calls = []
+    for item in json.loads(match.group(0)):
+        if not isinstance(item, dict):
+            continue
+        call = (str(item.get("tool", "")).strip(), str(item.get("input", "")).strip())
+        if call[0] in tool_names and call[1] and call not in calls:
+            calls.append(call)
+    return calls[:MAX_PLANNED_CALLS]
+
+_tool_executor = ThreadPoolExecutor(max_workers=PLAN_TOOL_WORKERS, thread_name_prefix="plan-tool")
+
+class PlanExecuteAgent:
+    """Agent answering with two LLM calls whatever the number of tools.
+
+    One call plans the tool calls, they run concurrently, a second call writes
+    the answer from their results. Drop-in for the ``AgentExecutor`` used by
+    the API: same ``invoke`` inputs, and ``intermediate_steps`` ending with the
+    Final Answer step. When the plan cannot be parsed, ``fallback`` (the ReAct
+    executor) answers instead.
+    """
+
+    def __init__(self, llm, tools, system_prompt: str, fallback=None):
+        self.llm = llm
+        self.tools = {tool.name: tool for tool in tools}
+        self.final_tool = self.tools.get("Final Answer")
+        self.plannable = [tool for tool in tools if tool.name not in UNPLANNABLE_TOOLS]
+        # The instructions before the ReAct format description apply to both modes
+        self.preamble = system_prompt.split("RESPONSE FORMAT:")[0].strip()
+        self.fallback = fallback
+
+    def _ask(self, prompt: str, callbacks) -> str:
+        return self.llm.invoke(prompt, config={"callbacks": callbacks}).content
+
+    def _run_tool(self, name: str, tool_input: str, callbacks) -> str:
+        try:
+            return str(self.tools[name].run(tool_input, callbacks=callbacks))
+        except Exception as e:
+            return f"Error: {e}"
+
+    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        callbacks = (config or {}).get("callbacks")
+        question = inputs["input"]
+        tools_text = "\n".join(f"- {tool.name}: {tool.description}" for tool in self.plannable)
+        plan_text = self._ask(PLAN_PROMPT.format(
+            preamble=self.preamble, tools=tools_text, max_calls=MAX_PLANNED_CALLS, input=question
+        ), callbacks)
+        try:
+            calls = parse_plan(plan_text, [tool.name for tool in self.plannable])
+        except ValueError as e:
+            if self.fallback is None:
+                raise
+            print(f"Unusable plan, falling back to the ReAct agent: {e}")
+            return self.fallback.invoke(inputs, config=config)
+
+        futures = [_tool_executor.submit(self._run_tool, name, tool_input, callbacks) for name, tool_input in calls]
+        steps = [(AgentAction(name, tool_input, f"Action: {name}\nAction Input: {tool_input}"), future.result())
+                 for (name, tool_input), future in zip(calls, futures)]
+
+        observations = "\n\n".join(
+            f"[{action.tool}: {action.tool_input}]\n"
+            f"{compress_observation(observation, OBSERVATION_TOKEN_BUDGET, question)}"
+            for action, observation in steps
+        ) or "(no tool was needed)"
+        answer = self._ask(ANSWER_PROMPT.format(
+            preamble=self.preamble, observations=observations, input=question
+        ), callbacks).strip()
+
+        # Through the Final Answer tool, like the ReAct agent: streaming clients receive it
+        formatted = self.final_tool.run(answer, callbacks=callbacks) if self.final_tool else answer
+        steps.append((AgentAction("Final Answer", answer, f"Action: Final Answer\nAction Input: {answer}"), formatted))
+        return {"input": question, "output": answer, "intermediate_steps": steps}
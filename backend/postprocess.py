@@ -0,0 +1,222 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+# Rules of the agent output post-processing, compiled once at import.
+# Lines containing one of these are ReAct or logging noise
+SKIP_MARKERS = ("> Entering new", "> Finished", "Invalid Format:", "Action Input:", "Thought:", "INFO:",
+                "WARNING:", "LangChainDeprecationWarning", "warn_deprecated")
+# The first line containing one of these is the greeting
+GREETING_PHRASES = ("Hello!", "I'm ready", "Ready to help", "How can I assist", "Let me help",
+                    "Welcome", "I can help you with")
+# Lines starting a block, checked in this order
+BLOCK_HEADERS = (
+    ("database_info", ("Information from Database:",)),
+    ("web_info", ("Information from Web:",)),
+    ("final_answer", ("Action: Final Answer",)),
+    ("additional_info", ("Based on my research", "Voici les informations", "Additional information",
+                         "Here's what I found")),
+)
+# Block lines starting with these are dropped
+DROPPED_PREFIXES = ("Action:", "I'm ready", "Please provide")
+# final_answer drops response lines starting with these
+ANSWER_DROPPED_PREFIXES = ("Action:", "Action Input:", "Thought:", ">", "Invalid Format:")
+
+# Emoji prefixed to an answer without one, by the first category of words it contains
+ANSWER_EMOJIS = ("👋", "🇲🇦", "⚽", "🏆", "🏟️", "🏨", "🌤️")
+ANSWER_CATEGORIES = (
+    ("👋", ("bonjour", "hi", "hello", "salam")),
+    ("🌤️", ("météo", "temps", "weather")),
+    ("🏨", ("hotel", "logement", "hébergement")),
+    ("🏛️", ("monument", "visite", "tourisme")),
+    ("🏆", ("can", "afcon")),
+)
+# Same for the response built from terminal blocks
+BLOCKS_EMOJIS = ("👋", "🇲🇦", "⚽", "🏆")
+BLOCKS_CATEGORIES = (
+    ("👋", ("bonjour", "hi", "hello", "salam")),
+    ("🏨", ("hotel", "logement")),
+    ("🏟️", ("stade", "ville")),
+)
+DEFAULT_EMOJI = "🇲🇦"
+EMPTY_RESPONSE = "👋 Je suis là pour vous aider avec la CAN 2025 au Maroc. Que voulez-vous savoir ?"
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex matching any of ``words``, factored by common prefix.
+
+    The engine then skips positions whose character starts no word and
+    follows a single branch from the others, instead of trying every word.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        group = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return (group if len(branches) > 1 else "(?:" + group + ")") + "?"
+        return group
+    return build(trie)
+
+# Which rule a marker belongs to: skip, greeting or a block name
+_MARKER_RULES = tuple(
+    [(marker, "skip") for marker in SKIP_MARKERS]
+    + [(phrase, "greeting") for phrase in GREETING_PHRASES]
+    + [(marker, name) for name, markers in BLOCK_HEADERS for marker in markers]
+)
+# One search over a whole chunk finds the few lines with a marker; the others are block content
+_ANY_MARKER = re.compile(_trie_pattern(marker for marker, _ in _MARKER_RULES))
+_RULE_OF_MARKER = dict(_MARKER_RULES)
+
+_CODE_BLOCK = re.compile(r'```[^`]*```')
+# Removed in this order: removing a link can join "Please" and " provide" into a new leftover
+_LEFTOVERS = (
+    ("Source: http", re.compile(r"Source: http[s]?://\S+")),
+    ("I'm ready", re.compile(r"I'm ready.*")),
+    ("Please provide", re.compile(r"Please provide.*")),
+)
+_WHITESPACE = re.compile(r'\s+')
+
+def _with_emoji(text: str, emojis, categories) -> str:
+    """Prefix ``text`` with the emoji of its first matching category, unless it has one"""
+    if any(emoji in text for emoji in emojis):
+        return text
+    lowered = text.lower()
+    for emoji, words in categories:
+        if any(word in lowered for word in words):
+            return f"{emoji} {text}"
+    return f"{DEFAULT_EMOJI} {text}"
+
+class _LineStream(ABC):
+    """Cut chunks of text into lines; lines are handled together once their newline arrives"""
+
+    def __init__(self):
+        self._partial: List[str] = []
+
+    def feed(self, chunk: str) -> "_LineStream":
+        self._partial.append(chunk)
+        if "\n" in chunk:
+            text = "".join(self._partial)
+            end = text.rindex("\n")
+            self._partial = [text[end + 1:]]
+            self._lines(text[:end])
+        return self
+
+    def _flush(self):
+        self._lines("".join(self._partial))
+        self._partial = []
+
+    @abstractmethod
+    def _lines(self, text: str):
+        """Handle ``text``: whole lines, without the final newline"""
+
+class TerminalBlockParser(_LineStream):
+    """Sort agent output into greeting, database, web, additional and final answer blocks.
+
+    Feed the output in chunks of any size (e.g. tokens as they are generated),
+    then :meth:`close` returns the blocks: the same as parsing the whole text
+    at once.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.blocks: Dict[str, Optional[List[str]]] = {
+            "greeting": None, "database_info": [], "web_info": [], "additional_info": [], "final_answer": []
+        }
+        self._current: Optional[str] = None
+
+    def _content(self, lines: List[str]):
+        if self._current and lines:
+            self.blocks[self._current] += [
+                line for line in map(str.strip, lines) if line and not line.startswith(DROPPED_PREFIXES)
+            ]
+
+    def _lines(self, text: str):
+        lines = text.split("\n")
+        first, offset = 0, 0
+        match = _ANY_MARKER.search(text)
+        while match:
+            index = first + text.count("\n", offset, match.start())
+            self._content(lines[first:index])
+            # Skipping wins over every other rule: no need to look for more markers
+            if _RULE_OF_MARKER[match.group()] != "skip":
+                self._marker_line(lines[index].strip())
+            end = text.find("\n", match.start())
+            if end == -1:
+                return
+            first, offset = index + 1, end + 1
+            match = _ANY_MARKER.search(text, offset)
+        self._content(lines[first:])
+
+    def _marker_line(self, line: str):
+        found = {rule for marker, rule in _MARKER_RULES if marker in line}
+        if "skip" in found:
+            return
+        if self.blocks["greeting"] is None and "greeting" in found:
+            self.blocks["greeting"] = line
+            return
+        for name, _ in BLOCK_HEADERS:
+            if name in found:
+                self._current = name
+                return
+        self._content([line])
+
+    def close(self) -> Dict[str, Optional[List[str]]]:
+        self._flush()
+        return self.blocks
+
+class AnswerFormatter(_LineStream):
+    """Drop ReAct leftovers from a final answer and prefix a matching emoji, fed in chunks"""
+
+    def __init__(self):
+        super().__init__()
+        self._kept: List[str] = []
+
+    def _lines(self, text: str):
+        self._kept += [line for line in text.split("\n")
+                       if line and not line.isspace() and not line.startswith(ANSWER_DROPPED_PREFIXES)]
+
+    def close(self) -> str:
+        self._flush()
+        return _with_emoji("\n".join(self._kept), ANSWER_EMOJIS, ANSWER_CATEGORIES)
+
+def parse_terminal_output(text: str) -> Dict[str, Optional[List[str]]]:
+    return TerminalBlockParser().feed(text).close()
+
+def format_answer(text: str) -> str:
+    return AnswerFormatter().feed(text).close()
+
+def format_blocks(blocks: Dict[str, Optional[List[str]]]) -> str:
+    """One response from the blocks: final answer first, else additional, else database and web info"""
+    response_parts = [blocks["greeting"]] if blocks["greeting"] else []
+
+    if blocks["final_answer"]:
+        main_content = [line for line in blocks["final_answer"]
+                        if "I'm ready" not in line and "Please provide" not in line]
+    else:
+        main_content = list(blocks["additional_info"])
+    if not main_content:
+        main_content += [line for line in blocks["database_info"]
+                         if not line.startswith(("I'm ready", "Please provide"))]
+        main_content += [line for line in blocks["web_info"]
+                         if line != "No results found" and not line.startswith("Error")]
+
+    if main_content:
+        response = "\n".join(main_content)
+        # Skip the regex passes when what they remove is not there
+        if "```" in response:
+            response = _CODE_BLOCK.sub('', response)
+        for trigger, pattern in _LEFTOVERS:
+            if trigger in response:
+                response = pattern.sub('', response)
+        response_parts.append(_with_emoji(response, BLOCKS_EMOJIS, BLOCKS_CATEGORIES).strip())
+    else:
+        response_parts.append(EMPTY_RESPONSE)
+
+    return _WHITESPACE.sub(' ', " ".join(response_parts).strip())
@@ -1,44 +1,161 @@
+import hashlib
 import json
-import google.generativeai as genai
-from langchain_community.vectorstores import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+import math
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, List
 from langchain.chains import RetrievalQA
-from langchain.text_splitter import CharacterTextSplitter
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
 import os
 from dotenv import load_dotenv
 
+from bm25 import BM25Index, reciprocal_rank_fusion
+from datastore import normalize_city, normalize_text
+from embeddings import get_embedding
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock between processes, run a single worker there
+    fcntl = None
+
 # Load environment variables
 load_dotenv()
-GOOGLE_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables")
-genai.configure(api_key=GOOGLE_API_KEY)
 
 # Define constants
 PERSIST_DIRECTORY = os.path.join("database", "vector_store")
 DATA_DIRECTORY = os.path.join("database", "data_processed")
 
+MANIFEST_PATH = os.path.join(PERSIST_DIRECTORY, "manifest.json")
+# Bump when the document format changes: existing indexes are then rebuilt
+INDEX_VERSION = 2
+# Records embedded per request when (re)building the index
+EMBEDDING_BATCH_SIZE = 100
+# Seconds between checks of the source files by the running API (0 disables it)
+WATCH_INTERVAL = float(os.getenv("RAG_WATCH_INTERVAL", "30"))
+# Seconds a replaced collection is kept for the requests and workers still reading it. Without
+# watching, workers never switch to a newer collection: replaced ones are then never deleted
+RETIRED_GRACE_SECONDS = max(60.0, 3 * WATCH_INTERVAL) if WATCH_INTERVAL > 0 else None
+# Held by the process writing the index: workers sharing PERSIST_DIRECTORY write one at a time
+LOCK_PATH = os.path.join(PERSIST_DIRECTORY, "writer.lock")
+# Exported index opened read-only instead of the Chroma store (set by serve.py for its workers)
+INDEX_SNAPSHOT = os.getenv("RAG_INDEX_SNAPSHOT")
+
+# SQLite errors of a damaged store file (SQLITE_CORRUPT, SQLITE_NOTADB): the only ones wiping the store
+CORRUPTION_CODES = (11, 26)
+CORRUPTION_MESSAGES = ("database disk image is malformed", "file is not a database")
+
+# Candidates taken from each of the vector and BM25 rankings before fusion
+HYBRID_FETCH_K = 20
+
+# Records bigger than this are split by their sub-sections instead of embedded whole
+MAX_RECORD_CHARS = 1200
+
+# Fields copied into the document metadata so retrieval can be filtered on them
+CITY_FIELDS = ("City", "city", "Delegation", "Commune", "destination", "location")
+REGION_FIELDS = ("Région", "Region", "region")
+ID_FIELDS = ("Hotel_ID", "INPE")
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+def _format_value(value):
+    """Render a record value compactly: lists inline, nested dicts as key: value pairs"""
+    if isinstance(value, dict):
+        return ", ".join(f"{k} {_format_value(v)}" for k, v in value.items() if not _is_missing(v))
+    if isinstance(value, list):
+        return ", ".join(_format_value(v) for v in value if not _is_missing(v))
+    return str(value)
+
+def _format_record(record, context):
+    """One line per field, prefixed with the place of the record in its file"""
+    lines = [f"[{' > '.join(context)}]"] if context else []
+    for key, value in record.items():
+        # Spreadsheet leftovers ("Unnamed: 5") and empty cells carry no information
+        if _is_missing(value) or str(key).startswith("Unnamed"):
+            continue
+        lines.append(f"{key}: {_format_value(value)}")
+    return "\n".join(lines)
+
+def _is_record_list(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+
+def _iter_records(node, path):
+    """Yield ``(path, record)`` for every logical record of a JSON document.
+
+    Items of a list of objects are records (a hotel, a pharmacy, a match...).
+    Other objects are records as long as they are small; larger ones are split
+    by key so that a record is never cut in the middle.
+    """
+    if _is_record_list(node):
+        for index, item in enumerate(node):
+            key = next((str(item[f]) for f in ID_FIELDS if not _is_missing(item.get(f))), str(index))
+            yield path + [key], item
+        return
+    if not isinstance(node, dict):
+        yield path, {path[-1] if path else "value": node}
+        return
+
+    scalars = {}
+    for key, value in node.items():
+        if _is_record_list(value) or (isinstance(value, dict) and len(_format_record(value, [])) > MAX_RECORD_CHARS):
+            yield from _iter_records(value, path + [key])
+        elif isinstance(value, dict) and any(_is_record_list(v) for v in value.values()):
+            yield from _iter_records(value, path + [key])
+        else:
+            scalars[key] = value
+    if scalars:
+        if len(_format_record(scalars, [])) > MAX_RECORD_CHARS and len(scalars) > 1:
+            for key, value in scalars.items():
+                yield path + [key], {key: value}
+        else:
+            yield path, scalars
+
+def _record_metadata(record, path, source):
+    metadata = {
+        "source": source,
+        "type": source.replace('.json', ''),
+        "record_id": f"{source}:{'/'.join(path)}",
+    }
+    city = next((record[f] for f in CITY_FIELDS if isinstance(record.get(f), str)), None)
+    region = next((record[f] for f in REGION_FIELDS if isinstance(record.get(f), str)), None)
+    if city:
+        metadata["city"] = normalize_city(city)
+    if region:
+        metadata["region"] = normalize_text(region)
+    return metadata
+
 def process_json_data(json_data, source):
-    """Process JSON data into a format suitable for vectorization"""
-    processed_text = []
-
-    def extract_data(data, parent_key=''):
-        """Helper function to recursively extract key-value pairs from the JSON structure"""
-        if isinstance(data, dict):
-            for key, value in data.items():
-                new_key = f"{parent_key}_{key}" if parent_key else key
-                extract_data(value, new_key)
-        elif isinstance(data, list):
-            for index, item in enumerate(data):
-                extract_data(item, f"{parent_key}_{index}")
+    """Split JSON data into one compact document per logical record"""
+    documents = []
+    seen = {}
+    repeats = {}
+    stem = source.replace('.json', '')
+    for path, record in _iter_records(json_data, []):
+        # The file name and the keys leading to a record (region, city...) give its context
+        context = [stem] + [p for p in path[:-1] if not p.isdigit() and p != stem]
+        document = Document(
+            page_content=_format_record(record, context),
+            metadata=_record_metadata(record, path, source)
+        )
+        record_id = document.metadata["record_id"]
+        if record_id in seen:
+            # Some source rows are repeated verbatim, others share an identifier
+            if seen[record_id] == document.page_content:
+                continue
+            repeats[record_id] = repeats.get(record_id, 0) + 1
+            document.metadata["record_id"] = f"{record_id}#{repeats[record_id]}"
         else:
-            # Add leaf node to the text
-            processed_text.append(f"{parent_key}: {data}")
-    
-    # Start processing the JSON data
-    extract_data(json_data)
-    return "\n".join(processed_text)
+            seen[record_id] = document.page_content
+        documents.append(document)
+    return documents
 
 def load_json_files():
     """Load and process all JSON files from the data directory"""
@@ -52,95 +169,404 @@ def load_json_files():
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                # Process the JSON data into a more searchable format
-                text = process_json_data(data, json_file)
-                # Create a document with metadata
-                documents.append(Document(
-                    page_content=text,
-                    metadata={
-                        "source": json_file,
-                        "type": json_file.replace('.json', '')
-                    }
-                ))
+                # One document per record, with city/region metadata for filtering
+                documents.extend(process_json_data(data, json_file))
         except Exception as e:
             print(f"Error loading {json_file}: {str(e)}")
     
     return documents
 
-def create_vector_store(embedding):
-    """Create a new vector store from documents"""
-    documents = load_json_files()
-    text_splitter = CharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,  # Increased overlap for better context
-        separator="\n"
-    )
-    
-    # Split documents into chunks
-    docs = []
-    for doc in documents:
-        splits = text_splitter.split_text(doc.page_content)
-        for split in splits:
-            docs.append(Document(
-                page_content=split,
-                metadata=doc.metadata
-            ))
-
-    # Create and persist the vector store
-    return Chroma.from_documents(
-        documents=docs,
-        embedding=embedding,
-        persist_directory=PERSIST_DIRECTORY
+def record_hash(document):
+    """Content hash of a record document, metadata included"""
+    payload = document.page_content + json.dumps(document.metadata, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def source_fingerprints():
+    """Content hash of every source JSON file"""
+    fingerprints = {}
+    for json_file in sorted(f for f in os.listdir(DATA_DIRECTORY) if f.endswith('.json')):
+        with open(os.path.join(DATA_DIRECTORY, json_file), 'rb') as f:
+            fingerprints[json_file] = hashlib.sha256(f.read()).hexdigest()
+    return fingerprints
+
+def embedding_model_name(embedding):
+    return getattr(embedding, "model", None) or getattr(embedding, "model_name", None) or type(embedding).__name__
+
+def load_manifest():
+    """Return the manifest of the persisted index, or None when missing or unreadable"""
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_manifest(manifest):
+    """Write the manifest atomically so readers never see a half-written file"""
+    manifest["updated_at"] = datetime.now().isoformat()
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def open_vector_store(embedding, collection_name):
+    # Imported here: workers serving a snapshot never load the Chroma integration
+    from langchain_community.vectorstores import Chroma
+    return Chroma(
+        collection_name=collection_name,
+        persist_directory=PERSIST_DIRECTORY,
+        embedding_function=embedding
     )
 
-def init_rag(llm):
-    """Initialize the RAG system with the provided LLM"""
-    # Use Google's embeddings
-    embedding = GoogleGenerativeAIEmbeddings(
-        model="models/embedding-001",
-        google_api_key=GOOGLE_API_KEY
+@contextmanager
+def writer_lock():
+    """Exclusive right to change the index and its manifest, across worker processes"""
+    os.makedirs(PERSIST_DIRECTORY, exist_ok=True)
+    with open(LOCK_PATH, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def new_collection_name():
+    return f"kb_{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+
+def copy_vector_store(embedding, source):
+    """New collection with the records and vectors of ``source``, nothing re-embedded"""
+    vectorstore = open_vector_store(embedding, new_collection_name())
+    page_size = EMBEDDING_BATCH_SIZE * 10
+    for offset in range(0, source._collection.count(), page_size):
+        page = source._collection.get(include=["embeddings", "documents", "metadatas"],
+                                      limit=page_size, offset=offset)
+        if page["ids"]:
+            vectorstore._collection.add(ids=page["ids"], embeddings=page["embeddings"],
+                                        documents=page["documents"], metadatas=page["metadatas"])
+    return vectorstore
+
+def _add_in_batches(vectorstore, documents):
+    for start in range(0, len(documents), EMBEDDING_BATCH_SIZE):
+        batch = documents[start:start + EMBEDDING_BATCH_SIZE]
+        # add_documents upserts: records whose id already exists are replaced
+        vectorstore.add_documents(batch, ids=[doc.metadata["record_id"] for doc in batch])
+
+def sync_vector_store(vectorstore, manifest, documents=None):
+    """Re-embed new or changed records and delete the ones gone from the sources.
+
+    Returns the updated manifest and a summary of what changed.
+    """
+    documents = load_json_files() if documents is None else documents
+    known = manifest.get("records", {})
+    current = {doc.metadata["record_id"]: record_hash(doc) for doc in documents}
+
+    changed = [doc for doc in documents if known.get(doc.metadata["record_id"]) != current[doc.metadata["record_id"]]]
+    stale = [record_id for record_id in known if record_id not in current]
+
+    if changed:
+        _add_in_batches(vectorstore, changed)
+    if stale:
+        vectorstore.delete(ids=stale)
+
+    manifest = {
+        **manifest,
+        "records": current,
+        "sources": source_fingerprints(),
+    }
+    stats = {
+        "added": sum(1 for doc in changed if doc.metadata["record_id"] not in known),
+        "updated": sum(1 for doc in changed if doc.metadata["record_id"] in known),
+        "deleted": len(stale),
+        "unchanged": len(documents) - len(changed),
+    }
+    return manifest, stats
+
+def create_vector_store(embedding, documents=None):
+    """Build a complete index in a new collection, next to the one currently served"""
+    collection_name = new_collection_name()
+    vectorstore = open_vector_store(embedding, collection_name)
+    manifest = {
+        "version": INDEX_VERSION,
+        "collection": collection_name,
+        "embedding_model": embedding_model_name(embedding),
+        "records": {},
+    }
+    manifest, stats = sync_vector_store(vectorstore, manifest, documents)
+    print(f"Vector store built: {stats['added']} records in {collection_name}")
+    return vectorstore, manifest
+
+def _is_compatible(manifest, embedding):
+    return (
+        manifest is not None
+        and manifest.get("version") == INDEX_VERSION
+        and manifest.get("embedding_model") == embedding_model_name(embedding)
     )
-    
-    try:
-        # Check if vector store exists
-        if os.path.exists(PERSIST_DIRECTORY):
-            try:
-                print("Loading existing vector store...")
-                vectorstore = Chroma(
-                    persist_directory=PERSIST_DIRECTORY,
-                    embedding_function=embedding
-                )
-                # Test the connection
-                vectorstore.get()
-            except Exception as e:
-                print(f"Error loading existing vector store: {e}")
-                print("Recreating vector store...")
-                # Remove existing store
-                import shutil
-                shutil.rmtree(PERSIST_DIRECTORY, ignore_errors=True)
-                os.makedirs(PERSIST_DIRECTORY, exist_ok=True)
-                vectorstore = create_vector_store(embedding)
+
+# Metadata filters the agent can put in front of a knowledge base query
+FILTER_KEYS = ("type", "city", "region")
+_FILTER_PATTERN = re.compile(r"\b(type|city|region)\s*[=:]\s*(\"[^\"]+\"|'[^']+'|[^\s,;]+)", re.IGNORECASE)
+
+def extract_metadata_filters(query):
+    """Split ``type=pharmacies city=Rabat open at night`` into filters and the text query"""
+    filters = {}
+    for key, value in _FILTER_PATTERN.findall(query):
+        key = key.lower()
+        value = value.strip("\"'")
+        if key == "city":
+            filters[key] = normalize_city(value)
+        elif key == "region":
+            filters[key] = normalize_text(value)
         else:
-            print("Creating new vector store...")
-            os.makedirs(PERSIST_DIRECTORY, exist_ok=True)
-            vectorstore = create_vector_store(embedding)
-        
-        vectorstore.persist()  # Persist immediately after creation
-        
-        retriever = vectorstore.as_retriever(
-            search_kwargs={
-                "k": 5  # Retrieve top 5 most relevant chunks
-            }
-        )
+            filters[key] = value.lower()
+    text = _FILTER_PATTERN.sub("", query).strip(" ,;") or query
+    return filters, text
+
+def _chroma_where(filters):
+    if len(filters) == 1:
+        return filters
+    if filters:
+        return {"$and": [{key: value} for key, value in filters.items()]}
+    return None
+
+class FilteredRetriever(BaseRetriever):
+    """Vector retriever honouring ``type=``/``city=``/``region=`` filters in the query"""
+    vectorstore: Any
+    k: int = 5
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        filters, text = extract_metadata_filters(query)
+        return self.vectorstore.similarity_search(text, k=self.k, filter=_chroma_where(filters))
 
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
+class HybridRetriever(FilteredRetriever):
+    """Vector and BM25 retrieval merged by reciprocal-rank fusion.
+
+    Exact names, INPE and phone numbers rank first in BM25 even when their
+    embedding is not close to the question's.
+    """
+    bm25: Any
+    fetch_k: int = HYBRID_FETCH_K
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        filters, text = extract_metadata_filters(query)
+        dense = self.vectorstore.similarity_search(text, k=self.fetch_k, filter=_chroma_where(filters))
+        sparse = [doc for doc, _ in self.bm25.search(text, k=self.fetch_k, filters=filters)]
+        return reciprocal_rank_fusion([sparse, dense], k=self.k)
+
+class KnowledgeBase:
+    """Handle on the RAG chain that can be refreshed while the API is serving.
+
+    Tools call :meth:`run`, which always goes through the current chain. The
+    collection being served is never written: a refresh copies it (or builds a
+    full index) into a new collection, applies the changes there, publishes it
+    in the manifest and then swaps the chain reference in one assignment. One
+    process at a time writes (:func:`writer_lock`); the other workers sharing
+    the directory follow the manifest. Replaced collections are deleted once
+    ``RETIRED_GRACE_SECONDS`` have passed.
+    """
+
+    def __init__(self, llm, embedding):
+        self.llm = llm
+        self.embedding = embedding
+        self.vectorstore = None
+        self.qa_chain = None
+        self.manifest = None
+        self._lock = threading.Lock()
+
+    # Whether refresh() is unavailable (workers serving an exported snapshot)
+    read_only = False
+
+    def size(self) -> int:
+        """Records currently searchable"""
+        return self.vectorstore._collection.count() if self.qa_chain else 0
+
+    def _build_chain(self, vectorstore, documents):
+        # The lexical index is built from the very records embedded in the vector store
+        retriever = HybridRetriever(
+            vectorstore=vectorstore,
+            bm25=BM25Index(documents),
+            k=5  # Retrieve top 5 most relevant records
+        )
+        return RetrievalQA.from_chain_type(
+            llm=self.llm,
             chain_type="stuff",  # Using "stuff" method for better context handling
             retriever=retriever,
             return_source_documents=False  # Disable source tracking to fix the output format
         )
 
-        return qa_chain
+    def _swap(self, vectorstore, manifest, documents):
+        # Readers keep using the previous chain until this single assignment
+        self.qa_chain = self._build_chain(vectorstore, documents)
+        self.vectorstore = vectorstore
+        self.manifest = manifest
+
+    def _publish(self, manifest, previous):
+        """Save ``manifest`` in place of ``previous``; call with the writer lock held"""
+        now = time.time()
+        retired = list((previous or {}).get("retired", []))
+        if previous and previous.get("collection") and previous["collection"] != manifest["collection"]:
+            retired.append({"collection": previous["collection"], "retired_at": now})
+        kept = []
+        for entry in retired:
+            if RETIRED_GRACE_SECONDS is None or now - entry["retired_at"] < RETIRED_GRACE_SECONDS:
+                kept.append(entry)
+                continue
+            try:
+                open_vector_store(self.embedding, entry["collection"]).delete_collection()
+            except Exception as e:
+                print(f"Error deleting retired collection {entry['collection']}: {e}")
+        published = {**manifest, "retired": kept}
+        save_manifest(published)
+        return published
+
+    def _updated_copy(self, manifest, documents):
+        """Copy of the published collection with the source changes applied"""
+        vectorstore = copy_vector_store(self.embedding, open_vector_store(self.embedding, manifest["collection"]))
+        updated, stats = sync_vector_store(vectorstore, {**manifest, "collection": vectorstore._collection.name},
+                                           documents)
+        return vectorstore, updated, stats
+
+    def load(self):
+        """Open the persisted index, bringing it up to date with the source files"""
+        with self._lock, writer_lock():
+            manifest = load_manifest()
+            documents = load_json_files()
+            if not _is_compatible(manifest, self.embedding):
+                print("Creating new vector store...")
+                vectorstore, built = create_vector_store(self.embedding, documents)
+                self._swap(vectorstore, self._publish(built, manifest), documents)
+                return
+            print("Loading existing vector store...")
+            vectorstore = open_vector_store(self.embedding, manifest["collection"])
+            # Cheap consistency check: a collection that lost records (interrupted build,
+            # deleted directory) is rebuilt instead of silently serving partial results
+            if vectorstore._collection.count() != len(manifest.get("records", {})):
+                print("Vector store does not match its manifest, rebuilding...")
+                vectorstore, built = create_vector_store(self.embedding, documents)
+                self._swap(vectorstore, self._publish(built, manifest), documents)
+                return
+            if manifest.get("sources") != source_fingerprints():
+                # Other workers may be serving this collection: update a copy
+                vectorstore, updated, stats = self._updated_copy(manifest, documents)
+                print(f"Vector store updated: {stats}")
+                manifest = self._publish(updated, manifest)
+            self._swap(vectorstore, manifest, documents)
+
+    def refresh(self, full=False):
+        """Pick up changes in the source files; ``full`` rebuilds the whole index"""
+        with self._lock, writer_lock():
+            # Another worker may have published a newer index since this one loaded
+            published = load_manifest()
+            documents = load_json_files()
+            if full or not _is_compatible(published, self.embedding):
+                vectorstore, built = create_vector_store(self.embedding, documents)
+                self._swap(vectorstore, self._publish(built, published), documents)
+                return {"rebuilt": True, "records": len(built["records"])}
+            if published.get("sources") == source_fingerprints():
+                if published["collection"] != self.manifest.get("collection"):
+                    self._swap(open_vector_store(self.embedding, published["collection"]), published, documents)
+                return {"added": 0, "updated": 0, "deleted": 0, "unchanged": len(published["records"])}
+            vectorstore, updated, stats = self._updated_copy(published, documents)
+            self._swap(vectorstore, self._publish(updated, published), documents)
+            return stats
+
+    def follow(self):
+        """Serve the index published by another worker, if it changed; returns whether it did"""
+        manifest = load_manifest()
+        if (not _is_compatible(manifest, self.embedding)
+                or manifest["collection"] == (self.manifest or {}).get("collection")):
+            return False
+        with self._lock:
+            self._swap(open_vector_store(self.embedding, manifest["collection"]), manifest, load_json_files())
+        return True
+
+    def watch(self, interval=None):
+        """Refresh in a background thread whenever a source file changes"""
+        interval = WATCH_INTERVAL if interval is None else interval
+        if interval <= 0:
+            return None
+
+        def loop():
+            last_seen = _source_mtimes()
+            while True:
+                time.sleep(interval)
+                seen = _source_mtimes()
+                try:
+                    if seen != last_seen:
+                        last_seen = seen
+                        # Every worker sees the change: the first one writes, the others follow it
+                        print(f"Source data changed, refreshing vector store: {self.refresh()}")
+                    elif self.follow():
+                        print(f"Serving the index published by another worker: {self.manifest['collection']}")
+                except Exception as e:
+                    print(f"Error refreshing vector store: {e}")
+
+        thread = threading.Thread(target=loop, name="kb-watcher", daemon=True)
+        thread.start()
+        return thread
+
+    def run(self, query, callbacks=None):
+        # Tools pass their callbacks along: agent traces include retrieval and the chain's LLM call
+        return self.qa_chain.run(query, callbacks=callbacks)
+
+def _source_mtimes():
+    return {
+        f: os.stat(os.path.join(DATA_DIRECTORY, f)).st_mtime_ns
+        for f in os.listdir(DATA_DIRECTORY) if f.endswith('.json')
+    }
+
+def init_rag(llm):
+    """Initialize the RAG system with the provided LLM"""
+    # Google or local embeddings, depending on EMBEDDING_BACKEND. The same cache
+    # serves index builds and query-time retrieval.
+    embedding = CachedEmbeddings(get_embedding(), EmbeddingCache())
+
+    if INDEX_SNAPSHOT:
+        from snapshot import SnapshotKnowledgeBase
+        knowledge_base = SnapshotKnowledgeBase(llm, embedding, INDEX_SNAPSHOT)
+        knowledge_base.load()
+        return knowledge_base
+
+    knowledge_base = KnowledgeBase(llm, embedding)
+    seen = load_manifest()
+    try:
+        knowledge_base.load()
     except Exception as e:
-        print(f"Error initializing RAG system: {e}")
-        raise
+        # Anything else (embedding API, network, a locked database) is raised: the next
+        # start retries an incremental load instead of re-embedding everything
+        if not is_corrupt_store(e):
+            print(f"Error initializing RAG system: {e}")
+            raise
+        print(f"Vector store is corrupt ({e}), recreating it...")
+        with writer_lock():
+            # Unless another worker already rebuilt it meanwhile
+            if load_manifest() == seen:
+                wipe_vector_store()
+        knowledge_base.load()
+    return knowledge_base
+
+def is_corrupt_store(error):
+    """Whether ``error`` (or an error it was raised from) means the store files are damaged"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, sqlite3.DatabaseError) and getattr(error, "sqlite_errorcode", None) in CORRUPTION_CODES:
+            return True
+        # Chroma's own storage reports them as "(code: 11) database disk image is malformed"
+        if any(message in str(error) for message in CORRUPTION_MESSAGES):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def wipe_vector_store():
+    """Delete the collections and the manifest; call with the writer lock held, which stays in place"""
+    from chromadb.api.client import SharedSystemClient
+    SharedSystemClient.clear_system_cache()
+    for name in os.listdir(PERSIST_DIRECTORY):
+        path = os.path.join(PERSIST_DIRECTORY, name)
+        # Exported snapshots may be mapped by serving workers, they do not depend on the store files
+        if path == LOCK_PATH or name == "snapshots":
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
@@ -0,0 +1,157 @@
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from datastore import find_known_value, normalize_text
+from geo import HOST_CITY_COORDINATES
+
+load_dotenv()
+
+# Set ROUTER_ENABLED=0 to send every question to the agent
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1").lower() not in ("0", "false", "no")
+# Longer questions are treated as open-ended and go to the agent
+ROUTER_MAX_WORDS = 25
+
+# Keyword prefixes matched against the normalized question (accents and case removed)
+_INTENT_PATTERNS = {
+    "weather": re.compile(r"\b(weather|meteo|forecast|temperature|quel temps|temps fait|rain|pluie|climat)"),
+    "pharmacy": re.compile(r"\b(pharmac)"),
+    "hospital": re.compile(r"\b(hospital|hopita|clinic|clinique|urgence|emergency)"),
+    "restaurant": re.compile(r"\b(restaurant|resto\b|where to eat|manger)"),
+    "hotel": re.compile(r"\b(hotel|accommodation|hebergement|logement|where to stay|ou dormir)"),
+}
+_NEARBY = re.compile(r"\b(near|nearest|closest|around|proche|pres de|autour|within \d+(?:\.\d+)? ?km)")
+_ALL_CITIES = re.compile(r"\b(host cities|all (?:the )?cities|villes hotes|toutes les villes)")
+_FORECAST = re.compile(r"\b(forecast|prevision|tomorrow|demain|week|semaine|next days|prochains jours)")
+# Questions about the tournament itself, answered by the knowledge base chain
+_TOURNAMENT = re.compile(r"\b(afcon|can 2025|coupe d afrique|africa cup(?: of nations)?|tournament|tournoi)\b")
+# Conditions the structured listings cannot apply (opening hours, on-duty pharmacies...): the agent can
+_UNHANDLED_QUALIFIERS = re.compile(r"\b(night|nuit|garde|on duty|duty|on call|open|opens|opened|ouvert|ouverte|ouverts"
+                                   r"|ouvertes|24 ?h|24 7|tonight|ce soir|now|maintenant|sunday|dimanche|holiday"
+                                   r"|ferie|best|meilleur|meilleure|meilleurs|recommend\w*|conseill\w*)\b")
+# Language of the tool output of each intent (weather.py answers in French): questions asked
+# in another language go to the agent, which translates
+_OUTPUT_LANGUAGES = {"weather": "fr", "nearby": "en", "pharmacy": "en", "hospital": "en", "restaurant": "en",
+                     "hotel": "en"}
+# Knowledge base answers admitting the information is missing: let the agent search the web
+_UNKNOWN_ANSWER = re.compile(r"(don't know|do not know|no information|not (?:mentioned|provided|available)"
+                             r"|ne sais pas|pas d'information|aucune information)", re.IGNORECASE)
+
+class IntentRouter:
+    """Keyword router answering well-understood questions without the ReAct loop.
+
+    Weather, pharmacy/hotel/restaurant/hospital listings and "near X" questions
+    go straight to the matching tool; tournament facts go to the knowledge base
+    chain (one LLM call instead of several). The tool output is formatted with
+    ``final_answer``. Anything ambiguous, open-ended, qualified beyond what the
+    tool can filter ("open at night"), asked in another language than the
+    tool answers in (French for the weather, English for the others) or
+    unanswered by the tool returns ``None`` and is left to the agent.
+    """
+
+    def __init__(self, datastore, geo_index=None, knowledge_base=None,
+                 weather: Optional[Callable[..., str]] = None,
+                 format_answer: Optional[Callable[[str], str]] = None):
+        self.datastore = datastore
+        self.geo_index = geo_index
+        self.knowledge_base = knowledge_base
+        self.weather = weather
+        self.format_answer = format_answer or (lambda text: text)
+        self.cities = {normalize_text(city) for city in HOST_CITY_COORDINATES} | set(datastore.cities())
+        self._lock = threading.Lock()
+        self.total = 0
+        self.fallbacks = 0
+        self.routed: Dict[str, int] = {}
+
+    def classify(self, query: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Return the intent of a question and the tool arguments, or ``(None, {})``"""
+        normalized = normalize_text(query)
+        if not normalized or len(normalized.split()) > ROUTER_MAX_WORDS:
+            return None, {}
+        intents = [intent for intent, pattern in _INTENT_PATTERNS.items() if pattern.search(normalized)]
+
+        if _NEARBY.search(normalized) and self.geo_index is not None and set(intents) <= {"hotel"}:
+            if self.geo_index.resolve_place(query):
+                return "nearby", {}
+        if len(intents) > 1:
+            # "weather in Rabat and a pharmacy": several tools, let the agent plan
+            return None, {}
+        if intents == ["weather"]:
+            city = "all" if _ALL_CITIES.search(normalized) else find_known_value(query, self.cities)
+            if not city:
+                return None, {}
+            return "weather", {"city": city, "forecast": bool(_FORECAST.search(normalized))}
+        if intents == ["hotel"]:
+            # Without a city or stadium the finder would list every hotel
+            if not (find_known_value(query, self.datastore.hotels.keys("city"))
+                    or find_known_value(query, self.datastore.hotels.keys("stadium"))):
+                return None, {}
+            return "hotel", {}
+        if intents:
+            if _UNHANDLED_QUALIFIERS.search(normalized):
+                # "pharmacies ouvertes la nuit": the full city list would not answer it
+                return None, {}
+            return intents[0], {}
+        if self.knowledge_base is not None and _TOURNAMENT.search(normalized):
+            return "knowledge_base", {}
+        return None, {}
+
+    def _dispatch(self, intent: str, args: Dict[str, Any], query: str, language: str) -> Optional[str]:
+        if intent == "weather":
+            if self.weather is None:
+                return None
+            result = self.weather(args["city"], args["forecast"])
+            return result if result.startswith("🌤️") else None
+        if intent == "nearby":
+            result = self.geo_index.search(query)
+            return result if result.startswith(("Closest places", "Places within")) else None
+        if intent == "knowledge_base":
+            result = self.knowledge_base.run(f"Respond in {language}. {query}")
+            return None if not result.strip() or _UNKNOWN_ANSWER.search(result) else result
+        search = {
+            "pharmacy": self.datastore.search_pharmacies,
+            "hospital": self.datastore.search_hospitals,
+            "restaurant": self.datastore.search_restaurants,
+            "hotel": self.datastore.search_hotels,
+        }[intent]
+        result = search(query)
+        return result if result.startswith("Found ") else None
+
+    def route(self, query: str, language: str = "en") -> Optional[str]:
+        """Answer ``query`` directly when its intent is clear, else return ``None``"""
+        intent, args = self.classify(query)
+        answer = None
+        # A clear intent asked in another language than its tool answers in falls back to the agent
+        output_language = _OUTPUT_LANGUAGES.get(intent)
+        in_language = output_language is None or (language or "en").lower().startswith(output_language)
+        if intent is not None and in_language:
+            try:
+                answer = self._dispatch(intent, args, query, language)
+                # final_answer drops ReAct leftovers and prefixes an emoji: check some text remains
+                answer = self.format_answer(answer) if answer is not None else None
+                if answer is not None and not answer.strip(" \n🇲🇦"):
+                    answer = None
+            except Exception as e:
+                print(f"Fast path '{intent}' failed, falling back to the agent: {e}")
+                answer = None
+        with self._lock:
+            self.total += 1
+            if answer is not None:
+                self.routed[intent] = self.routed.get(intent, 0) + 1
+            elif intent is not None:
+                self.fallbacks += 1
+        return answer
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            fast = sum(self.routed.values())
+            return {
+                "total": self.total,
+                "fast_path": fast,
+                "fast_path_ratio": round(fast / self.total, 4) if self.total else 0.0,
+                "by_intent": dict(self.routed),
+                "fallbacks": self.fallbacks,
+            }
@@ -0,0 +1,53 @@
+"""Production entry point: build the retrieval index once, then serve it from several workers.
+
+The index is brought up to date in a build process and exported as a
+memory-mapped snapshot. Every uvicorn worker then opens that snapshot
+read-only instead of its own Chroma store, so an extra worker adds little
+memory and starts without touching the index. Run from the ``backend``
+directory::
+
+    python serve.py --workers 4
+    python serve.py --build-only
+"""
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def build_snapshot() -> str:
+    """Load (or build) the index and export it; runs in its own process"""
+    from llm import init_llm
+    from rag import init_rag
+    from snapshot import export_snapshot
+    return export_snapshot(init_rag(init_llm()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--build-only", action="store_true", help="build the snapshot and exit")
+    args = parser.parse_args()
+
+    # The build opens the Chroma store itself, never a previous snapshot
+    os.environ.pop("RAG_INDEX_SNAPSHOT", None)
+    # A separate process: the supervisor does not keep the build's memory around
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        path = executor.submit(build_snapshot).result()
+    print(f"Serving index snapshot {path}")
+    if args.build_only:
+        return
+
+    # Read by the workers, which are spawned with this environment
+    os.environ["RAG_INDEX_SNAPSHOT"] = os.path.abspath(path)
+    # Workers cannot refresh a snapshot: source changes need a new build
+    os.environ["RAG_WATCH_INTERVAL"] = "0"
+    import uvicorn
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class _Counters:
+    def __init__(self):
+        self._counter_lock = threading.Lock()
+        self.runs = 0
+        self.shared = 0
+
+    def _count(self, leader: bool):
+        with self._counter_lock:
+            if leader:
+                self.runs += 1
+            else:
+                self.shared += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counter_lock:
+            calls = self.runs + self.shared
+            return {
+                "runs": self.runs,
+                "saved": self.shared,
+                "in_flight": len(self._calls),
+                "saved_ratio": round(self.shared / calls, 4) if calls else 0.0,
+            }
+
+class AsyncSingleFlight(_Counters):
+    """Coalesce identical coroutine calls that overlap in time.
+
+    The first caller of a key starts the work in its own task; callers arriving
+    with the same key before it finishes await that task and get its result (or
+    its exception). Nothing is kept once it is done: this is not a cache.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        self._count(task is None)
+        if task is None:
+            # Its own task: a leader whose client disconnects does not cancel the followers
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight(_Counters):
+    """Thread version of :class:`AsyncSingleFlight`, for blocking tool calls"""
+
+    def __init__(self):
+        super().__init__()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count(leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
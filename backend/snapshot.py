@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag import INDEX_VERSION, PERSIST_DIRECTORY, KnowledgeBase, embedding_model_name
+
+SNAPSHOT_DIRECTORY = os.path.join(PERSIST_DIRECTORY, "snapshots")
+# Records read from Chroma per request while exporting
+EXPORT_PAGE_SIZE = 1000
+
+def snapshot_id(manifest: Dict[str, Any]) -> str:
+    """Identity of the indexed content: same records and model, same snapshot"""
+    payload = json.dumps([manifest["embedding_model"], manifest["records"]], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def export_snapshot(knowledge_base: KnowledgeBase, directory: str = SNAPSHOT_DIRECTORY) -> str:
+    """Write the loaded index as flat files workers can memory-map; returns the snapshot path.
+
+    ``vectors.npy`` holds one float32 row per record, ``documents.json`` their
+    text and metadata in the same order. An existing snapshot of the same
+    content is reused; older ones are removed (a worker still mapping one keeps
+    its pages until it exits).
+    """
+    manifest = knowledge_base.manifest
+    path = os.path.join(directory, snapshot_id(manifest))
+    if os.path.exists(os.path.join(path, "snapshot.json")):
+        return path
+
+    collection = knowledge_base.vectorstore._collection
+    ids, vectors, documents = [], [], []
+    total = collection.count()
+    for offset in range(0, total, EXPORT_PAGE_SIZE):
+        page = collection.get(include=["embeddings", "documents", "metadatas"],
+                              limit=EXPORT_PAGE_SIZE, offset=offset)
+        ids += page["ids"]
+        vectors += list(page["embeddings"])
+        documents += [{"page_content": text, "metadata": metadata}
+                      for text, metadata in zip(page["documents"], page["metadatas"])]
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "vectors.npy"), np.asarray(vectors, dtype=np.float32))
+    with open(os.path.join(tmp_path, "documents.json"), "w", encoding="utf-8") as f:
+        json.dump(documents, f, ensure_ascii=False)
+    with open(os.path.join(tmp_path, "snapshot.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": INDEX_VERSION,
+            "collection": manifest["collection"],
+            "embedding_model": manifest["embedding_model"],
+            "records": len(ids),
+            "created_at": datetime.now().isoformat(),
+        }, f)
+    # The snapshot appears complete or not at all
+    os.replace(tmp_path, path)
+
+    for name in os.listdir(directory):
+        if name != os.path.basename(path):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    print(f"Index snapshot written: {len(ids)} records in {path}")
+    return path
+
+class MmapVectorStore:
+    """Read-only exact nearest-neighbour search over a memory-mapped snapshot.
+
+    Every worker maps the same ``vectors.npy``: the pages live once in the OS
+    page cache instead of once per process. Implements the subset of the Chroma
+    vector store used by the retrievers (``similarity_search`` with a
+    ``where`` filter), ranking by L2 distance like Chroma's default space.
+    """
+
+    def __init__(self, path: str, embedding):
+        self.path = path
+        self.embedding = embedding
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(path, "documents.json"), "r", encoding="utf-8") as f:
+            self.documents = [Document(**document) for document in json.load(f)]
+        self._squared_norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _column(self, key: str) -> np.ndarray:
+        if key not in self._columns:
+            self._columns[key] = np.array([doc.metadata.get(key) for doc in self.documents], dtype=object)
+        return self._columns[key]
+
+    def _mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        clauses = where["$and"] if "$and" in where else [where]
+        mask = np.ones(len(self.documents), dtype=bool)
+        for clause in clauses:
+            for key, value in clause.items():
+                mask &= self._column(key) == value
+        return mask
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        if not self.documents:
+            return []
+        query_vector = np.asarray(self.embedding.embed_query(query), dtype=np.float32)
+        # |v - q|^2 without the constant |q|^2
+        distances = self._squared_norms - 2.0 * (self.vectors @ query_vector)
+        mask = self._mask(filter)
+        if mask is not None:
+            distances = np.where(mask, distances, np.inf)
+        k = min(k, len(distances))
+        candidates = np.argpartition(distances, k - 1)[:k]
+        ranked = candidates[np.argsort(distances[candidates], kind="stable")]
+        return [self.documents[i] for i in ranked if np.isfinite(distances[i])]
+
+class SnapshotKnowledgeBase(KnowledgeBase):
+    """Knowledge base of a serving worker: the exported snapshot, opened read-only.
+
+    The index is built once by ``serve.py`` before the workers start; changes to
+    the sources need a new snapshot and a restart.
+    """
+    read_only = True
+
+    def __init__(self, llm, embedding, path: str):
+        super().__init__(llm, embedding)
+        self.path = path
+
+    def load(self):
+        with open(os.path.join(self.path, "snapshot.json"), "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        if snapshot["embedding_model"] != embedding_model_name(self.embedding):
+            raise ValueError(f"Snapshot {self.path} was built with {snapshot['embedding_model']}, "
+                             f"not {embedding_model_name(self.embedding)}")
+        vectorstore = MmapVectorStore(self.path, self.embedding)
+        self.qa_chain = self._build_chain(vectorstore, vectorstore.documents)
+        self.vectorstore = vectorstore
+        self.manifest = snapshot
+
+    def refresh(self, full=False):
+        raise RuntimeError("The index is read-only in this worker: rebuild it with serve.py and restart")
+
+    def watch(self, interval=None):
+        return None
+
+    def size(self) -> int:
+        return len(self.vectorstore) if self.qa_chain else 0
@@ -0,0 +1,95 @@
+import contextlib
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+class LazyComponents:
+    """Build the heavy components of the API once, off the import path.
+
+    :meth:`start` runs the builder in a background thread so the server accepts
+    connections (``/ready``, ``/health``, ``/metrics``) while the index and the
+    agent are loading; :meth:`get` waits for it, or runs it inline when nothing
+    started it. The builder receives a ``stage(name)`` context manager whose
+    durations are reported by :meth:`status`.
+    """
+
+    def __init__(self, build: Callable[[Callable[[str], Any]], Any]):
+        self._build = build
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._value = None
+        self._error: Optional[BaseException] = None
+        self._started_at: Optional[float] = None
+        self._seconds: Optional[float] = None
+        self._stages: Dict[str, float] = {}
+        self._current: Optional[str] = None
+
+    @contextlib.contextmanager
+    def _stage(self, name: str):
+        self._current = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stages[name] = round(time.perf_counter() - started, 4)
+            self._current = None
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            self._value = self._build(self._stage)
+        except BaseException as e:
+            self._error = e
+            print(f"Error initializing components: {e}")
+        finally:
+            self._seconds = round(time.perf_counter() - started, 4)
+            self._done.set()
+        if self._error is None:
+            print(f"Components ready in {self._seconds:.2f}s: {self._stages}")
+
+    def _claim(self) -> bool:
+        """Mark the build as started; False when another caller already did"""
+        with self._lock:
+            if self._started_at is not None:
+                return False
+            self._started_at = time.time()
+            return True
+
+    def start(self) -> Optional[threading.Thread]:
+        """Build in a background thread (no-op when already started)"""
+        if not self._claim():
+            return None
+        self._thread = threading.Thread(target=self._run, name="components-init", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def get(self, timeout: Optional[float] = None):
+        """The built components; builds them in the calling thread when nothing started it"""
+        if not self._done.is_set() and self._claim():
+            self._run()
+        if not self._done.wait(timeout):
+            raise TimeoutError("Components are still initializing")
+        if self._error is not None:
+            raise RuntimeError(f"Components failed to initialize: {self._error}") from self._error
+        return self._value
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set() and self._error is None
+
+    def status(self) -> Dict[str, Any]:
+        if self._started_at is None:
+            state = "pending"
+        elif not self._done.is_set():
+            state = "initializing"
+        else:
+            state = "failed" if self._error is not None else "ready"
+        return {
+            "state": state,
+            "stage": self._current,
+            "stages": dict(self._stages),
+            "seconds": self._seconds if self._done.is_set() else (
+                round(time.time() - self._started_at, 4) if self._started_at else None),
+            "error": str(self._error) if self._error is not None else None,
+        }
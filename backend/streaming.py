@@ -0,0 +1,86 @@
+import asyncio
+import json
+import re
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# The ReAct output switches to the user-facing answer after these two lines
+FINAL_ANSWER_MARKER = re.compile(r"Action:\s*Final Answer\s*\n\s*Action Input:\s*")
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class AgentEventStreamer(BaseCallbackHandler):
+    """Forward agent progress from the worker thread to an asyncio queue.
+
+    Events pushed to the queue are ``(event, data)`` tuples:
+
+    - ``tool_start`` / ``tool_end`` when the agent calls one of its tools
+    - ``token`` for each piece of the Final Answer as the LLM generates it
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self.loop = loop
+        self.queue = queue
+        self.answer_streamed = False
+        self._buffer = ""
+        self._sent = 0
+        self._in_answer = False
+        self._tool_names: Dict[UUID, str] = {}
+
+    def _emit(self, event: str, data: Any):
+        # Callbacks run on the agent worker thread, the queue belongs to the event loop
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts, **kwargs: Any):
+        self._buffer = ""
+        self._sent = 0
+        self._in_answer = False
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages, **kwargs: Any):
+        self.on_llm_start(serialized, [], **kwargs)
+
+    def on_llm_new_token(self, token: str, **kwargs: Any):
+        self._buffer += token
+        if not self._in_answer:
+            match = FINAL_ANSWER_MARKER.search(self._buffer)
+            if not match:
+                return
+            self._in_answer = True
+            self._sent = match.end()
+        pending = self._buffer[self._sent:]
+        if pending:
+            self._sent = len(self._buffer)
+            self.answer_streamed = True
+            self._emit("token", {"text": pending})
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *,
+                      run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        if parent_run_id in self._tool_names:
+            # Tools wrapping another @tool report a nested run, only the outer one matters
+            return
+        name = serialized.get("name", "")
+        self._tool_names[run_id] = name
+        if name == "Final Answer":
+            # The model did not stream: send the whole answer as soon as it is known
+            if not self.answer_streamed:
+                self.answer_streamed = True
+                self._emit("token", {"text": input_str})
+            return
+        self._emit("tool_start", {"tool": name, "input": input_str})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        if run_id not in self._tool_names:
+            return
+        name = self._tool_names.pop(run_id)
+        if name != "Final Answer":
+            self._emit("tool_end", {"tool": name})
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        if run_id not in self._tool_names:
+            return
+        name = self._tool_names.pop(run_id)
+        self._emit("tool_end", {"tool": name, "error": str(error)})
@@ -0,0 +1,88 @@
+import datastore
+from datastore import DataStore, Hotel, Pharmacy, Table, normalize_city, parse_query
+
+def hotel(hotel_id, city, stars, price, distance, stadium="Grand Stade de Tanger", amenities=()):
+    return Hotel(hotel_id=hotel_id, name=f"Hotel {hotel_id}", city=city, nearest_stadium=stadium,
+                 distance_km=distance, stars=stars, price_usd=price, price_range="", address="",
+                 phone="", website="", amenities=list(amenities))
+
+HOTELS = [
+    hotel("h1", "Tanger", 5, 320, 4.0, amenities=["Pool", "Spa"]),
+    hotel("h2", "Tangier", 3, 90, 1.5, amenities=["Wifi"]),
+    hotel("h3", "Rabat", 4, 150, 2.0, stadium="Stade Prince Moulay Abdellah", amenities=["Pool"]),
+    hotel("h4", "Fès", 4, 120, 6.0, stadium="Complexe Sportif de Fès"),
+    hotel("h5", "Rabat", 2, 60, 8.5, stadium="Stade Prince Moulay Abdellah"),
+    hotel("h6", "Tanger", 4, 200, 3.0),
+]
+
+def hotels_table():
+    return Table(
+        "hotels", HOTELS,
+        hash_keys={
+            "city": lambda h: [normalize_city(h.city)],
+            "amenity": lambda h: [datastore.normalize_text(a) for a in h.amenities],
+        },
+        sorted_keys=["price_usd", "stars", "distance_km"]
+    )
+
+def ids(rows):
+    return [row.hotel_id for row in rows]
+
+def test_normalize_city_merges_spellings():
+    assert normalize_city("Tangier") == normalize_city("TANGER") == "tanger"
+    assert normalize_city("Fès") == normalize_city("fez") == "fes"
+    assert normalize_city("CT OUARZAZATE") == "ouarzazate"
+    assert normalize_city("Salé (Mun.)") == "sale"
+
+def test_select_matches_a_full_scan():
+    table = hotels_table()
+    for city in ("tanger", "rabat", "fes", "agadir"):
+        for low, high in ((None, None), (100, 250), (None, 120), (150, None)):
+            expected = [h for h in HOTELS if normalize_city(h.city) == city
+                        and (low is None or h.price_usd >= low) and (high is None or h.price_usd <= high)]
+            rows = table.select({"city": city}, {"price_usd": (low, high)})
+            assert ids(rows) == ids(expected)
+
+def test_select_range_bounds_are_inclusive():
+    table = hotels_table()
+    assert ids(table.select(ranges={"stars": (4, 4)})) == ["h3", "h4", "h6"]
+    assert ids(table.select(ranges={"price_usd": (90, 150)})) == ["h2", "h3", "h4"]
+
+def test_select_intersects_every_condition():
+    table = hotels_table()
+    rows = table.select({"city": "tanger", "amenity": "pool"}, {"stars": (4, None)})
+    assert ids(rows) == ["h1"]
+    assert table.select({"city": "tanger", "amenity": "spa"}, {"price_usd": (None, 100)}) == []
+
+def test_select_orders_and_limits():
+    table = hotels_table()
+    assert ids(table.select(order_by="price_usd", limit=3)) == ["h5", "h2", "h4"]
+    rows = table.select({"city": "tanger"}, order_by="stars", descending=True)
+    assert ids(rows) == ["h1", "h6", "h2"]
+
+def test_parse_query_key_values():
+    params = parse_query("city=Rabat, max_price=200, min_stars=4, limit=3")
+    assert params == {"city": "Rabat", "max_price": 200.0, "min_stars": 4, "limit": 3}
+
+def test_parse_query_natural_language():
+    assert parse_query("hotels in Rabat under $200 with 4+ stars") == {"max_price": 200.0, "min_stars": 4}
+    assert parse_query("3 stars within 5 km of the stadium") == {"min_stars": 3, "max_stars": 3, "max_distance": 5.0}
+    assert parse_query("hôtels à moins de 2 km, plus de 100 $") == {"max_distance": 2.0, "min_price": 100.0}
+
+def test_parse_query_skips_bad_numbers():
+    assert parse_query("limit=many, city=Fès") == {"city": "Fès"}
+
+def test_search_hotels_applies_the_parsed_filters(monkeypatch):
+    monkeypatch.setattr(datastore, "_load_hotels", lambda: list(HOTELS))
+    monkeypatch.setattr(datastore, "_load_pharmacies", lambda: [Pharmacy("123456789", "Pharmacie Atlas", "1 rue X", "Rabat")])
+    monkeypatch.setattr(datastore, "_load_restaurants", list)
+    monkeypatch.setattr(datastore, "_load_hospitals", list)
+    store = DataStore()
+
+    answer = store.search_hotels("hotels in Tangier under $250")
+    assert answer.startswith("Found 2 hotels:")
+    assert answer.index("Hotel h2") < answer.index("Hotel h6")
+    assert "Hotel h1" not in answer
+    assert store.search_hotels("city=Agadir") == "No hotels found matching these criteria."
+    assert "Pharmacie Atlas" in store.search_pharmacies("pharmacy 123456789")
+    assert store.search_pharmacies("a pharmacy please").startswith("Please specify a city")
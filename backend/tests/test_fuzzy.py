@@ -0,0 +1,65 @@
+from datastore import Hospital, Hotel, Pharmacy, Restaurant, normalize_text
+from fuzzy import MIN_SIMILARITY, FuzzyIndex, trigrams
+
+def hotel(hotel_id, name, city, address):
+    return Hotel(hotel_id=hotel_id, name=name, city=city, nearest_stadium="Grand Stadium", distance_km=3.0,
+                 stars=4, price_usd=120.0, price_range="", address=address, phone="", website="")
+
+TABLES = {
+    "hotels": [
+        hotel("h1", "Riad Yasmine", "Marrakech", "12 Derb Sidi Bouloukat"),
+        hotel("h2", "Hôtel Ibis Salé", "Salé", "Avenue Mohammed V"),
+        hotel("h3", "Kenzi Tower", "Casablanca", "Boulevard Zerktouni"),
+    ],
+    "pharmacies": [
+        Pharmacy("111111111", "Pharmacie Essalam", "3 rue Ibn Sina", "Salé"),
+        Pharmacy("222222222", "Pharmacie du Marché", "Place Jemaa el-Fna", "MARRAKECH"),
+    ],
+    "restaurants": [
+        Restaurant("Au Bon Délice", "Étoile", "Fès-Meknès", "CT FES", "Fès", "Rue Talaa Kebira", ""),
+    ],
+    "hospitals": [
+        Hospital("Hôpital Ibn Tofail", "Marrakech-Safi", "Marrakech", "Marrakech", "CHU", ""),
+    ],
+}
+
+def index():
+    return FuzzyIndex(TABLES)
+
+def test_typos_find_the_value():
+    matches = index().search("Marakech")
+    assert matches[0].value == "Marrakech"
+    assert {table for table, _ in matches[0].records} == {"hotels", "pharmacies", "hospitals"}
+    assert index().search("Kenzy Towr")[0].value == "Kenzi Tower"
+
+def test_accents_and_case_do_not_matter():
+    assert index().search("SALE")[0].value == "Salé"
+    assert index().search("au bon delice")[0].value == "Au Bon Délice"
+    assert index().search("hopital ibn tofail")[0].value == "Hôpital Ibn Tofail"
+
+def test_alias_spellings_are_normalized():
+    # "fez" is the alias of "fes"; the commune "CT FES" is indexed under the same city
+    match = index().search("Fez")[0]
+    assert match.value == "Fès"
+    assert match.fields == ["city", "commune"]
+
+def test_scores_are_the_trigram_similarity():
+    query = "pharmacie essalem"
+    for match in index().search(query, limit=10, min_similarity=0.0):
+        expected, value = trigrams(normalize_text(query)), trigrams(normalize_text(match.value))
+        assert match.score == round(len(expected & value) / len(expected | value), 3)
+
+def test_tables_filter_and_threshold():
+    matches = index().search("Marakech", tables=["pharmacies"])
+    assert [table for table, _ in matches[0].records] == ["pharmacies"]
+    assert all(match.score >= MIN_SIMILARITY for match in index().search("ibn", limit=10))
+    assert index().search("zzzz qqqq") == []
+    assert index().search("Marrakech", tables=["restaurants"]) == []
+
+def test_lookup_lists_records_with_their_spelling():
+    answer = index().lookup("Pharmacie Esalam kind=pharmacies")
+    lines = answer.splitlines()
+    assert lines[0] == "Closest names, cities and addresses for 'Pharmacie Esalam':"
+    assert lines[1].startswith("- 💊 Pharmacie Essalam - 3 rue Ibn Sina, Salé (INPE 111111111) [name 'Pharmacie Essalam'")
+    assert index().lookup("kind=hotels").startswith("Please give a name")
+    assert index().lookup("xqzv") == "No name, city or address resembles 'xqzv'."
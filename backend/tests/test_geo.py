@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import geo
+from geo import GeoIndex, haversine_km
+
+# Points spread over Morocco, more than BRUTE_FORCE_MAX_POINTS so queries walk the grid
+POINT_COUNT = 5000
+QUERIES = [(33.5828, -7.6476), (35.7595, -5.8340), (31.0, -9.9), (27.15, -13.2), (40.0, 3.0)]
+
+@pytest.fixture(scope="module")
+def index():
+    assert POINT_COUNT > geo.BRUTE_FORCE_MAX_POINTS
+    rng = np.random.default_rng(2025)
+    lats = rng.uniform(27.0, 36.0, POINT_COUNT)
+    lons = rng.uniform(-13.5, -1.0, POINT_COUNT)
+    records = [{"kind": "hotel" if i % 3 else "stadium", "name": f"Place {i}", "city": "",
+                "latitude": float(lat), "longitude": float(lon), "id": i}
+               for i, (lat, lon) in enumerate(zip(lats, lons))]
+    return GeoIndex(records)
+
+def brute_force(index, lat, lon, kind=None):
+    """Every (id, distance) pair sorted by distance"""
+    distances = haversine_km(lat, lon, index.lats, index.lons)
+    pairs = [(record["id"], float(distance)) for record, distance in zip(index.records, distances)
+             if kind is None or record["kind"] == kind]
+    return sorted(pairs, key=lambda pair: pair[1])
+
+def ids(results):
+    return [record["id"] for record, _ in results]
+
+def test_haversine_known_distance():
+    # Casablanca to Rabat is about 87 km as the crow flies
+    distance = haversine_km(33.5731, -7.5898, np.array([34.0209]), np.array([-6.8416]))[0]
+    assert 85 < distance < 89
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+@pytest.mark.parametrize("k", [1, 5, 50])
+def test_nearest_matches_brute_force(index, lat, lon, k):
+    expected = brute_force(index, lat, lon)[:k]
+    results = index.nearest(lat, lon, k=k)
+    assert ids(results) == [record_id for record_id, _ in expected]
+    assert [d for _, d in results] == pytest.approx([d for _, d in expected])
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+def test_nearest_filters_by_kind(index, lat, lon):
+    expected = brute_force(index, lat, lon, kind="stadium")[:10]
+    results = index.nearest(lat, lon, k=10, kind="stadium")
+    assert ids(results) == [record_id for record_id, _ in expected]
+    assert index.nearest(lat, lon, k=10, kind="museum") == []
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+@pytest.mark.parametrize("radius_km", [5.0, 25.0, 120.0])
+def test_within_matches_brute_force(index, lat, lon, radius_km):
+    expected = [pair for pair in brute_force(index, lat, lon) if pair[1] <= radius_km]
+    results = index.within(lat, lon, radius_km)
+    assert ids(results) == [record_id for record_id, _ in expected]
+    assert all(distance <= radius_km for _, distance in results)
+
+def test_within_kind_and_limit(index):
+    lat, lon = QUERIES[0]
+    expected = [pair for pair in brute_force(index, lat, lon, kind="hotel") if pair[1] <= 60.0][:7]
+    assert ids(index.within(lat, lon, 60.0, kind="hotel", limit=7)) == [record_id for record_id, _ in expected]
+
+def test_small_and_empty_indexes():
+    records = [{"kind": "hotel", "name": name, "city": "Rabat", "latitude": lat, "longitude": lon, "id": name}
+               for name, lat, lon in (("A", 34.02, -6.84), ("B", 34.00, -6.85), ("C", 33.95, -6.89))]
+    small = GeoIndex(records)
+    assert ids(small.nearest(34.0209, -6.8416, k=2)) == ["A", "B"]
+    assert ids(small.nearest(34.0209, -6.8416, k=10)) == ["A", "B", "C"]
+    assert GeoIndex([]).nearest(34.0, -6.8) == []
+    assert GeoIndex([]).within(34.0, -6.8, 10.0) == []
+
+def test_search_resolves_places_and_coordinates():
+    records = [{"kind": "hotel", "name": "Hotel Atlas", "city": "Casablanca",
+                "latitude": 33.58, "longitude": -7.64, "id": "h1"},
+               {"kind": "stadium", "name": "Mohammed V Stadium", "city": "Casablanca",
+                "latitude": 33.5828, "longitude": -7.6476, "id": "Mohammed V Stadium"}]
+    index = GeoIndex(records)
+    answer = index.search("hotels near Mohammed V Stadium")
+    assert answer.splitlines() == ["Closest places to Mohammed V Stadium:", "- Hotel Atlas (hotel, Casablanca) - 0.8 km"]
+    assert index.search("33.58,-7.64, radius=1, kind=stadium").startswith("Places within 1 km of 33.5800,-7.6400:")
+    assert index.search("somewhere nice").startswith("Please give a place")
@@ -0,0 +1,138 @@
+import httpx
+import pytest
+
+import http_client
+from http_client import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT, CircuitOpenError, HTTPClient
+
+URL = "https://upstream.test/search"
+
+class FakeTime:
+    """Clock of the circuit breakers, moved forward by the tests"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(http_client, "time", fake)
+    monkeypatch.setattr(http_client, "_retry_delay", lambda attempt, response: 0)
+    return fake
+
+@pytest.fixture
+def upstream():
+    """Answers requests with the queued responses (or exceptions), then with 200"""
+    class Upstream:
+        def __init__(self):
+            self.queue = []
+            self.calls = 0
+
+        def __call__(self, request: httpx.Request) -> httpx.Response:
+            self.calls += 1
+            outcome = self.queue.pop(0) if self.queue else 200
+            if isinstance(outcome, Exception):
+                raise outcome
+            if outcome == 302:
+                return httpx.Response(302, headers={"Location": str(request.url)})
+            return httpx.Response(outcome, json={"ok": outcome == 200})
+    return Upstream()
+
+@pytest.fixture
+def client(upstream, clock):
+    client = HTTPClient(retries=2, transport=httpx.MockTransport(upstream))
+    yield client
+    client.close()
+
+def circuit(client: HTTPClient) -> str:
+    return client.stats()["upstream.test"]["circuit"]
+
+def open_circuit(client, upstream):
+    """Fail as many POSTs (never retried) as it takes to open the circuit"""
+    upstream.queue = [httpx.ConnectError("refused")] * CIRCUIT_FAILURE_THRESHOLD
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        with pytest.raises(httpx.ConnectError):
+            client.request("POST", URL)
+
+def test_retries_retryable_statuses(client, upstream):
+    upstream.queue = [503, 502]
+    response = client.get(URL)
+    assert response.status_code == 200
+    assert upstream.calls == 3
+    assert client.stats()["upstream.test"]["retries"] == 2
+    assert circuit(client) == "closed"
+
+def test_returns_last_response_when_retries_run_out(client, upstream):
+    upstream.queue = [503, 503, 503]
+    assert client.get(URL).status_code == 503
+    assert upstream.calls == 3
+
+def test_does_not_retry_post(client, upstream):
+    upstream.queue = [httpx.ConnectError("refused")]
+    with pytest.raises(httpx.ConnectError):
+        client.request("POST", URL)
+    assert upstream.calls == 1
+
+def test_opens_after_repeated_failures(client, upstream):
+    open_circuit(client, upstream)
+    assert circuit(client) == "open"
+    with pytest.raises(CircuitOpenError):
+        client.get(URL)
+    assert upstream.calls == CIRCUIT_FAILURE_THRESHOLD
+    assert client.stats()["upstream.test"]["short_circuited"] == 1
+
+def test_half_open_trial_success_closes(client, upstream, clock):
+    open_circuit(client, upstream)
+    clock.now += CIRCUIT_RESET_TIMEOUT
+    assert circuit(client) == "half-open"
+    assert client.get(URL).status_code == 200
+    assert circuit(client) == "closed"
+
+def test_half_open_trial_failure_reopens(client, upstream, clock):
+    open_circuit(client, upstream)
+    clock.now += CIRCUIT_RESET_TIMEOUT
+    upstream.queue = [httpx.ConnectError("refused")]
+    with pytest.raises(httpx.ConnectError):
+        client.request("POST", URL)
+    assert circuit(client) == "open"
+    with pytest.raises(CircuitOpenError):
+        client.get(URL)
+
+def test_half_open_trial_ending_in_other_error_reopens(client, upstream, clock):
+    open_circuit(client, upstream)
+    clock.now += CIRCUIT_RESET_TIMEOUT
+    # Redirect loop: TooManyRedirects is not a transport error
+    upstream.queue = [302] * 30
+    with pytest.raises(httpx.TooManyRedirects):
+        client.get(URL)
+    assert circuit(client) == "open"
+    # Not stuck: the next trial goes through after the cooldown
+    upstream.queue = []
+    clock.now += CIRCUIT_RESET_TIMEOUT
+    assert client.get(URL).status_code == 200
+    assert circuit(client) == "closed"
+
+def test_retried_get_counts_as_one_failure(client, upstream):
+    # Each failing GET makes three attempts but is one failure for the breaker
+    upstream.queue = [httpx.ConnectError("refused")] * 3 * (CIRCUIT_FAILURE_THRESHOLD - 1)
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        with pytest.raises(httpx.ConnectError):
+            client.get(URL)
+    assert upstream.calls == 3 * (CIRCUIT_FAILURE_THRESHOLD - 1)
+    assert circuit(client) == "closed"
+    upstream.queue = [503] * 3
+    assert client.get(URL).status_code == 503
+    assert circuit(client) == "open"
+    assert client.stats()["upstream.test"]["failures"] == 3 * CIRCUIT_FAILURE_THRESHOLD
+
+def test_half_open_trial_get_keeps_its_retries(client, upstream, clock):
+    open_circuit(client, upstream)
+    clock.now += CIRCUIT_RESET_TIMEOUT
+    calls = upstream.calls
+    upstream.queue = [503, 503]
+    # The retries belong to the trial: the third attempt succeeds and closes the circuit
+    assert client.get(URL).status_code == 200
+    assert upstream.calls == calls + 3
+    assert circuit(client) == "closed"
@@ -0,0 +1,87 @@
+import json
+import sqlite3
+
+import pytest
+
+import rag
+from benchmarks.fakes import FakeEmbeddings
+
+class CountingEmbeddings(FakeEmbeddings):
+    """Fake embeddings remembering every text sent to the model"""
+
+    def __init__(self):
+        super().__init__()
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+def hotel(hotel_id, name, city, price):
+    return {"Hotel_ID": hotel_id, "Name": name, "City": city, "Price_USD": price}
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    """Write ``hotels.json`` in a temporary data directory next to a temporary store"""
+    data_directory = tmp_path / "data"
+    data_directory.mkdir()
+    persist_directory = tmp_path / "vector_store"
+    monkeypatch.setattr(rag, "DATA_DIRECTORY", str(data_directory))
+    monkeypatch.setattr(rag, "PERSIST_DIRECTORY", str(persist_directory))
+    monkeypatch.setattr(rag, "MANIFEST_PATH", str(persist_directory / "manifest.json"))
+    monkeypatch.setattr(rag, "LOCK_PATH", str(persist_directory / "writer.lock"))
+
+    def write(hotels):
+        (data_directory / "hotels.json").write_text(json.dumps({"hotels": hotels}), encoding="utf-8")
+    return write
+
+def stored(vectorstore):
+    page = vectorstore._collection.get(include=["documents"])
+    return dict(zip(page["ids"], page["documents"]))
+
+def test_sync_re_embeds_only_changed_records(sources):
+    sources([hotel("H1", "Atlas", "Rabat", 100), hotel("H2", "Riad", "Fès", 80), hotel("H3", "Kasbah", "Agadir", 60)])
+    embedding = CountingEmbeddings()
+    vectorstore, manifest = rag.create_vector_store(embedding)
+    assert len(embedding.embedded) == 3
+    assert sorted(stored(vectorstore)) == ["hotels.json:hotels/H1", "hotels.json:hotels/H2", "hotels.json:hotels/H3"]
+
+    # H2's price changes, H3 is gone and H4 is new: H1 must not be embedded again
+    sources([hotel("H1", "Atlas", "Rabat", 100), hotel("H2", "Riad", "Fès", 95), hotel("H4", "Dar", "Tanger", 70)])
+    embedding.embedded.clear()
+    manifest, stats = rag.sync_vector_store(vectorstore, manifest)
+    assert stats == {"added": 1, "updated": 1, "deleted": 1, "unchanged": 1}
+    assert len(embedding.embedded) == 2
+    assert all("Atlas" not in text for text in embedding.embedded)
+
+    documents = stored(vectorstore)
+    assert sorted(documents) == ["hotels.json:hotels/H1", "hotels.json:hotels/H2", "hotels.json:hotels/H4"]
+    assert "Price_USD: 95" in documents["hotels.json:hotels/H2"]
+    assert sorted(manifest["records"]) == sorted(documents)
+    assert manifest["sources"] == rag.source_fingerprints()
+
+def test_sync_without_changes_embeds_nothing(sources):
+    sources([hotel("H1", "Atlas", "Rabat", 100), hotel("H2", "Riad", "Fès", 80)])
+    embedding = CountingEmbeddings()
+    vectorstore, manifest = rag.create_vector_store(embedding)
+    embedding.embedded.clear()
+    _, stats = rag.sync_vector_store(vectorstore, manifest)
+    assert stats == {"added": 0, "updated": 0, "deleted": 0, "unchanged": 2}
+    assert embedding.embedded == []
+
+def test_record_hash_follows_content_and_metadata():
+    document = rag.process_json_data({"hotels": [hotel("H1", "Atlas", "Rabat", 100)]}, "hotels.json")[0]
+    same = rag.process_json_data({"hotels": [hotel("H1", "Atlas", "Rabat", 100)]}, "hotels.json")[0]
+    moved = rag.process_json_data({"hotels": [hotel("H1", "Atlas", "Salé", 100)]}, "hotels.json")[0]
+    assert rag.record_hash(document) == rag.record_hash(same)
+    assert rag.record_hash(document) != rag.record_hash(moved)
+
+def test_only_corruption_errors_wipe_the_store():
+    corrupt = sqlite3.DatabaseError("database disk image is malformed")
+    try:
+        raise RuntimeError("could not open the collection") from corrupt
+    except RuntimeError as error:
+        assert rag.is_corrupt_store(error)
+    assert rag.is_corrupt_store(Exception("(code: 26) file is not a database"))
+    assert not rag.is_corrupt_store(TimeoutError("embedding request timed out"))
+    assert not rag.is_corrupt_store(sqlite3.OperationalError("database is locked"))
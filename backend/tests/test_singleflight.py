@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+def test_identical_concurrent_calls_run_once():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        runs = []
+
+        async def answer():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "21 December 2025"
+
+        results = await asyncio.gather(*(flight.do("when does afcon start", answer) for _ in range(5)))
+        assert results == ["21 December 2025"] * 5
+        assert len(runs) == 1
+        assert flight.stats() == {"runs": 1, "saved": 4, "in_flight": 0, "saved_ratio": 0.8}
+    asyncio.run(scenario())
+
+def test_different_keys_and_later_calls_run_again():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        runs = []
+
+        def answer(value):
+            async def run():
+                runs.append(value)
+                await asyncio.sleep(0.01)
+                return value
+            return run
+
+        assert await asyncio.gather(flight.do("a", answer("a")), flight.do("b", answer("b"))) == ["a", "b"]
+        # Nothing is kept once the call is done
+        assert await flight.do("a", answer("again")) == "again"
+        assert runs == ["a", "b", "again"]
+    asyncio.run(scenario())
+
+def test_followers_share_the_error():
+    async def scenario():
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        results = await asyncio.gather(*(flight.do("q", fail) for _ in range(3)), return_exceptions=True)
+        assert [str(result) for result in results] == ["upstream down"] * 3
+        assert flight.stats()["runs"] == 1
+    asyncio.run(scenario())
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = AsyncSingleFlight()
+
+        async def answer():
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        leader = asyncio.ensure_future(flight.do("q", answer))
+        follower = asyncio.ensure_future(flight.do("q", answer))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == "ok"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+    asyncio.run(scenario())
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+def test_threads_share_one_blocking_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def search(query):
+        runs.append(query)
+        release.wait(5)
+        return f"results for {query}"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        try:
+            futures = [executor.submit(flight.do, "afcon", search, "afcon") for _ in range(4)]
+            # Every follower is waiting on the leader before it returns
+            wait_for(lambda: flight.stats()["saved"] == 3)
+        finally:
+            release.set()
+        assert [future.result(5) for future in futures] == ["results for afcon"] * 4
+    assert runs == ["afcon"]
+    assert flight.stats()["in_flight"] == 0
+
+def test_threads_share_the_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ConnectionError("refused")
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        try:
+            futures = [executor.submit(flight.do, "q", fail) for _ in range(3)]
+            wait_for(lambda: flight.stats()["saved"] == 2)
+        finally:
+            release.set()
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result(5)
+    assert flight.stats()["runs"] == 1
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+import pytest
+
+from worker_pool import AgentPool, PoolSaturated
+
+def run(scenario):
+    """Run ``scenario(release)``; the jobs waiting on ``release`` end even when it fails"""
+    release = threading.Event()
+    try:
+        asyncio.run(scenario(release))
+    finally:
+        release.set()
+
+def test_cancelled_request_keeps_its_slot_until_the_work_ends():
+    async def scenario(release):
+        pool = AgentPool(max_in_flight=1, max_queue=0)
+        request = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        # The client went away, but the worker thread is still busy
+        request.cancel()
+        await asyncio.sleep(0.05)
+        with pytest.raises(PoolSaturated):
+            pool.submit(lambda: None)
+        release.set()
+        await asyncio.sleep(0.05)
+        assert pool.stats()["running"] == 0
+        assert await pool.run(lambda: 42) == 42
+        pool.shutdown()
+    run(scenario)
+
+def test_request_cancelled_while_queued_frees_its_slot():
+    async def scenario(release):
+        pool = AgentPool(max_in_flight=1, max_queue=1)
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(lambda: "never"))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        await asyncio.sleep(0.05)
+        # The queued slot is free again, the running one is not
+        job = pool.submit(lambda: "admitted")
+        with pytest.raises(PoolSaturated):
+            pool.submit(lambda: None)
+        release.set()
+        assert await job == "admitted"
+        await running
+        pool.shutdown()
+    run(scenario)
@@ -0,0 +1,142 @@
+import os
+import re
+from typing import Any, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain.tools.render import render_text_description
+from langchain_core.agents import AgentAction
+from langchain_core.runnables import RunnablePassthrough
+
+from answer_cache import normalize_query
+from metrics import SCRATCHPAD_TOKENS
+
+load_dotenv()
+
+# Tokens one tool observation may take in the prompt of the next iterations
+OBSERVATION_TOKEN_BUDGET = int(os.getenv("OBSERVATION_TOKEN_BUDGET", "800"))
+# Tokens of the whole scratchpad: older observations are squeezed first
+SCRATCHPAD_TOKEN_BUDGET = int(os.getenv("SCRATCHPAD_TOKEN_BUDGET", "3000"))
+# An old observation always keeps at least this much
+MIN_OBSERVATION_TOKENS = 60
+# Same rough ratio as the token estimates of the metrics
+CHARS_PER_TOKEN = 4
+# Shorter lines (separators, labels) are not worth deduplicating
+MIN_DEDUP_CHARS = 20
+# Lines with a link are never deduplicated: each observation keeps the sources it cites
+_LINK = re.compile(r"https?://|^\s*Source\s*:", re.IGNORECASE)
+
+_STOPWORDS = {"the", "and", "for", "with", "what", "where", "when", "which", "respond", "user", "query",
+              "les", "des", "une", "est", "pour", "dans", "avec", "quel", "quelle", "sur"}
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _terms(text: str) -> Set[str]:
+    return {word for word in normalize_query(text).split() if len(word) > 2 and word not in _STOPWORDS}
+
+def compress_observation(text: str, budget: int, query: str = "") -> str:
+    """Shrink ``text`` to about ``budget`` tokens, keeping the lines most related to ``query``.
+
+    The first line (page title, first result) is always kept; the other lines
+    are picked by the number of query terms they contain and put back in their
+    original order, with ``[...]`` where lines were dropped.
+    """
+    limit = budget * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return text[:limit]
+    terms = _terms(query)
+    scores = [len(terms & _terms(line)) for line in lines]
+    order = [0] + sorted(range(1, len(lines)), key=lambda i: (-scores[i], i))
+    kept, used = set(), 0
+    for i in order:
+        size = len(lines[i]) + 1
+        if used + size > limit:
+            continue
+        kept.add(i)
+        used += size
+    if not kept:
+        return lines[0][:limit] + " [...]"
+    parts, previous = [], -1
+    for i in sorted(kept):
+        if i != previous + 1:
+            parts.append("[...]")
+        parts.append(lines[i])
+        previous = i
+    if previous != len(lines) - 1:
+        parts.append("[...]")
+    return "\n".join(parts)
+
+def _dedup(text: str, seen: Set[str]) -> str:
+    """Drop lines already shown by an earlier observation, except links"""
+    kept, repeated = [], 0
+    for line in text.splitlines():
+        key = normalize_query(line)
+        if len(key) >= MIN_DEDUP_CHARS and not _LINK.search(line):
+            if key in seen:
+                repeated += 1
+                continue
+            seen.add(key)
+        kept.append(line)
+    if repeated:
+        kept.append(f"[{repeated} line(s) already seen above omitted]")
+    return "\n".join(kept)
+
+class ScratchpadBudget:
+    """Build the ReAct scratchpad within a token budget.
+
+    Observations are deduplicated against the earlier ones, capped to
+    ``observation_budget`` tokens each, and the oldest are compressed further
+    until the scratchpad fits ``scratchpad_budget``. Thoughts and actions are
+    always kept verbatim: the model needs them to follow its own plan.
+    """
+
+    def __init__(self, observation_budget: int = OBSERVATION_TOKEN_BUDGET,
+                 scratchpad_budget: int = SCRATCHPAD_TOKEN_BUDGET):
+        self.observation_budget = observation_budget
+        self.scratchpad_budget = scratchpad_budget
+
+    def observations(self, steps: List[Tuple[AgentAction, Any]], query: str = "") -> List[str]:
+        seen: Set[str] = set()
+        deduplicated = [_dedup(str(observation), seen) for _, observation in steps]
+        remaining = self.scratchpad_budget - sum(estimate_tokens(action.log) for action, _ in steps)
+        compressed: List[Optional[str]] = [None] * len(steps)
+        # Newest first: the latest observation is the one the next step builds on
+        for i in reversed(range(len(steps))):
+            budget = max(MIN_OBSERVATION_TOKENS, min(self.observation_budget, remaining))
+            action = steps[i][0]
+            compressed[i] = compress_observation(deduplicated[i], budget, f"{query} {action.tool_input}")
+            remaining -= estimate_tokens(compressed[i])
+        return compressed
+
+    def __call__(self, steps: List[Tuple[AgentAction, Any]], query: str = "") -> str:
+        """Same layout as LangChain's ``format_log_to_str``"""
+        thoughts = ""
+        for (action, observation), shown in zip(steps, self.observations(steps, query)):
+            thoughts += action.log
+            thoughts += f"\nObservation: {shown}\nThought: "
+            SCRATCHPAD_TOKENS.labels("raw").inc(estimate_tokens(str(observation)))
+            SCRATCHPAD_TOKENS.labels("sent").inc(estimate_tokens(shown))
+        return thoughts
+
+def create_budgeted_react_agent(llm, tools, prompt, scratchpad: Optional[ScratchpadBudget] = None):
+    """``create_react_agent`` with the scratchpad built by :class:`ScratchpadBudget`"""
+    missing_vars = {"tools", "tool_names", "agent_scratchpad"}.difference(prompt.input_variables)
+    if missing_vars:
+        raise ValueError(f"Prompt missing required variables: {missing_vars}")
+    scratchpad = scratchpad or ScratchpadBudget()
+    prompt = prompt.partial(
+        tools=render_text_description(list(tools)),
+        tool_names=", ".join(t.name for t in tools),
+    )
+    return (
+        RunnablePassthrough.assign(
+            agent_scratchpad=lambda x: scratchpad(x["intermediate_steps"], x.get("input", "")),
+        )
+        | prompt
+        | llm.bind(stop=["\nObservation"])
+        | ReActSingleInputOutputParser()
+    )
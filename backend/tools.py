@@ -1,18 +1,36 @@
 import json
-import requests
+import httpx
 import re
 import os
-import pandas as pd
 from typing import Optional, Dict, List, Any
 from langchain_core.tools import Tool
 from langchain.tools import tool
-from markdownify import markdownify
-from serpapi import GoogleSearch
 from datetime import datetime
-from functools import lru_cache
 from langchain.agents import Tool
 from langchain.chains import LLMChain
 
+from cache_backend import get_cache
+from datastore import normalize_city
+from http_client import SERPAPI_URL, http_client
+from page_fetcher import page_fetcher
+from postprocess import format_answer, format_blocks, parse_terminal_output
+from singleflight import SingleFlight
+from weather import city_weather
+
+# Seconds a web search result is reused (paid SerpAPI quota)
+WEB_SEARCH_TTL = int(os.getenv("WEB_SEARCH_TTL", str(6 * 3600)))
+
+# Identical tool calls running at the same time share one upstream call
+TOOL_CALLS = {
+    "web_search": SingleFlight(),
+    "weather": SingleFlight(),
+    "knowledge_base": SingleFlight(),
+    "visit_webpage": SingleFlight(),
+}
+
+def tool_call_stats() -> Dict[str, Any]:
+    return {name: flight.stats() for name, flight in TOOL_CALLS.items()}
+
 class FinalAnswerException(BaseException):
     """Exception personnalisée pour gérer la réponse finale"""
     pass
@@ -21,72 +39,55 @@ class FinalAnswerException(BaseException):
 def final_answer(response: str) -> str:
     """Format and return the final response."""
     try:
-        # Clean and structure the response
-        content_parts = []
-        for line in response.split('\n'):
-            if not line.startswith(('Action:', 'Action Input:', 'Thought:', '>', 'Invalid Format:')):
-                content_parts.append(line)
-        
-        clean_response = '\n'.join(line for line in content_parts if line.strip())
-        
-        # Add contextual emojis
-        if not any(emoji in clean_response for emoji in ['👋', '🇲🇦', '⚽', '🏆', '🏟️', '🏨', '🌤️']):
-            if any(term in clean_response.lower() for term in ['bonjour', 'hi', 'hello', 'salam']):
-                clean_response = f"👋 {clean_response}"
-            elif any(term in clean_response.lower() for term in ['météo', 'temps', 'weather']):
-                clean_response = f"🌤️ {clean_response}"
-            elif any(term in clean_response.lower() for term in ['hotel', 'logement', 'hébergement']):
-                clean_response = f"🏨 {clean_response}"
-            elif any(term in clean_response.lower() for term in ['monument', 'visite', 'tourisme']):
-                clean_response = f"🏛️ {clean_response}"
-            elif 'can' in clean_response.lower() or 'afcon' in clean_response.lower():
-                clean_response = f"🏆 {clean_response}"
-            else:
-                clean_response = f"🇲🇦 {clean_response}"
-        
         # Structure the response for frontend
-        formatted_response = {
-            "content": clean_response,
+        return {
+            "content": format_answer(response),
             "type": "text"
         }
         
-        return formatted_response
-        
     except BaseException as e:
         if isinstance(e, FinalAnswerException):
             raise e
         return str(e)
 
-@lru_cache(maxsize=50)
 def visit_webpage_tool(url: str) -> str:
-    """Cache webpage visits to improve performance"""
-    try:
-        response = requests.get(url, timeout=20)
-        response.raise_for_status()
-        markdown_content = markdownify(response.text).strip()
-        markdown_content = re.sub(r"\n{3,}", "\n\n", markdown_content)
-        if len(markdown_content) > 10000:
-            markdown_content = markdown_content[:10000] + "\n\n...[truncated]"
-        return markdown_content
-    except requests.exceptions.Timeout:
-        return "The request timed out. Please try again later or check the URL."
-    except requests.exceptions.RequestException as e:
-        return f"Error fetching the webpage: {str(e)}"
+    """Fetch a page as markdown (streamed, size-capped, cached on disk with revalidation)"""
+    url = url.strip()
+    return TOOL_CALLS["visit_webpage"].do(url, page_fetcher.fetch, url)
+
+def normalize_search_query(query: str) -> str:
+    """Queries differing only by case or spacing share their cached results"""
+    return " ".join(query.casefold().split())
 
-@lru_cache(maxsize=100)
 def web_search(query: str) -> str:
-    """Cache web search results to improve performance"""
+    """Web search through SerpAPI, cached across workers and restarts"""
+    key = normalize_search_query(query)
+    cached = get_cache().get("web_search", key)
+    if cached is not None:
+        return cached
+    return TOOL_CALLS["web_search"].do(key, _search_and_store, query, key)
+
+def _search_and_store(query: str, key: str) -> str:
+    result = _web_search(query)
+    # Errors are not cached: the next call retries
+    if not result.startswith(("Error", "Search error")):
+        get_cache().set("web_search", key, result, WEB_SEARCH_TTL)
+    return result
+
+def _web_search(query: str) -> str:
     try:
         api_key = os.getenv("SERPAPI_API_KEY")
         if not api_key:
             return "Error: SERPAPI_API_KEY not found in environment variables"
         
-        search = GoogleSearch({
+        # Same endpoint as the serpapi client, through the shared connection pool
+        response = http_client.get(SERPAPI_URL, params={
+            "engine": "google",
             "q": query,
-            "api_key": api_key
+            "api_key": api_key,
+            "output": "json"
         })
-        
-        results = search.get_dict()
+        results = response.json()
         
         if "error" in results:
             return f"Search error: {results['error']}"
@@ -111,261 +112,18 @@ def web_search(query: str) -> str:
 def get_weather(city: str, forecast: bool = False) -> str:
     """Get current weather or forecast for a city using OpenMeteo API."""
     try:
-        # First, we need to get coordinates for the city using Nominatim
-        geocoding_url = f"https://nominatim.openstreetmap.org/search?city={city}&format=json&limit=1"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (compatible; Weather Bot/1.0)'
-        }
-        
-        location_response = requests.get(geocoding_url, headers=headers)
-        location_response.raise_for_status()
-        location_data = location_response.json()
-        
-        if not location_data:
-            return f"Désolé, je ne trouve pas la ville {city}"
-            
-        lat = location_data[0]['lat']
-        lon = location_data[0]['lon']
-        city_name = location_data[0].get('display_name', city).split(',')[0]
-        
-        # Base URL for OpenMeteo API
-        base_url = "https://api.open-meteo.com/v1"
-        
-        if forecast:
-            # Get 5-day forecast
-            weather_url = f"{base_url}/forecast?latitude={lat}&longitude={lon}&daily=temperature_2m_max,temperature_2m_min,precipitation_probability_mean,weathercode&timezone=auto"
-            weather_response = requests.get(weather_url)
-            weather_response.raise_for_status()
-            weather_data = weather_response.json()
-            
-            # Weather code mapping
-            weather_codes = {
-                0: "Ciel dégagé ☀️",
-                1: "Partiellement nuageux 🌤️",
-                2: "Nuageux ⛅",
-                3: "Couvert ☁️",
-                45: "Brumeux 🌫️",
-                48: "Brouillard givrant 🌫️",
-                51: "Bruine légère 🌧️",
-                53: "Bruine modérée 🌧️",
-                55: "Bruine dense 🌧️",
-                61: "Pluie légère 🌧️",
-                63: "Pluie modérée 🌧️",
-                65: "Pluie forte 🌧️",
-                71: "Neige légère 🌨️",
-                73: "Neige modérée 🌨️",
-                75: "Neige forte 🌨️",
-                77: "Grains de neige 🌨️",
-                80: "Averses légères 🌦️",
-                81: "Averses modérées 🌦️",
-                82: "Averses violentes 🌦️",
-                95: "Orage ⛈️"
-            }
-            
-            # Format forecast data
-            forecast_info = []
-            dates = weather_data['daily']['time']
-            max_temps = weather_data['daily']['temperature_2m_max']
-            min_temps = weather_data['daily']['temperature_2m_min']
-            precip_prob = weather_data['daily']['precipitation_probability_mean']
-            weather_codes_data = weather_data['daily']['weathercode']
-            
-            for i in range(5):  # 5 days forecast
-                date = datetime.strptime(dates[i], "%Y-%m-%d").strftime("%d/%m/%Y")
-                weather_desc = weather_codes.get(weather_codes_data[i], "Conditions inconnues")
-                forecast_info.append(
-                    f"🗓️ {date}: {min_temps[i]}°C à {max_temps[i]}°C - {weather_desc} - "
-                    f"Probabilité de précipitation: {precip_prob[i]}%"
-                )
-            
-            return "\n".join([
-                f"🌤️ Prévisions météo pour {city_name}:",
-                *forecast_info
-            ])
-        else:
-            # Get current weather
-            weather_url = f"{base_url}/forecast?latitude={lat}&longitude={lon}&current_weather=true&timezone=auto"
-            weather_response = requests.get(weather_url)
-            weather_response.raise_for_status()
-            weather_data = weather_response.json()
-            
-            current = weather_data['current_weather']
-            temp = current['temperature']
-            windspeed = current['windspeed']
-            
-            # Get weather description based on weathercode
-            weather_desc = {
-                0: "Ciel dégagé ☀️",
-                1: "Partiellement nuageux 🌤️",
-                2: "Nuageux ⛅",
-                3: "Couvert ☁️",
-                45: "Brumeux 🌫️",
-                48: "Brouillard givrant 🌫️",
-                51: "Bruine légère 🌧️",
-                53: "Bruine modérée 🌧️",
-                55: "Bruine dense 🌧️",
-                61: "Pluie légère 🌧️",
-                63: "Pluie modérée 🌧️",
-                65: "Pluie forte 🌧️",
-                71: "Neige légère 🌨️",
-                73: "Neige modérée 🌨️",
-                75: "Neige forte 🌨️",
-                77: "Grains de neige 🌨️",
-                80: "Averses légères 🌦️",
-                81: "Averses modérées 🌦️",
-                82: "Averses violentes 🌦️",
-                95: "Orage ⛈️"
-            }.get(current['weathercode'], "Conditions inconnues")
-            
-            return "\n".join([
-                f"🌤️ Météo actuelle à {city_name}:",
-                f"Température: {temp}°C",
-                f"Vitesse du vent: {windspeed} km/h",
-                f"Conditions: {weather_desc}"
-            ])
-            
-    except requests.exceptions.RequestException as e:
+        # Host cities use built-in coordinates, other cities are geocoded once and cached
+        return TOOL_CALLS["weather"].do((normalize_city(city), bool(forecast)), city_weather, city, forecast)
+    except httpx.HTTPError as e:
         return f"Erreur lors de la récupération des données météo: {str(e)}"
 
 def extract_terminal_blocks(terminal_output: str) -> Dict[str, List[str]]:
     """Extrait les différents blocs d'information du terminal output."""
-    blocks = {
-        "greeting": None,  # Pour stocker la première salutation
-        "database_info": [],
-        "web_info": [],
-        "additional_info": [],
-        "final_answer": []
-    }
-    
-    current_block = None
-    content_buffer = []
-    greeting_found = False
-    
-    # Liste des phrases de salutation connues
-    greeting_phrases = [
-        "Hello!", "I'm ready", "Ready to help",
-        "How can I assist", "Let me help",
-        "Welcome", "I can help you with"
-    ]
-    
-    for line in terminal_output.split('\n'):
-        line = line.strip()
-        
-        # Ignorer les lignes d'avertissement et techniques
-        if any(marker in line for marker in [
-            "> Entering new", "> Finished", "Invalid Format:", 
-            "Action Input:", "Thought:", "INFO:", "WARNING:",
-            "LangChainDeprecationWarning", "warn_deprecated"
-        ]):
-            continue
-            
-        # Capturer la première salutation
-        if not greeting_found and any(phrase in line for phrase in greeting_phrases):
-            blocks["greeting"] = line
-            greeting_found = True
-            continue
-            
-        # Identifier le début des blocs
-        if "Information from Database:" in line:
-            if current_block and content_buffer:
-                blocks[current_block].extend(content_buffer)
-            current_block = "database_info"
-            content_buffer = []
-            continue
-        elif "Information from Web:" in line:
-            if current_block and content_buffer:
-                blocks[current_block].extend(content_buffer)
-            current_block = "web_info"
-            content_buffer = []
-            continue
-        elif "Action: Final Answer" in line:
-            if current_block and content_buffer:
-                blocks[current_block].extend(content_buffer)
-            current_block = "final_answer"
-            content_buffer = []
-            continue
-        elif any(marker in line for marker in [
-            "Based on my research",
-            "Voici les informations",
-            "Additional information",
-            "Here's what I found"
-        ]):
-            if current_block and content_buffer:
-                blocks[current_block].extend(content_buffer)
-            current_block = "additional_info"
-            content_buffer = []
-            continue
-            
-        # Ajouter le contenu au buffer du bloc actuel
-        if current_block and line and not line.startswith(("Action:", "I'm ready", "Please provide")):
-            content_buffer.append(line)
-    
-    # Ajouter le dernier buffer
-    if current_block and content_buffer:
-        blocks[current_block].extend(content_buffer)
-    
-    return blocks
+    return parse_terminal_output(terminal_output)
 
 def format_response_from_blocks(blocks: Dict[str, List[str]]) -> str:
     """Formate une réponse cohérente à partir des blocs d'information."""
-    response_parts = []
-    
-    # Ajouter la salutation si elle existe
-    if blocks["greeting"]:
-        response_parts.append(blocks["greeting"])
-    
-    # Formatter le contenu principal
-    main_content = []
-    if blocks["final_answer"]:
-        main_content.extend([line for line in blocks["final_answer"] 
-                           if not any(phrase in line for phrase in ["I'm ready", "Please provide"])])
-    elif blocks["additional_info"]:
-        main_content.extend(blocks["additional_info"])
-    
-    if not main_content and (blocks["database_info"] or blocks["web_info"]):
-        if blocks["database_info"]:
-            relevant_info = [line for line in blocks["database_info"] 
-                           if not line.startswith("I'm ready") 
-                           and not line.startswith("Please provide")]
-            if relevant_info:
-                main_content.extend(relevant_info)
-        
-        if blocks["web_info"]:
-            relevant_info = [line for line in blocks["web_info"] 
-                           if line != "No results found" 
-                           and not line.startswith("Error")]
-            if relevant_info:
-                main_content.extend(relevant_info)
-    
-    # Nettoyer et formater la réponse
-    if main_content:
-        response = "\n".join(main_content)
-        
-        # Nettoyer les marqueurs techniques restants
-        response = re.sub(r'```[^`]*```', '', response)
-        response = re.sub(r'Source: http[s]?://\S+', '', response)
-        response = re.sub(r'I\'m ready.*', '', response)
-        response = re.sub(r'Please provide.*', '', response)
-        
-        # Ajouter des emojis appropriés si nécessaire
-        if not any(emoji in response for emoji in ['👋', '🇲🇦', '⚽', '🏆']):
-            if any(word in response.lower() for word in ['bonjour', 'hi', 'hello', 'salam']):
-                response = f"👋 {response}"
-            elif any(word in response.lower() for word in ['hotel', 'logement']):
-                response = f"🏨 {response}"
-            elif any(word in response.lower() for word in ['stade', 'ville']):
-                response = f"🏟️ {response}"
-            else:
-                response = f"🇲🇦 {response}"
-        
-        response_parts.append(response.strip())
-    else:
-        response_parts.append("👋 Je suis là pour vous aider avec la CAN 2025 au Maroc. Que voulez-vous savoir ?")
-    
-    # Retourner la réponse finale nettoyée
-    final_response = " ".join(response_parts).strip()
-    final_response = re.sub(r'\s+', ' ', final_response)  # Nettoyer les espaces multiples
-    return final_response
+    return format_blocks(blocks)
 
 @tool
 def process_terminal_output(terminal_output: str) -> str:
@@ -385,20 +143,81 @@ def process_terminal_output(terminal_output: str) -> str:
             raise e
         return str(e)
 
-def get_tools(qa_chain):
+def get_structured_tools(datastore) -> List[Tool]:
+    """Exact lookups over the indexed JSON tables, answered without any LLM call."""
+    return [
+        Tool(
+            name="Hotel Finder",
+            func=datastore.search_hotels,
+            description="Exact hotel lookup near AFCON stadiums. Input filters such as "
+                        "'city=Rabat max_price=200 min_stars=4', 'stadium=Mohammed V Stadium max_distance=3' "
+                        "or plain text like 'hotels in Rabat under $200 with 4+ stars'"
+        ),
+        Tool(
+            name="Pharmacy Finder",
+            func=datastore.search_pharmacies,
+            description="List pharmacies of a Moroccan city (e.g. 'city=Sale') or find one by INPE number"
+        ),
+        Tool(
+            name="Restaurant Finder",
+            func=datastore.search_restaurants,
+            description="List restaurants by city/commune, region or ranking (e.g. 'city=Marrakech ranking=LUXE')"
+        ),
+        Tool(
+            name="Hospital Finder",
+            func=datastore.search_hospitals,
+            description="List hospitals by city or region (e.g. 'city=Rabat')"
+        ),
+    ]
+
+def get_geo_tools(geo_index) -> List[Tool]:
+    """Distance queries over hotel and stadium coordinates."""
+    return [
+        Tool(
+            name="Nearby Places",
+            func=geo_index.search,
+            description="Closest hotels/stadiums to a stadium, host city, hotel or 'lat,lon' point, "
+                        "e.g. 'hotels near Mohammed V Stadium k=3' or '33.59,-7.63 radius=5'"
+        ),
+    ]
+
+def get_fuzzy_tools(fuzzy_index) -> List[Tool]:
+    """Typo- and accent-tolerant lookup of the names, cities and addresses of the tables."""
+    return [
+        Tool(
+            name="Name Lookup",
+            func=fuzzy_index.lookup,
+            description="Find hotels, pharmacies, restaurants, hospitals, cities or addresses from an approximate "
+                        "or misspelled name, e.g. 'Au Bon Delice', 'Marakech' or 'Fes kind=pharmacies'; "
+                        "returns the exact spellings to use with the Finder tools"
+        ),
+    ]
+
+def get_tools(knowledge_base, datastore=None, geo_index=None, fuzzy_index=None):
     """Return the list of all available tools in order of priority."""
 
+    def query_knowledge_base(query: str, callbacks=None) -> str:
+        # Only the run that does the work reports to its callbacks
+        return TOOL_CALLS["knowledge_base"].do(" ".join(query.split()), knowledge_base.run, query, callbacks)
+
     tools = [
         Tool(
             name="CAN Knowledge Base",
-            func=qa_chain.run,
-            description= "Use for information about Morocco and AFCON 2025"
+            func=query_knowledge_base,
+            description= "Use for information about Morocco and AFCON 2025. "
+                         "Optionally narrow the search with filters before the question, "
+                         "e.g. 'type=pharmacies city=Rabat night pharmacy' (types: hotels, pharmacies, "
+                         "restaurants, hospitals, afcon2025_info, morocco_info). "
+                         "Exact names, INPE and phone numbers are matched directly."
             
         ),
+        *(get_structured_tools(datastore) if datastore else []),
+        *(get_geo_tools(geo_index) if geo_index else []),
+        *(get_fuzzy_tools(fuzzy_index) if fuzzy_index else []),
         Tool(
             name="Weather Info",
             func=get_weather,
-            description="Get current weather or forecast for Moroccan cities"
+            description="Get current weather or forecast for Moroccan cities ('all' for the six host cities)"
         ),
         Tool(
             name="Web Search",
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from datastore import normalize_city, normalize_text
+from geo import HOST_CITY_COORDINATES
+from http_client import NOMINATIM_URL, OPEN_METEO_URL, http_client
+
+load_dotenv()
+
+GEOCODE_CACHE_PATH = os.path.join("database", "cache", "geocode.json")
+# Seconds a weather response is reused for the same place
+CURRENT_WEATHER_TTL = int(os.getenv("CURRENT_WEATHER_TTL", "600"))
+FORECAST_TTL = int(os.getenv("FORECAST_TTL", "3600"))
+# Places closer than ~1 km share their cached weather
+COORDINATE_PRECISION = 2
+
+WEATHER_CODES = {
+    0: "Ciel dégagé ☀️",
+    1: "Partiellement nuageux 🌤️",
+    2: "Nuageux ⛅",
+    3: "Couvert ☁️",
+    45: "Brumeux 🌫️",
+    48: "Brouillard givrant 🌫️",
+    51: "Bruine légère 🌧️",
+    53: "Bruine modérée 🌧️",
+    55: "Bruine dense 🌧️",
+    61: "Pluie légère 🌧️",
+    63: "Pluie modérée 🌧️",
+    65: "Pluie forte 🌧️",
+    71: "Neige légère 🌨️",
+    73: "Neige modérée 🌨️",
+    75: "Neige forte 🌨️",
+    77: "Grains de neige 🌨️",
+    80: "Averses légères 🌦️",
+    81: "Averses modérées 🌦️",
+    82: "Averses violentes 🌦️",
+    95: "Orage ⛈️"
+}
+
+# Inputs asking for every host city at once
+ALL_HOST_CITIES = {"all", "all cities", "host cities", "all host cities", "toutes", "toutes les villes"}
+
+_HOST_CITIES = {normalize_text(name): (name, lat, lon) for name, (lat, lon) in HOST_CITY_COORDINATES.items()}
+
+_lock = threading.Lock()
+_geocode_cache: Optional[Dict[str, List[Any]]] = None
+_weather_cache: Dict[Tuple[float, float, bool], Tuple[float, Dict[str, Any]]] = {}
+
+def _load_geocode_cache() -> Dict[str, List[Any]]:
+    global _geocode_cache
+    if _geocode_cache is None:
+        try:
+            with open(GEOCODE_CACHE_PATH, "r", encoding="utf-8") as f:
+                _geocode_cache = json.load(f)
+        except (OSError, ValueError):
+            _geocode_cache = {}
+    return _geocode_cache
+
+def _save_geocode_cache():
+    os.makedirs(os.path.dirname(GEOCODE_CACHE_PATH), exist_ok=True)
+    tmp_path = f"{GEOCODE_CACHE_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_geocode_cache, f, ensure_ascii=False)
+    os.replace(tmp_path, GEOCODE_CACHE_PATH)
+
+def geocode(city: str) -> Optional[Tuple[str, float, float]]:
+    """Return ``(display name, lat, lon)``: host cities are built in, others cached on disk"""
+    key = normalize_city(city)
+    if key in _HOST_CITIES:
+        return _HOST_CITIES[key]
+    with _lock:
+        cached = _load_geocode_cache().get(key)
+    if cached:
+        return tuple(cached)
+
+    response = http_client.get(NOMINATIM_URL, params={"city": city, "format": "json", "limit": 1})
+    response.raise_for_status()
+    location_data = response.json()
+    if not location_data:
+        return None
+    place = (location_data[0].get("display_name", city).split(",")[0],
+             float(location_data[0]["lat"]), float(location_data[0]["lon"]))
+    with _lock:
+        _load_geocode_cache()[key] = list(place)
+        _save_geocode_cache()
+    return place
+
+def _weather_params(forecast: bool) -> Dict[str, str]:
+    if forecast:
+        return {"daily": "temperature_2m_max,temperature_2m_min,precipitation_probability_mean,weathercode",
+                "timezone": "auto"}
+    return {"current_weather": "true", "timezone": "auto"}
+
+def fetch_weather(points: List[Tuple[float, float]], forecast: bool = False) -> List[Dict[str, Any]]:
+    """Open-Meteo data for each point, one request for all the points missing from the cache"""
+    now = time.time()
+    ttl = FORECAST_TTL if forecast else CURRENT_WEATHER_TTL
+    keys = [(round(lat, COORDINATE_PRECISION), round(lon, COORDINATE_PRECISION), forecast) for lat, lon in points]
+    results: Dict[Tuple[float, float, bool], Dict[str, Any]] = {}
+    with _lock:
+        for key in keys:
+            entry = _weather_cache.get(key)
+            if entry and entry[0] > now:
+                results[key] = entry[1]
+
+    missing = list(dict.fromkeys(key for key in keys if key not in results))
+    if missing:
+        # Open-Meteo accepts comma-separated coordinates and then returns a list
+        params = {
+            "latitude": ",".join(str(lat) for lat, _, _ in missing),
+            "longitude": ",".join(str(lon) for _, lon, _ in missing),
+            **_weather_params(forecast)
+        }
+        response = http_client.get(OPEN_METEO_URL, params=params)
+        response.raise_for_status()
+        data = response.json()
+        data = data if isinstance(data, list) else [data]
+        with _lock:
+            for key, item in zip(missing, data):
+                _weather_cache[key] = (now + ttl, item)
+                results[key] = item
+    return [results[key] for key in keys]
+
+def format_current(city_name: str, weather_data: Dict[str, Any]) -> str:
+    current = weather_data['current_weather']
+    weather_desc = WEATHER_CODES.get(current['weathercode'], "Conditions inconnues")
+    return "\n".join([
+        f"🌤️ Météo actuelle à {city_name}:",
+        f"Température: {current['temperature']}°C",
+        f"Vitesse du vent: {current['windspeed']} km/h",
+        f"Conditions: {weather_desc}"
+    ])
+
+def format_forecast(city_name: str, weather_data: Dict[str, Any], days: int = 5) -> str:
+    daily = weather_data['daily']
+    forecast_info = []
+    for i in range(min(days, len(daily['time']))):
+        date = datetime.strptime(daily['time'][i], "%Y-%m-%d").strftime("%d/%m/%Y")
+        weather_desc = WEATHER_CODES.get(daily['weathercode'][i], "Conditions inconnues")
+        forecast_info.append(
+            f"🗓️ {date}: {daily['temperature_2m_min'][i]}°C à {daily['temperature_2m_max'][i]}°C - {weather_desc} - "
+            f"Probabilité de précipitation: {daily['precipitation_probability_mean'][i]}%"
+        )
+    return "\n".join([
+        f"🌤️ Prévisions météo pour {city_name}:",
+        *forecast_info
+    ])
+
+def city_weather(city: str, forecast: bool = False) -> str:
+    """Current weather or 5-day forecast of a city, or of every host city for 'all'"""
+    if normalize_text(city) in ALL_HOST_CITIES:
+        places = list(_HOST_CITIES.values())
+    else:
+        place = geocode(city)
+        if place is None:
+            return f"Désolé, je ne trouve pas la ville {city}"
+        places = [place]
+
+    data = fetch_weather([(lat, lon) for _, lat, lon in places], forecast)
+    formatter = format_forecast if forecast else format_current
+    return "\n\n".join(formatter(name, item) for (name, _, _), item in zip(places, data))
@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Number of agent runs executing at the same time (each one mostly waits on Gemini / HTTP)
+MAX_IN_FLIGHT = int(os.getenv("AGENT_MAX_IN_FLIGHT", "32"))
+# Number of admitted runs allowed to wait for a free worker before we start refusing
+MAX_QUEUE = int(os.getenv("AGENT_MAX_QUEUE", "64"))
+
+class PoolSaturated(Exception):
+    """Raised when the pool cannot admit another job"""
+    pass
+
+class AgentPool:
+    """Bounded thread pool with admission control for blocking agent runs.
+
+    The LangChain agent, the RAG chain and the HTTP tools are all synchronous, so
+    running them directly inside an ``async def`` endpoint blocks the event loop.
+    Jobs submitted here run on dedicated worker threads; once ``max_in_flight``
+    jobs are running and ``max_queue`` more are waiting, new jobs are rejected
+    with :class:`PoolSaturated` instead of piling up behind the others.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_queue: int = MAX_QUEUE):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight,
+            thread_name_prefix="agent-worker"
+        )
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _admit(self):
+        with self._lock:
+            if self._admitted >= self.max_in_flight + self.max_queue:
+                self._rejected += 1
+                raise PoolSaturated(
+                    f"Agent pool saturated ({self.max_in_flight} running, {self.max_queue} queued)"
+                )
+            self._admitted += 1
+
+    def _release(self):
+        with self._lock:
+            self._admitted -= 1
+            self._completed += 1
+
+    def _call(self, func):
+        with self._lock:
+            self._running += 1
+        try:
+            return func()
+        finally:
+            with self._lock:
+                self._running -= 1
+            # Here and not when the awaiting request goes away: the slot is busy until the work ends
+            self._release()
+
+    def _release_if_cancelled(self, job: Future):
+        # A job cancelled before a worker picked it up never reaches _call
+        if job.cancelled():
+            self._release()
+
+    def submit(self, func, *args, **kwargs) -> asyncio.Future:
+        """Admit ``func(*args, **kwargs)`` and schedule it on a worker thread.
+
+        Raises :class:`PoolSaturated` immediately when the pool is full, so callers
+        can refuse the request before starting a response.
+        """
+        self._admit()
+        try:
+            loop = asyncio.get_running_loop()
+            # Keep context variables (request ids, tracing...) visible inside the worker
+            ctx = contextvars.copy_context()
+            call = functools.partial(ctx.run, func, *args, **kwargs)
+            job = self._executor.submit(self._call, call)
+        except BaseException:
+            self._release()
+            raise
+        job.add_done_callback(self._release_if_cancelled)
+        return asyncio.wrap_future(job, loop=loop)
+
+    async def run(self, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` on a worker thread and await its result"""
+        return await self.submit(func, *args, **kwargs)
+
+    def stats(self):
+        """Return a snapshot of the pool occupancy"""
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": max(0, self._admitted - self._running),
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
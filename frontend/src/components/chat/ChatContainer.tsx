@@ -152,26 +152,48 @@ export const ChatContainer = () => {
 
     setMessages(prev => [...prev, newUserMessage]);
     
-    // Séquence de chargement
+    // Séquence de chargement, mise à jour par les événements du flux
     setLoadingState('thinking');
-    setTimeout(() => setLoadingState('searching'), 1000);
-    setTimeout(() => setLoadingState('processing'), 2000);
+    const botMessageId = Date.now() + 1;
+    let botMessageAdded = false;
+
+    const updateBotMessage = (changes: Partial<UIMessage>) => {
+      if (!botMessageAdded) {
+        botMessageAdded = true;
+        setMessages(prev => [...prev, {
+          id: botMessageId,
+          content: '',
+          isUser: false,
+          role: 'assistant',
+          timestamp: new Date().toLocaleTimeString(),
+          ...changes
+        }]);
+        return;
+      }
+      setMessages(prev => prev.map(message =>
+        message.id === botMessageId ? { ...message, ...changes } : message
+      ));
+    };
 
     try {
-      const data = await chatService.sendMessage(content);
-      
-      const botMessage: UIMessage = {
-        id: Date.now(),
+      let streamedContent = '';
+      const data = await chatService.streamMessage(content, {
+        onToolStart: () => setLoadingState('searching'),
+        onToolEnd: () => setLoadingState('processing'),
+        onToken: (text) => {
+          streamedContent += text;
+          setLoadingState(null);
+          updateBotMessage({ content: streamedContent });
+        }
+      });
+
+      updateBotMessage({
         content: data.response,
-        isUser: false,
-        role: 'assistant',
         timestamp: new Date().toLocaleTimeString(),
         confidence: data.confidence,
         sources: data.sources,
         suggested_questions: data.suggested_questions
-      };
-
-      setMessages(prev => [...prev, botMessage]);
+      });
       
       // Scroll to the latest message smoothly
       setTimeout(() => {
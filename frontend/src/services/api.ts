@@ -1,8 +1,17 @@
-import { ChatMessage, ChatResponse } from '../types/chat';
+import { ChatMessage, ChatResponse, ChatStreamHandlers } from '../types/chat';
 import i18n from '../config/i18n';
 
 const API_BASE_URL = 'http://localhost:8000';
 
+const toChatResponse = (response: string, confidence: number, error?: string): ChatResponse => ({
+  response,
+  error,
+  confidence,
+  sources: [],
+  categories: [],
+  suggested_questions: []
+});
+
 const getErrorMessage = (error: any): string => {
   if (error?.response?.data?.detail) {
     return error.response.data.detail;
@@ -62,6 +71,89 @@ export const chatService = {
     }
   },
 
+  async streamMessage(message: string, handlers: ChatStreamHandlers = {}): Promise<ChatResponse> {
+    try {
+      const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'text/event-stream',
+          'Accept-Language': i18n.language
+        },
+        body: JSON.stringify({
+          content: message,
+          role: 'user',
+          language: i18n.language
+        } as ChatMessage),
+      });
+
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        return toChatResponse(
+          i18n.t('errors.server', { message: data.detail || i18n.t('errors.unknown') }),
+          0,
+          data.detail
+        );
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let streamed = '';
+      let result: ChatResponse | null = null;
+
+      // Server-sent events are separated by a blank line
+      const handleEvent = (frame: string) => {
+        let event = 'message';
+        let data = '';
+        for (const line of frame.split('\n')) {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        }
+        const payload = data ? JSON.parse(data) : {};
+        switch (event) {
+          case 'tool_start':
+            handlers.onToolStart?.(payload.tool, payload.input);
+            break;
+          case 'tool_end':
+            handlers.onToolEnd?.(payload.tool);
+            break;
+          case 'token':
+            streamed += payload.text;
+            handlers.onToken?.(payload.text);
+            break;
+          case 'final':
+            result = toChatResponse(payload.response, 1);
+            break;
+          case 'error':
+            result = toChatResponse(
+              i18n.t('errors.server', { message: payload.detail || i18n.t('errors.unknown') }),
+              0,
+              payload.detail
+            );
+            break;
+        }
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary = buffer.indexOf('\n\n');
+        while (boundary !== -1) {
+          handleEvent(buffer.slice(0, boundary));
+          buffer = buffer.slice(boundary + 2);
+          boundary = buffer.indexOf('\n\n');
+        }
+      }
+
+      return result ?? (streamed ? toChatResponse(streamed, 1) : toChatResponse(i18n.t('errors.unknown'), 0));
+    } catch (error) {
+      console.error('Error streaming message:', error);
+      return toChatResponse(getErrorMessage(error), 0, error instanceof Error ? error.message : "Unknown error");
+    }
+  },
+
   async checkHealth(): Promise<boolean> {
     try {
       const response = await fetch(`${API_BASE_URL}/health`);
@@ -13,6 +13,12 @@ export interface ChatResponse {
   suggested_questions: string[];
 }
 
+export interface ChatStreamHandlers {
+  onToolStart?: (tool: string, input: string) => void;
+  onToolEnd?: (tool: string) => void;
+  onToken?: (text: string) => void;
+}
+
 export interface UIMessage extends ChatMessage {
   id: number;
   isUser: boolean;